@@ -0,0 +1,155 @@
+"""自动发送: 复制短语后用 pynput 的 Controller 打开聊天框、粘贴并回车
+
+合成按键在独立线程中进行，不占用分发线程。键盘钩子会收到这些合成的按键，
+发送前把将要合成的按键告诉分发器(HotkeyDispatcher.expect_synthetic)，
+它们不会触发快捷键，也不会改变修饰键状态；期间真实的按键照常处理。
+"""
+import queue
+import sys
+import threading
+import time
+import traceback
+
+# settings.json 的 auto_paste 中缺省的选项
+DEFAULT_PASTE_OPTIONS = {
+    # 打开聊天框的按键，全体聊天可改为 shift+enter
+    "chat_key": "enter",
+    # 粘贴的组合键，auto 为 macOS 上 cmd+v，其他系统 ctrl+v
+    "paste_key": "auto",
+    "send_key": "enter",
+    # 打开聊天框后、粘贴后分别等待的时间(毫秒)，游戏响应较慢时调大
+    "open_delay_ms": 40,
+    "send_delay_ms": 20,
+}
+
+# 等待剪贴板写入完成、等待用户松开快捷键中修饰键的最长时间(秒)
+WRITE_TIMEOUT = 0.5
+RELEASE_TIMEOUT = 1.0
+# 合成的按键在这么长时间内没有全部回到键盘钩子时，不再忽略之后的按键
+SYNTHETIC_TIMEOUT_NS = 500_000_000
+
+
+def paste_chord():
+    return "cmd+v" if sys.platform == "darwin" else "ctrl+v"
+
+
+def pynput_key(name):
+    """按键名 -> pynput 的 Key 或 KeyCode"""
+    from pynput.keyboard import Key, KeyCode
+    if name in Key.__members__:
+        return Key[name]
+    return KeyCode.from_char(name)
+
+
+class FakeKey:
+    """测试用按键，与 pynput 的 Key/KeyCode 一样只有 name 或 char"""
+
+    def __init__(self, name):
+        if len(name) == 1:
+            self.char = name
+        else:
+            self.name = name
+
+
+class FakeController:
+    """测试用 Controller，记录按下和松开的按键与时间
+
+    on_press/on_release 不为空时，像操作系统一样把合成的按键回送给键盘钩子。
+    """
+
+    def __init__(self, on_press=None, on_release=None):
+        self.events = []
+        self.on_press = on_press
+        self.on_release = on_release
+
+    def make_key(self, name):
+        return FakeKey(name)
+
+    def press(self, key):
+        self.events.append(("press", key, time.perf_counter_ns()))
+        if self.on_press:
+            self.on_press(key)
+
+    def release(self, key):
+        self.events.append(("release", key, time.perf_counter_ns()))
+        if self.on_release:
+            self.on_release(key)
+
+
+class AutoPaster:
+    """在独立线程中依次完成: 等待剪贴板写入 -> 打开聊天框 -> 粘贴 -> 发送
+
+    paste(text, timestamp) 在分发线程中调用，只把任务入队；timestamp 为
+    触发快捷键的按键时间，完成后记录从按下到发送的耗时(last_ns 与 metrics.paste)。
+    """
+
+    def __init__(self, controller, dispatcher, clipboard, options=None):
+        self.controller = controller
+        self.dispatcher = dispatcher
+        self.clipboard = clipboard
+        self.make_key = getattr(controller, "make_key", None) or pynput_key
+        self.metrics = None
+        self.count = 0
+        self.last_ns = 0
+        self.configure(options or {})
+        self._jobs = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._run, name="auto-paste", daemon=True)
+        self._thread.start()
+
+    def configure(self, options):
+        options = dict(DEFAULT_PASTE_OPTIONS, **options)
+        paste_key = options["paste_key"]
+        steps = [options["chat_key"],
+                 paste_chord() if paste_key == "auto" else paste_key,
+                 options["send_key"]]
+        # 预先转换为按键对象，发送时只需依次按下和松开
+        self._steps = [[self.make_key(name) for name in step.split("+") if name]
+                       for step in steps]
+        # 每一步依次按下各键，再反序松开
+        self._events = [event for keys in self._steps
+                        for event in [(True, key) for key in keys] +
+                        [(False, key) for key in reversed(keys)]]
+        self._delays = [options["open_delay_ms"] / 1000,
+                        options["send_delay_ms"] / 1000, 0]
+
+    def paste(self, text, timestamp):
+        self._jobs.put((text, timestamp))
+
+    def close(self):
+        self._jobs.put(None)
+        self._thread.join(timeout=1)
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            try:
+                self._send(*job)
+            except Exception:
+                traceback.print_exc()
+
+    def _send(self, text, timestamp):
+        if not self.clipboard.wait_written(text, WRITE_TIMEOUT):
+            print("剪贴板写入超时，取消自动发送")
+            return
+        # 快捷键的修饰键还按着时合成的回车会变成 cmd+enter 等，等用户松开
+        deadline = time.monotonic() + RELEASE_TIMEOUT
+        while self.dispatcher.modifiers and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.dispatcher.expect_synthetic(self._events, SYNTHETIC_TIMEOUT_NS)
+        controller = self.controller
+        for keys, delay in zip(self._steps, self._delays):
+            for key in keys:
+                controller.press(key)
+            for key in reversed(keys):
+                controller.release(key)
+            if delay:
+                time.sleep(delay)
+        elapsed = time.perf_counter_ns() - timestamp
+        self.count += 1
+        self.last_ns = elapsed
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.paste.observe(elapsed)
@@ -0,0 +1,858 @@
+"""快捷键端到端延迟基准
+
+用合成或录制的按键事件驱动与键盘监听相同的分发代码(HotkeyDispatcher)，
+不需要真实的键盘钩子。剪贴板写入到假的后端，统计从按键回调到文本写入的延迟。
+
+    python bench.py                          # 6 / 1000 / 100000 条短语
+    python bench.py --gui --sizes 6,1000     # 经由 ClipboardManager(offscreen)
+    python bench.py --record keys.jsonl      # 用真实键盘录制事件
+    python bench.py --replay keys.jsonl      # 回放录制的事件
+    python bench.py --compare old.json       # 与上一次结果对比
+    python bench.py --table                  # 表格加载耗时与内存(10k / 100k 行)
+    python bench.py --search [--gui]         # 搜索框逐键过滤耗时(100k 条)
+    python bench.py --profiles               # 切换短语配置的耗时(1k / 10k 条)
+    python bench.py --typing                 # 一天的普通打字在键盘钩子回调中的开销
+    python bench.py --typing --metrics       # 同上，启用运行时指标
+    python bench.py --paste                  # 自动发送从按下到发出回车的耗时(假 Controller)
+    python bench.py --import                 # 经由窗口导入 50k 条短语的耗时与界面最长卡顿
+    python bench.py --theme                  # 窗口构建、切换主题与添加短语的耗时(offscreen)
+"""
+import argparse
+import functools
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from clipboard_backends import ClipboardWriter, FakeBackend
+from dispatcher import HotkeyDispatcher
+from hotkeys import MODIFIER_ORDER, HotkeyIndex
+from metrics import Metrics
+
+DEFAULT_SIZES = [6, 1000, 100000]
+TABLE_SIZES = [10000, 100000]
+SEARCH_SIZES = [100000]
+PROFILE_SIZES = [1000, 10000]
+IMPORT_SIZES = [50000]
+IMPORT_FORMATS = [".jsonl", ".csv", ".json"]
+# 自动发送的等待时间(打开聊天框后, 粘贴后)，毫秒
+PASTE_DELAYS = [(0, 0), (40, 20)]
+# 主题基准: 窗口数与每个窗口添加的短语数
+THEME_WINDOWS = 5
+THEME_ADDS = 100
+# 一天的打字量(按键次数)
+TYPING_KEYSTROKES = 50000
+TYPING_TEXT = "gg wp 258 thanks for the game, nice ward! Report mid. "
+KEY_CHARS = "abcdefghijklmnopqrstuvwxyz0123456789"
+MODIFIER_SETS = [list(mods) for count in range(1, 5)
+                 for mods in itertools.combinations(MODIFIER_ORDER, count)]
+SENTINEL_HOTKEY = "cmd+ctrl+alt+shift+f12"
+SENTINEL_TEXT = "__bench_done__"
+
+
+class SyntheticKey:
+    """没有可用的 pynput 后端时代替 Key"""
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+
+class SyntheticKeyCode:
+    """没有可用的 pynput 后端时代替 KeyCode"""
+    __slots__ = ("char",)
+
+    def __init__(self, char):
+        self.char = char
+
+
+def _pynput_keys():
+    try:
+        from pynput.keyboard import Key, KeyCode
+    except ImportError:
+        return None
+    # dummy 后端中所有 Key 成员都相同，无法用于回放
+    if Key.cmd == Key.ctrl:
+        return None
+    return Key, KeyCode
+
+
+def make_key_factory():
+    keys = _pynput_keys()
+    if keys is None:
+        return lambda name: (SyntheticKeyCode(name) if len(name) == 1
+                             else SyntheticKey(name))
+    Key, KeyCode = keys
+    return lambda name: (KeyCode.from_char(name) if len(name) == 1
+                         else Key[name])
+
+
+def make_library(size):
+    """生成 size 条快捷键互不相同的短语"""
+    entries = []
+    for count in (1, 2, 3):
+        for chars in itertools.combinations(KEY_CHARS, count):
+            for mods in MODIFIER_SETS:
+                if len(entries) == size:
+                    return entries
+                entries.append({"text": f"短语{len(entries)}",
+                                "hotkey": "+".join(mods + list(chars))})
+    return entries
+
+
+def synthetic_stream(library, triggers, noise=8, seed=0):
+    """生成事件流: 普通打字与随机选取的快捷键交替"""
+    rng = random.Random(seed)
+    events = []
+    for _ in range(triggers):
+        for char in rng.choices(KEY_CHARS, k=noise):
+            events.append(("press", char))
+            events.append(("release", char))
+        parts = library[rng.randrange(len(library))]["hotkey"].split("+")
+        events.extend(("press", part) for part in parts)
+        events.extend(("release", part) for part in reversed(parts))
+    return events
+
+
+def typing_stream(keystrokes, seed=0):
+    """生成普通打字的事件流: 英文聊天文本，大写字母按住 shift"""
+    rng = random.Random(seed)
+    events = []
+    while len(events) < keystrokes * 2:
+        for char in TYPING_TEXT:
+            if char.isalpha() and rng.random() < 0.1:
+                char = char.upper()
+            name = "space" if char == " " else char
+            shifted = char.isupper()
+            if shifted:
+                events.append(("press", "shift"))
+            events.append(("press", name))
+            events.append(("release", name))
+            if shifted:
+                events.append(("release", "shift"))
+    return events
+
+
+def sentinel_events():
+    parts = SENTINEL_HOTKEY.split("+")
+    return ([("press", part) for part in parts] +
+            [("release", part) for part in reversed(parts)])
+
+
+def load_stream(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [(record["event"], record["key"])
+                for record in map(json.loads, f)]
+
+
+def record_stream(path, seconds):
+    """用真实的键盘钩子录制事件"""
+    from pynput import keyboard
+    from hotkeys import key_to_string
+
+    start = time.perf_counter_ns()
+    with open(path, "w", encoding="utf-8") as f:
+        def write(kind, key):
+            name = key_to_string(key)
+            if name:
+                f.write(json.dumps({"event": kind, "key": name,
+                                    "t": time.perf_counter_ns() - start}) + "\n")
+
+        with keyboard.Listener(on_press=lambda key: write("press", key),
+                               on_release=lambda key: write("release", key)):
+            time.sleep(seconds)
+    print(f"已录制到 {path}")
+
+
+def expected_texts(index, events):
+    """模拟按键状态，得到每个按下事件应当复制的文本(不触发时为 None)"""
+    held = set()
+    expected = []
+    for kind, name in events:
+        if kind == "press":
+            held.add(name)
+            entry = index.lookup(held)
+            expected.append(entry["text"] if entry else None)
+        else:
+            held.discard(name)
+            expected.append(None)
+    return expected
+
+
+class BenchSink(FakeBackend):
+    """记录期望文本到达的时间"""
+
+    def __init__(self):
+        super().__init__()
+        self.expected = None
+        self.arrived = threading.Event()
+        self.arrived_ns = 0
+
+    def write(self, text):
+        now = time.perf_counter_ns()
+        if text == self.expected:
+            self.arrived_ns = now
+            self.arrived.set()
+
+
+class CoreHarness:
+    """直接组装监听器使用的 HotkeyIndex / HotkeyDispatcher / ClipboardWriter"""
+
+    def __init__(self, library, metrics=False):
+        self.sink = BenchSink()
+        self.writer = ClipboardWriter(self.sink)
+        self.index = HotkeyIndex(library, latency=metrics)
+        self.dispatcher = HotkeyDispatcher(self.index, self.writer.copy)
+        if metrics:
+            self.dispatcher.metrics = Metrics()
+            self.writer.set_metrics(self.dispatcher.metrics)
+        self.dispatcher.start()
+
+    def close(self):
+        self.dispatcher.stop()
+        self.writer.close()
+
+
+def write_library(library, directory, **options):
+    settings_path = os.path.join(directory, "settings.json")
+    with open(settings_path, "w", encoding="utf-8") as f:
+        json.dump(dict(options, entries=library), f, ensure_ascii=False)
+    return settings_path
+
+
+def ensure_app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication(sys.argv)
+
+
+def create_window(settings_path, backend):
+    """在 offscreen 平台上创建 ClipboardManager，不启动真实的键盘钩子"""
+    app = ensure_app()
+    from dota2_clipboard import ClipboardManager
+
+    window = ClipboardManager(settings_path=settings_path,
+                              clipboard_backend=backend,
+                              listener_factory=_NullListener)
+    return app, window
+
+
+class GuiHarness:
+    """经由 ClipboardManager 驱动其分发器"""
+
+    def __init__(self, library):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.sink = BenchSink()
+        # 基准中同一快捷键会在短时间内反复触发，不做最小间隔限制
+        self.app, self.window = create_window(
+            write_library(library, self._tmpdir.name, hotkey_interval_ms=0),
+            self.sink)
+        self.index = self.window.hotkey_index
+        self.dispatcher = self.window.dispatcher
+
+    def close(self):
+        self.window.close()
+        self._tmpdir.cleanup()
+
+
+class _NullListener:
+    def __init__(self, on_press=None, on_release=None):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+def current_rss_mb():
+    """当前进程的常驻内存(MB)，非 Linux 平台退回峰值内存"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def measure_table(size):
+    """创建含 size 条短语的窗口并显示，返回加载耗时与内存"""
+    with tempfile.TemporaryDirectory() as directory:
+        settings_path = write_library(make_library(size), directory)
+        # Qt 本身的导入和初始化不计入
+        ensure_app()
+        import dota2_clipboard  # noqa: F401
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        app, window = create_window(settings_path, FakeBackend())
+        window.show()
+        app.processEvents()
+        load_ms = (time.perf_counter() - start) * 1000
+        rss = current_rss_mb()
+        window.close()
+    return {"entries": size, "load_ms": load_ms, "rss_mb": rss,
+            "rss_delta_mb": rss - rss_before}
+
+
+def run_table_benchmark(size):
+    """在独立进程中测量，避免前一次的内存影响结果"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--table-child", str(size)],
+        capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def make_phrases(size, seed=0):
+    """用默认文案中的字随机组成中文短语，快捷键与 make_library 相同"""
+    from service import DEFAULT_ENTRIES
+    rng = random.Random(seed)
+    chars = "".join(entry["text"] for entry in DEFAULT_ENTRIES)
+    library = make_library(size)
+    for entry in library:
+        entry["text"] = "".join(rng.choices(chars, k=rng.randint(8, 40)))
+    return library
+
+
+def search_queries(library, count=200, seed=1):
+    """模拟逐字输入: 取短语中的一段，依次输入其 1~6 个字的前缀"""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        text = library[rng.randrange(len(library))]["text"]
+        start = rng.randrange(len(text) - 6)
+        queries.extend(text[start:start + length] for length in range(1, 7))
+    queries.extend(["zzzz", "cmd+", "alt+shift"])
+    return queries
+
+
+def measure_search(size, gui=False):
+    """建立 size 条短语的搜索索引，统计每次按键的过滤耗时"""
+    from search_index import SearchIndex
+    library = make_phrases(size)
+    queries = search_queries(library)
+    if gui:
+        directory = tempfile.mkdtemp()
+        app, window = create_window(write_library(library, directory),
+                                    FakeBackend())
+        window.show()
+        app.processEvents()
+        window.index_timer.stop()
+        index = window.search_index
+        index.rebuild(window.entries)
+        search_input = window.search_input
+
+        def search(query):
+            search_input.setText(query)
+            app.processEvents()
+    else:
+        index = SearchIndex(library)
+        search = index.search
+    # 载入后索引建完之前输入的第一个词(1~6 个字)，未索引的条目逐条比较
+    cold = []
+    for query in queries[:6]:
+        start = time.perf_counter()
+        search(query)
+        cold.append((time.perf_counter() - start) * 1000)
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    index.build()
+    build_ms = (time.perf_counter() - start) * 1000
+    rss = current_rss_mb()
+
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    if gui:
+        window.close()
+    return {"entries": size, "queries": len(queries), "build_ms": build_ms,
+            "rss_delta_mb": rss - rss_before, "cold_max_ms": max(cold),
+            "p50_ms": percentile(timings, 0.5),
+            "p99_ms": percentile(timings, 0.99), "max_ms": max(timings)}
+
+
+def measure_profiles(size, switches=2000):
+    """两个各含 size 条短语的配置之间来回切换，统计切换耗时"""
+    from service import HotkeyService
+    with tempfile.TemporaryDirectory() as directory:
+        settings_path = write_library(
+            make_library(size), directory,
+            profile="a", profiles={"b": make_phrases(size)})
+        service = HotkeyService(settings_path, FakeBackend(), _NullListener)
+        start = time.perf_counter()
+        service.load()
+        service.start()
+        # 载入后立即按切换快捷键: 只计分发线程上的耗时，b 在切换线程中编译
+        switch_start = time.perf_counter()
+        service.next_profile()
+        first_ms = (time.perf_counter() - switch_start) * 1000
+        deadline = time.monotonic() + 10
+        while service.profile.name != "b" and time.monotonic() < deadline:
+            time.sleep(0.0005)
+        ready_ms = (time.perf_counter() - start) * 1000
+        timings = []
+        for _ in range(switches):
+            start = time.perf_counter_ns()
+            service.next_profile()
+            timings.append((time.perf_counter_ns() - start) / 1000)
+        service.stop()
+    return {"entries": size, "switches": switches, "first_ms": first_ms,
+            "ready_ms": ready_ms,
+            "p50_us": percentile(timings, 0.5),
+            "p99_us": percentile(timings, 0.99), "max_us": max(timings)}
+
+
+class _SilentMessageBox:
+    information = warning = staticmethod(lambda *args: None)
+
+
+def measure_import(size, suffix):
+    """在 offscreen 窗口中导入 size 条短语
+
+    import_ms 为从开始导入到快捷键生效，index_ms 为空闲时补完搜索索引；
+    期间用 5ms 的定时器测量主线程最长的卡顿(max_stall_ms)。
+    """
+    from PyQt6.QtCore import QEventLoop, QTimer
+    from phrase_io import export_entries
+    with tempfile.TemporaryDirectory() as directory:
+        library = make_phrases(size)
+        # 随机组成的短语中会出现 {字} 这样的模板变量，去掉花括号
+        for entry in library:
+            entry["text"] = entry["text"].replace("{", "").replace("}", "")
+        path = os.path.join(directory, "pack" + suffix)
+        start = time.perf_counter()
+        export_entries(library, path)
+        export_ms = (time.perf_counter() - start) * 1000
+        app, window = create_window(write_library([], directory), FakeBackend())
+        window.show()
+        app.processEvents()
+        # 随机的快捷键会有冲突，导入结束时的提示框是模态的，基准中不弹出
+        import dota2_clipboard
+        message_box, dota2_clipboard.QMessageBox = (
+            dota2_clipboard.QMessageBox, _SilentMessageBox)
+        ticks = []
+        heartbeat = QTimer()
+        heartbeat.timeout.connect(lambda: ticks.append(time.perf_counter()))
+        heartbeat.start(5)
+        start = time.perf_counter()
+        window.start_import(path)
+        while window.importer is not None:
+            app.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+        import_ms = (time.perf_counter() - start) * 1000
+        while window.index_timer.isActive():
+            app.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+        index_ms = (time.perf_counter() - start) * 1000
+        heartbeat.stop()
+        imported = len(window.entries)
+        window.close()
+        dota2_clipboard.QMessageBox = message_box
+    stalls = [(b - a) * 1000 for a, b in zip([start] + ticks, ticks)]
+    return {"entries": imported, "export_ms": export_ms, "import_ms": import_ms,
+            "index_ms": index_ms, "max_stall_ms": max(stalls, default=0.0)}
+
+
+def measure_theme(windows=THEME_WINDOWS, adds=THEME_ADDS, size=50):
+    """offscreen 窗口的构建、切换主题与逐条添加短语的耗时(各取中位数)
+
+    每个窗口先有 size 条短语，切换两次主题(回到原主题)，再经由输入框添加
+    adds 条短语；add_ms 只计 add_entry 本身，add_repaint_ms 包括之后的重绘。
+    """
+    import theme
+    library = make_library(size + adds)
+    window_times, switch_times, add_times, repaint_times = [], [], [], []
+    for _ in range(windows):
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_library(library[:size], directory)
+            start = time.perf_counter()
+            app, window = create_window(path, FakeBackend())
+            window_times.append((time.perf_counter() - start) * 1000)
+            window.show()
+            app.processEvents()
+            for _ in range(2):
+                start = time.perf_counter()
+                window.toggle_theme()
+                app.processEvents()
+                switch_times.append((time.perf_counter() - start) * 1000)
+            for entry in library[size:]:
+                window.text_input.setText(entry["text"])
+                window.hotkey_input.setText(entry["hotkey"])
+                start = time.perf_counter()
+                window.add_entry()
+                added = time.perf_counter()
+                app.processEvents()
+                add_times.append((added - start) * 1000)
+                repaint_times.append((time.perf_counter() - start) * 1000)
+            window.close()
+    return {"entries": size, "windows": windows, "adds": adds,
+            "theme": theme.current,
+            "window_ms": statistics.median(window_times),
+            "switch_ms": statistics.median(switch_times),
+            "add_ms": statistics.median(add_times),
+            "add_repaint_ms": statistics.median(repaint_times)}
+
+
+def measure_paste(open_delay_ms, send_delay_ms, triggers=200):
+    """带 auto_paste 的短语从按下快捷键到假 Controller 发出回车的耗时
+
+    合成的按键会回送给键盘钩子；库中 ctrl+v 和 enter 本身就是快捷键，
+    如果合成的按键没有被忽略，会多出剪贴板写入(retriggered)。
+    """
+    from autopaste import FakeController
+    from service import HotkeyService
+    make_key = make_key_factory()
+    with tempfile.TemporaryDirectory() as directory:
+        settings_path = write_library(
+            [{"text": "gg", "hotkey": "ctrl+v", "auto_paste": True},
+             {"text": "wp", "hotkey": "enter"}],
+            directory, hotkey_interval_ms=0,
+            auto_paste={"paste_key": "ctrl+v", "open_delay_ms": open_delay_ms,
+                        "send_delay_ms": send_delay_ms})
+        backend = FakeBackend()
+        service = HotkeyService(
+            settings_path, backend, _NullListener,
+            lambda: FakeController(service.dispatcher.on_press,
+                                   service.dispatcher.on_release))
+        service.load()
+        service.start()
+        dispatcher = service.dispatcher
+        ctrl, v = make_key("ctrl"), make_key("v")
+        timings = []
+        for _ in range(triggers):
+            count = service.paster.count if service.paster else 0
+            dispatcher.on_press(ctrl)
+            dispatcher.on_press(v)
+            dispatcher.on_release(v)
+            dispatcher.on_release(ctrl)
+            deadline = time.monotonic() + 1
+            while ((service.paster is None or service.paster.count == count)
+                   and time.monotonic() < deadline):
+                time.sleep(0.0002)
+            timings.append(service.paster.last_ns / 1e6)
+        service.stop()
+    return {"triggers": triggers, "p50_ms": percentile(timings, 0.5),
+            "p99_ms": percentile(timings, 0.99), "max_ms": max(timings),
+            "retriggered": len(backend.writes) - triggers}
+
+
+def measure_typing(size, keystrokes=TYPING_KEYSTROKES, metrics=False):
+    """把 keystrokes 次普通打字送入键盘钩子回调，统计回调总耗时与分配的内存块"""
+    import gc
+    events = typing_stream(keystrokes)
+    make_key = make_key_factory()
+    # 实际的短语快捷键都带 cmd/ctrl/alt，只按 shift 的快捷键会与打大写字母冲突
+    library = [entry for entry in make_library(size * 2)
+               if not entry["hotkey"].startswith("shift+")][:size]
+    harness = CoreHarness(library, metrics)
+    try:
+        dispatcher = harness.dispatcher
+        push = {"press": dispatcher.on_press, "release": dispatcher.on_release}
+        calls = [(push[kind], make_key(name)) for kind, name in events]
+        # 预热一遍，使字符串哈希等缓存就绪
+        for callback, key in calls:
+            callback(key)
+        queued = dispatcher.hook_calls
+        gc.collect()
+        gc.disable()
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter_ns()
+        for callback, key in calls:
+            callback(key)
+        elapsed = time.perf_counter_ns() - start
+        allocated = sys.getallocatedblocks() - blocks
+        gc.enable()
+        queued = dispatcher.hook_calls - queued
+    finally:
+        harness.close()
+    return {"entries": size, "events": len(calls), "queued": queued,
+            "total_ms": elapsed / 1e6, "ns_per_event": elapsed / len(calls),
+            "allocated_blocks": allocated}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_benchmark(library, events, harness_class=CoreHarness, timeout=1.0):
+    """回放事件，返回延迟分位数(微秒)与吞吐"""
+    library = library + [{"text": SENTINEL_TEXT, "hotkey": SENTINEL_HOTKEY}]
+    make_key = make_key_factory()
+    harness = harness_class(library)
+    try:
+        keys = [(kind, make_key(name)) for kind, name in events]
+        expected = expected_texts(harness.index, events)
+        sink, dispatcher = harness.sink, harness.dispatcher
+        push = {"press": dispatcher.on_press, "release": dispatcher.on_release}
+
+        # 逐个触发，等待文本到达后再继续，测量单次延迟
+        latencies = []
+        missed = 0
+        for (kind, key), text in zip(keys, expected):
+            if text is None:
+                push[kind](key)
+                continue
+            sink.expected = text
+            sink.arrived.clear()
+            start = time.perf_counter_ns()
+            push[kind](key)
+            if sink.arrived.wait(timeout):
+                latencies.append((sink.arrived_ns - start) / 1000)
+            else:
+                missed += 1
+
+        # 一次性推入全部事件，以结尾的哨兵快捷键到达作为处理完毕
+        tail = [(kind, make_key(name)) for kind, name in sentinel_events()]
+        sink.expected = SENTINEL_TEXT
+        sink.arrived.clear()
+        start = time.perf_counter_ns()
+        for kind, key in keys + tail:
+            push[kind](key)
+        if not sink.arrived.wait(max(timeout, len(keys) / 10000)):
+            raise RuntimeError("事件未能在超时前处理完")
+        elapsed = (sink.arrived_ns - start) / 1e9
+        hook = dispatcher.hook_stats()
+    finally:
+        harness.close()
+
+    if not latencies:
+        raise RuntimeError("没有任何快捷键被触发")
+    return {
+        "entries": len(library) - 1,
+        "events": len(events),
+        "triggers": len(latencies),
+        "missed": missed,
+        "p50_us": percentile(latencies, 0.50),
+        "p99_us": percentile(latencies, 0.99),
+        "mean_us": statistics.fmean(latencies),
+        "events_per_sec": (len(keys) + len(tail)) / elapsed if elapsed > 0 else 0.0,
+        "hook_mean_us": hook["mean_us"],
+        "hook_max_us": hook["max_us"],
+    }
+
+
+COMPARED_METRICS = {
+    "results": ("p50_us", "p99_us", "events_per_sec", "hook_max_us"),
+    "table": ("load_ms", "rss_mb"),
+    "search": ("build_ms", "cold_max_ms", "p50_ms", "p99_ms"),
+    "profiles": ("first_ms", "p50_us", "p99_us"),
+    "typing": ("total_ms", "ns_per_event"),
+    "paste": ("p50_ms", "p99_ms"),
+    "import": ("import_ms", "max_stall_ms"),
+    "theme": ("window_ms", "switch_ms", "add_ms", "add_repaint_ms"),
+}
+
+
+def compare(old, new):
+    print(f"\n{'条目数':>8} {'指标':<16} {'上次':>12} {'本次':>12} {'变化':>8}")
+    for section, metrics in COMPARED_METRICS.items():
+        for size, result in new.get(section, {}).items():
+            previous = old.get(section, {}).get(size)
+            if previous:
+                _print_changes(size, metrics, previous, result)
+
+
+def _print_changes(size, metrics, previous, result):
+    for metric in metrics:
+        before, after = previous[metric], result[metric]
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"{size:>8} {metric:<16} {before:>12.1f} {after:>12.1f} "
+              f"{change:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='快捷键端到端延迟基准')
+    parser.add_argument('--sizes', default=",".join(map(str, DEFAULT_SIZES)),
+                        help='短语库大小，逗号分隔')
+    parser.add_argument('--triggers', type=int, default=2000,
+                        help='合成事件流中的快捷键触发次数')
+    parser.add_argument('--gui', action='store_true',
+                        help='通过 ClipboardManager 运行(offscreen)')
+    parser.add_argument('--replay', help='回放录制的事件文件(JSON Lines)')
+    parser.add_argument('--settings', default='settings.json',
+                        help='回放时使用的短语库')
+    parser.add_argument('--record', help='录制真实按键到文件')
+    parser.add_argument('--seconds', type=float, default=30,
+                        help='录制时长(秒)')
+    parser.add_argument('--output', default='bench_results.json',
+                        help='结果输出文件')
+    parser.add_argument('--compare', help='与之前的结果文件对比')
+    parser.add_argument('--table', action='store_true',
+                        help='测量表格加载耗时与内存')
+    parser.add_argument('--table-child', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--search', action='store_true',
+                        help='测量搜索框逐键过滤耗时')
+    parser.add_argument('--profiles', action='store_true',
+                        help='测量切换短语配置的耗时')
+    parser.add_argument('--typing', action='store_true',
+                        help='测量普通打字在键盘钩子回调中的开销')
+    parser.add_argument('--paste', action='store_true',
+                        help='测量自动发送的端到端耗时')
+    parser.add_argument('--import', dest='import_', action='store_true',
+                        help='测量导入短语库的耗时与界面卡顿')
+    parser.add_argument('--theme', action='store_true',
+                        help='测量窗口构建、切换主题与添加短语的耗时')
+    parser.add_argument('--metrics', action='store_true',
+                        help='启用运行时指标(--gui 时由设置决定，默认启用)')
+    args = parser.parse_args()
+
+    if args.record:
+        record_stream(args.record, args.seconds)
+        return
+    if args.table_child:
+        print(json.dumps(measure_table(args.table_child)))
+        return
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+    }
+    if args.table:
+        report["table"] = run_table(TABLE_SIZES)
+    elif args.profiles:
+        report["profiles"] = run_profiles(PROFILE_SIZES)
+    elif args.paste:
+        report["paste"] = run_paste(PASTE_DELAYS)
+    elif args.import_:
+        report["import"] = run_import(IMPORT_SIZES, IMPORT_FORMATS)
+    elif args.theme:
+        report["theme"] = run_theme()
+    elif args.typing:
+        report["typing"] = run_typing(map(int, args.sizes.split(",")),
+                                      args.metrics)
+    elif args.search:
+        report["mode"] = "gui" if args.gui else "core"
+        report["search"] = run_search(SEARCH_SIZES, args.gui)
+    else:
+        report["mode"] = "gui" if args.gui else "core"
+        report["source"] = args.replay or "synthetic"
+        report["results"] = run_latency(args)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+def run_table(sizes):
+    results = {}
+    for size in sizes:
+        result = run_table_benchmark(size)
+        results[str(size)] = result
+        print(f"{size:>7} 行: 加载 {result['load_ms']:.0f}ms  "
+              f"内存 {result['rss_mb']:.0f}MB "
+              f"(+{result['rss_delta_mb']:.0f}MB)")
+    return results
+
+
+def run_search(sizes, gui):
+    results = {}
+    for size in sizes:
+        result = measure_search(size, gui)
+        results[str(size)] = result
+        print(f"{size:>7} 条: 建立索引 {result['build_ms']:.0f}ms "
+              f"(+{result['rss_delta_mb']:.0f}MB)  "
+              f"建完前按键最大 {result['cold_max_ms']:.1f}ms  "
+              f"每次按键 p50 {result['p50_ms']:.2f}ms  "
+              f"p99 {result['p99_ms']:.2f}ms  最大 {result['max_ms']:.2f}ms")
+    return results
+
+
+def run_profiles(sizes):
+    results = {}
+    for size in sizes:
+        result = measure_profiles(size)
+        results[str(size)] = result
+        print(f"{size:>7} 条: 首次切换 {result['first_ms']:.2f}ms  "
+              f"载入到 b 可用 {result['ready_ms']:.1f}ms  "
+              f"之后 p50 {result['p50_us']:.1f}us  "
+              f"p99 {result['p99_us']:.1f}us  最大 {result['max_us']:.1f}us")
+    return results
+
+
+def run_paste(delays):
+    results = {}
+    for open_delay_ms, send_delay_ms in delays:
+        result = measure_paste(open_delay_ms, send_delay_ms)
+        results[f"{open_delay_ms}+{send_delay_ms}"] = result
+        print(f"等待 {open_delay_ms}+{send_delay_ms}ms: "
+              f"p50 {result['p50_ms']:.2f}ms  p99 {result['p99_ms']:.2f}ms  "
+              f"最大 {result['max_ms']:.2f}ms  误触发 {result['retriggered']}")
+    return results
+
+
+def run_theme():
+    result = measure_theme()
+    print(f"{result['entries']} 条 {result['windows']} 个窗口: 构建 {result['window_ms']:.1f}ms  "
+          f"切换主题 {result['switch_ms']:.1f}ms")
+    print(f"添加 {result['adds']} 条/窗口: add_entry {result['add_ms']:.2f}ms  "
+          f"含重绘 {result['add_repaint_ms']:.2f}ms")
+    return {str(result["entries"]): result}
+
+
+def run_import(sizes, suffixes):
+    results = {}
+    for size in sizes:
+        for suffix in suffixes:
+            result = measure_import(size, suffix)
+            results[f"{size}{suffix}"] = result
+            print(f"{size:>7} 条 {suffix:<6}: 导出 {result['export_ms']:.0f}ms  "
+                  f"导入 {result['import_ms']:.0f}ms  "
+                  f"补完搜索索引 {result['index_ms']:.0f}ms  "
+                  f"界面最长卡顿 {result['max_stall_ms']:.0f}ms")
+    return results
+
+
+def run_typing(sizes, metrics=False):
+    results = {}
+    for size in sizes:
+        result = measure_typing(size, metrics=metrics)
+        results[str(size)] = result
+        print(f"{size:>7} 条: {result['events']} 个事件 共 {result['total_ms']:.1f}ms  "
+              f"每个 {result['ns_per_event']:.0f}ns  入队 {result['queued']}  "
+              f"分配内存块 {result['allocated_blocks']}")
+    return results
+
+
+def run_latency(args):
+    harness_class = GuiHarness if args.gui else CoreHarness
+    if args.metrics and not args.gui:
+        harness_class = functools.partial(CoreHarness, metrics=True)
+    results = {}
+    if args.replay:
+        from settings_store import read_settings
+        library = read_settings(args.settings)["entries"]
+        runs = [(len(library), library, load_stream(args.replay))]
+    else:
+        runs = []
+        for size in map(int, args.sizes.split(",")):
+            library = make_library(size)
+            runs.append((size, library,
+                         synthetic_stream(library, args.triggers)))
+
+    for size, library, events in runs:
+        result = run_benchmark(library, events, harness_class)
+        results[str(size)] = result
+        print(f"{size:>7} 条: p50 {result['p50_us']:.1f}us  "
+              f"p99 {result['p99_us']:.1f}us  "
+              f"{result['events_per_sec']:.0f} 事件/秒  "
+              f"钩子最大 {result['hook_max_us']:.1f}us")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,33 @@
 import os
 import sys
+import json
+import time
 import platform
 import subprocess
 import shutil
 import argparse
+import statistics
+import tempfile
+import threading
+
+APP_NAME = 'Dota2本色风情'
+
+# onedir 模式下保留的 Qt 插件: 目录 -> 保留的文件名前缀，None 表示整个目录都保留。
+# 界面使用 Fusion 样式和 SVG 图标，不需要原生样式、OpenGL、网络等插件
+QT_PLUGINS = {
+    'platforms': None,
+    'platforminputcontexts': None,  # 中文输入法
+    'iconengines': ('libqsvgicon', 'qsvgicon'),
+    'imageformats': ('libqsvg', 'qsvg'),
+}
+
+PYNPUT_BACKENDS = ['keyboard._xorg', 'mouse._xorg', 'keyboard._uinput',
+                   'keyboard._dummy', 'mouse._dummy']
+
+# 启动耗时基线，按 平台-打包模式 记录
+STARTUP_BASELINE_FILE = 'startup_baseline.json'
+# 守护进程在键盘监听启动后打印这一行
+LISTENER_ARMED = '无界面模式已启动'
 
 
 def run_command(command, description):
@@ -26,11 +50,19 @@ def run_command(command, description):
         return False
 
 
-def build_macos():
-    """构建 macOS 版本"""
-    print("\n=== 开始构建 macOS 版本 ===")
+def bundle_options(mode):
+    """打包模式对应的 PyInstaller 参数
+
+    onefile 每次启动都要先解压到临时目录，冷启动要多花数秒；
+    onedir 直接从目录加载，并在打包时以 -OO 预编译字节码(去掉文档字符串和断言)。
+    """
+    if mode == 'onedir':
+        return ['--onedir', '--optimize=2']
+    return ['--onefile']
+
 
-    # 检查 PyInstaller 是否安装
+def check_pyinstaller():
+    """检查 PyInstaller 是否安装"""
     try:
         import PyInstaller
         print(f"PyInstaller 版本: {PyInstaller.__version__}")
@@ -38,12 +70,21 @@ def build_macos():
         print("错误: PyInstaller 未安装，正在安装...")
         if not run_command(['pip', 'install', 'pyinstaller'], "安装 PyInstaller"):
             return False
+    return True
+
+
+def build_macos(mode='onefile'):
+    """构建 macOS 版本"""
+    print("\n=== 开始构建 macOS 版本 ===")
+
+    if not check_pyinstaller():
+        return False
 
     base_command = [
         'pyinstaller',
-        '--name=Dota2本色风情',
+        f'--name={APP_NAME}',
         '--windowed',
-        '--onefile',
+        *bundle_options(mode),
         '--clean',
         '--add-data=delicon.svg:.',
         '--noconfirm',
@@ -56,30 +97,34 @@ def build_macos():
     if not run_command(base_command, "构建 macOS 应用"):
         return False
 
-    if not os.path.exists('dist/Dota2本色风情.app'):
+    app_path = f'dist/{APP_NAME}.app'
+    if not os.path.exists(app_path):
         print("错误: 应用程序未能成功构建")
         return False
 
-    print("macOS 应用程序已构建完成: dist/Dota2本色风情.app")
+    if mode == 'onedir':
+        trim_qt_plugins(app_path)
+        # 删除插件后应用包的签名失效，重新进行临时签名
+        if not run_command(['codesign', '--force', '--deep', '--sign', '-', app_path],
+                           "重新签名"):
+            return False
+
+    print(f"macOS 应用程序已构建完成: {app_path}")
     return create_dmg()
 
 
-def build_windows():
+def build_windows(mode='onefile'):
     """构建 Windows 版本"""
     print("\n=== 开始构建 Windows 版本 ===")
 
-    # 创建 Windows 运行时钩子
-    create_windows_runtime_hook()
-
     base_command = [
         'pyinstaller',
-        '--name=Dota2本色风情',
+        f'--name={APP_NAME}',
         '--windowed',
-        '--onefile',
+        *bundle_options(mode),
         '--clean',
         '--add-data=delicon.svg:.',  # Windows 使用冒号
         '--noconfirm',
-        '--runtime-hook=windows_runtime_hook.py',
         '--distpath=./dist',
         '--workpath=./build',
         '--specpath=.',
@@ -89,11 +134,182 @@ def build_windows():
     if not run_command(base_command, "构建 Windows 应用"):
         return False
 
-    if not os.path.exists('dist/Dota2本色风情.exe'):
+    exe_path = executable_path('windows', mode)
+    if not os.path.exists(exe_path):
         print("错误: Windows 可执行文件未能成功构建")
         return False
 
-    print("Windows 可执行文件已构建完成: dist/Dota2本色风情.exe")
+    if mode == 'onedir':
+        trim_qt_plugins(os.path.dirname(exe_path))
+
+    print(f"Windows 可执行文件已构建完成: {exe_path}")
+    return True
+
+
+def build_linux(mode='onedir', tolerance=0.2, record_baseline=False):
+    """构建 Linux 版本，并检查打包后的启动耗时是否退步"""
+    print("\n=== 开始构建 Linux 版本 ===")
+
+    if not check_pyinstaller():
+        return False
+
+    base_command = [
+        'pyinstaller',
+        f'--name={APP_NAME}',
+        *bundle_options(mode),
+        '--clean',
+        '--add-data=delicon.svg:.',
+        # 没有 X 服务器的构建机上 pynput 的钩子无法导入 pynput，需要显式收集各后端
+        *[f'--hidden-import=pynput.{name}' for name in PYNPUT_BACKENDS],
+        '--noconfirm',
+        '--distpath=./dist',
+        '--workpath=./build',
+        '--specpath=.',
+        'dota2_clipboard.py'
+    ]
+
+    if not run_command(base_command, "构建 Linux 应用"):
+        return False
+
+    exe_path = executable_path('linux', mode)
+    if not os.path.exists(exe_path):
+        print("错误: Linux 可执行文件未能成功构建")
+        return False
+
+    if mode == 'onedir':
+        trim_qt_plugins(os.path.dirname(exe_path))
+
+    print(f"Linux 可执行文件已构建完成: {exe_path}")
+    return check_startup(exe_path, f'linux-{mode}', tolerance, record_baseline)
+
+
+def executable_path(platform_name, mode):
+    name = APP_NAME + ('.exe' if platform_name == 'windows' else '')
+    if mode == 'onedir':
+        return os.path.join('dist', APP_NAME, name)
+    return os.path.join('dist', name)
+
+
+def trim_qt_plugins(bundle_dir):
+    """删除 QT_PLUGINS 之外的 Qt 插件，返回删除的字节数"""
+    removed = 0
+    for dirpath, dirnames, _ in os.walk(bundle_dir):
+        if os.path.basename(dirpath) != 'plugins' or \
+                os.path.basename(os.path.dirname(dirpath)) != 'Qt6':
+            continue
+        for plugin_type in list(dirnames):
+            plugin_dir = os.path.join(dirpath, plugin_type)
+            # Wayland 的各类集成插件与 platforms 中的 wayland 插件配套使用
+            if plugin_type.startswith('wayland-') or os.path.islink(plugin_dir):
+                continue
+            keep = QT_PLUGINS.get(plugin_type, ())
+            if keep is None:
+                continue
+            for name in os.listdir(plugin_dir):
+                if not name.startswith(keep):
+                    path = os.path.join(plugin_dir, name)
+                    removed += os.path.getsize(path)
+                    os.remove(path)
+            if not os.listdir(plugin_dir):
+                os.rmdir(plugin_dir)
+        dirnames.clear()
+    print(f"已删除未使用的 Qt 插件: {removed / 1024 / 1024:.1f} MB")
+    return removed
+
+
+def _read_output(stream, lines, armed_at, done):
+    """逐行读取子进程输出，读到 LISTENER_ARMED 或输出结束时设置 done"""
+    for line in stream:
+        lines.append(line)
+        if not armed_at and LISTENER_ARMED in line:
+            armed_at.append(time.perf_counter())
+            done.set()
+    done.set()
+
+
+def measure_startup(exe_path, runs=5, timeout=30):
+    """以无界面模式启动打包后的程序，测量从启动到键盘监听就绪的耗时(毫秒)
+
+    每次使用空的设置目录；第一次运行用于预热磁盘缓存，不计入结果。
+    """
+    env = dict(os.environ)
+    if sys.platform.startswith('linux') and not env.get('DISPLAY'):
+        # 没有 X 服务器时 pynput 无法连接，使用其空实现，仍包含全部导入和初始化
+        print("没有 DISPLAY，键盘监听使用 pynput 的 dummy 后端")
+        env['PYNPUT_BACKEND'] = 'dummy'
+    times = []
+    for run in range(runs + 1):
+        with tempfile.TemporaryDirectory() as directory:
+            command = [os.path.abspath(exe_path), '--headless',
+                       '--settings', os.path.join(directory, 'settings.json')]
+            start = time.perf_counter()
+            process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                       stderr=subprocess.STDOUT, env=env,
+                                       text=True, encoding='utf-8')
+            # 在线程中读取输出，程序卡住不输出时主线程仍能在超时后结束它
+            lines = []
+            armed_at = []
+            done = threading.Event()
+            reader = threading.Thread(
+                target=_read_output,
+                args=(process.stdout, lines, armed_at, done), daemon=True)
+            reader.start()
+            try:
+                timed_out = not done.wait(timeout)
+            finally:
+                process.terminate()
+                try:
+                    process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+                reader.join(timeout=5)
+            output = ''.join(lines)
+            elapsed = (armed_at[0] - start) * 1000 if armed_at else None
+            if timed_out:
+                output += f"\n{timeout} 秒内没有启动键盘监听，已结束进程"
+        if elapsed is None:
+            print(f"错误: 打包后的程序未能启动键盘监听\n{output}")
+            return None
+        if run:
+            times.append(elapsed)
+    return statistics.median(times)
+
+
+def check_startup(exe_path, key, tolerance=0.2, record_baseline=False):
+    """测量启动耗时并与基线比较，超过基线 tolerance 比例时失败
+
+    指定 record_baseline 时把本次结果记为基线；没有基线时失败，
+    不会把一次可能已经变慢的结果悄悄记为基线。
+    """
+    print("\n=== 检查启动耗时 ===")
+    elapsed = measure_startup(exe_path)
+    if elapsed is None:
+        return False
+    print(f"启动到键盘监听就绪: {elapsed:.0f} ms")
+
+    baselines = {}
+    if os.path.exists(STARTUP_BASELINE_FILE):
+        with open(STARTUP_BASELINE_FILE, 'r', encoding='utf-8') as f:
+            baselines = json.load(f)
+    baseline = baselines.get(key)
+    if record_baseline:
+        baselines[key] = round(elapsed, 1)
+        with open(STARTUP_BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f"已记录启动耗时基线 {key}: {elapsed:.0f} ms")
+        return True
+    if baseline is None:
+        print(f"错误: {STARTUP_BASELINE_FILE} 中没有 {key} 的启动耗时基线，"
+              f"请用 --record-baseline 记录并提交该文件")
+        return False
+
+    limit = baseline * (1 + tolerance)
+    print(f"基线 {key}: {baseline:.0f} ms，允许上限 {limit:.0f} ms")
+    if elapsed > limit:
+        print(f"错误: 启动耗时比基线慢了 {elapsed / baseline - 1:.0%}")
+        return False
     return True
 
 
@@ -134,32 +350,6 @@ def create_dmg():
         return False
 
 
-def create_windows_runtime_hook():
-    """创建 Windows 运行时钩子"""
-    try:
-        with open('windows_runtime_hook.py', 'w', encoding='utf-8') as f:
-            f.write("""
-import os
-import sys
-
-# 确保资源文件路径正确
-def runtime_hook():
-    if getattr(sys, 'frozen', False):
-        # 运行于打包环境
-        bundle_dir = sys._MEIPASS
-    else:
-        # 运行于开发环境
-        bundle_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    # 设置工作目录
-    os.chdir(bundle_dir)
-""")
-        return True
-    except Exception as e:
-        print(f"创建运行时钩子文件时出错: {e}")
-        return False
-
-
 def clean_build():
     """清理构建文件"""
     print("\n=== 清理旧的构建文件 ===")
@@ -169,6 +359,7 @@ def clean_build():
                 shutil.rmtree(dir_name)
                 print(f"已删除: {dir_name}/")
 
+        # windows_runtime_hook.py 是旧版本构建时生成的运行时钩子
         for file_name in ['windows_runtime_hook.py', 'Dota2本色风情.spec']:
             if os.path.exists(file_name):
                 os.remove(file_name)
@@ -185,8 +376,14 @@ def clean_build():
 
 def main():
     parser = argparse.ArgumentParser(description='打包 Dota2本色风情 应用程序')
-    parser.add_argument('--platform', choices=['all', 'macos', 'windows'],
-                        default='all', help='选择打包平台')
+    parser.add_argument('--platform', choices=['all', 'macos', 'windows', 'linux'],
+                        default='all', help='选择打包平台(all 为 macOS 和 Windows)')
+    parser.add_argument('--mode', choices=['onefile', 'onedir'],
+                        help='打包模式，默认 Linux 为 onedir，其余为 onefile')
+    parser.add_argument('--startup-tolerance', type=float, default=0.2,
+                        help='Linux 构建的启动耗时允许超过基线的比例')
+    parser.add_argument('--record-baseline', action='store_true',
+                        help=f'把本次启动耗时记为 {STARTUP_BASELINE_FILE} 中的新基线')
     args = parser.parse_args()
 
     # 显示当前工作目录
@@ -197,19 +394,19 @@ def main():
     # 检查必要文件
     if not os.path.exists('dota2_clipboard.py'):
         print("错误: 找不到主程序文件 dota2_clipboard.py")
-        return
+        return 1
     if not os.path.exists('delicon.svg'):
         print("错误: 找不到图标文件 delicon.svg")
-        return
+        return 1
 
     # 清理旧的构建文件
     if not clean_build():
-        return
+        return 1
 
     success = True
 
     if args.platform in ['all', 'macos']:
-        if not build_macos():
+        if not build_macos(args.mode or 'onefile'):
             success = False
 
     if args.platform in ['all', 'windows']:
@@ -217,7 +414,12 @@ def main():
         if os.path.exists('dist'):
             shutil.rmtree('dist')
             os.makedirs('dist', exist_ok=True)
-        if not build_windows():
+        if not build_windows(args.mode or 'onefile'):
+            success = False
+
+    if args.platform == 'linux':
+        if not build_linux(args.mode or 'onedir', args.startup_tolerance,
+                           args.record_baseline):
             success = False
 
     if success:
@@ -226,10 +428,14 @@ def main():
         if args.platform in ['all', 'macos']:
             print("- macOS DMG: ./Dota2本色风情.dmg")
         if args.platform in ['all', 'windows']:
-            print("- Windows EXE: ./dist/Dota2本色风情.exe")
+            print(f"- Windows EXE: ./{executable_path('windows', args.mode or 'onefile')}")
+        if args.platform == 'linux':
+            print(f"- Linux: ./{executable_path('linux', args.mode or 'onedir')}")
+        return 0
     else:
         print("\n=== 打包过程中出现错误 ===")
+        return 1
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""剪贴板后端: 常驻的写入方式，避免每次复制都启动 xclip/xsel/pbcopy 子进程"""
+import os
+import sys
+import threading
+import time
+
+
+class PyperclipBackend:
+    """pyperclip 写入，在 Linux 上每次都会启动子进程，作为兜底方案
+
+    不读取剪贴板: pyperclip.paste 同样要启动子进程，剪贴板历史只记录本程序写入的内容。
+    """
+    name = "pyperclip"
+
+    def __init__(self):
+        import pyperclip
+        self._copy = pyperclip.copy
+
+    def write(self, text):
+        self._copy(text)
+
+    def close(self):
+        pass
+
+
+class HelperProcessBackend:
+    """常驻的助手进程，按行接收 JSON 编码的文本并写入剪贴板
+
+    不能读取剪贴板，剪贴板历史只能记录本程序写入的内容。
+    """
+    name = "helper"
+
+    def __init__(self):
+        import json
+        import subprocess
+        self._encode = json.dumps
+        self._process = subprocess.Popen(
+            helper_command(), stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL, encoding="utf-8")
+
+    def write(self, text):
+        self._process.stdin.write(self._encode(text) + "\n")
+        self._process.stdin.flush()
+
+    def close(self):
+        import subprocess
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            self._process.kill()
+
+
+class FakeBackend:
+    """测试用后端，只记录写入的文本和时间"""
+    name = "fake"
+
+    def __init__(self):
+        self.writes = []
+
+    def write(self, text):
+        self.writes.append((text, time.perf_counter_ns()))
+
+    @property
+    def text(self):
+        return self.writes[-1][0] if self.writes else None
+
+    def read(self):
+        return self.text
+
+    def close(self):
+        pass
+
+
+BACKENDS = {
+    "pyperclip": PyperclipBackend,
+    "helper": HelperProcessBackend,
+    "fake": FakeBackend,
+}
+
+
+def register_backend(name, factory):
+    """注册额外的后端，例如界面提供的 QClipboard 后端"""
+    BACKENDS[name] = factory
+
+
+def default_backend_name():
+    if "qt" in BACKENDS:
+        return "qt"
+    # Windows 与装有 pyobjc 的 macOS 上 pyperclip 本身不启动子进程
+    if sys.platform.startswith("linux"):
+        return "helper"
+    return "pyperclip"
+
+
+def create_backend(name="auto"):
+    """按名字创建后端，失败时退回 pyperclip"""
+    if name == "auto":
+        name = default_backend_name()
+    try:
+        return BACKENDS[name]()
+    except Exception as e:
+        print(f"剪贴板后端 {name} 不可用: {e}，改用 pyperclip")
+        return PyperclipBackend()
+
+
+class ClipboardWriter:
+    """在独立线程中写剪贴板，连续触发时只写最后一条"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.coalesced = 0
+        # metrics.Metrics，为 None 时不记录写入耗时
+        self.metrics = None
+        # clipboard_history.ClipboardHistory，为 None 时写入前不读取剪贴板
+        self.history = None
+        # 最近一次交给后端的文本与后端写入完成的文本，供自动发送等待写入完成
+        self._latest = None
+        self._written = None
+        self._written_changed = threading.Condition()
+        if getattr(backend, "coalesces", False):
+            backend.on_written = self._mark_written
+        self._pending = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+
+    def set_metrics(self, metrics):
+        """启用或关闭写入耗时统计，自己合并写入的后端在它写入时记录"""
+        self.metrics = metrics
+        if getattr(self.backend, "coalesces", False):
+            self.backend.metrics = metrics
+
+    def set_history(self, history):
+        """启用或关闭剪贴板历史，自己合并写入的后端在它写入前记录"""
+        self.history = history
+        if getattr(self.backend, "coalesces", False):
+            self.backend.history = history
+
+    @property
+    def latest(self):
+        """最近一次交给后端的文本"""
+        return self._latest
+
+    def copy(self, text):
+        self._latest = text
+        # 后端自己负责合并(例如在主线程写入的 QClipboard)时直接交给它
+        if getattr(self.backend, "coalesces", False):
+            self.backend.write(text)
+            return
+        with self._lock:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = text
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="clipboard-writer", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                text, self._pending = self._pending, None
+            if text is not None:
+                try:
+                    self._write(text)
+                except Exception as e:
+                    # 兜底的 pyperclip 也写入失败时只丢弃这一条，写入线程继续运行
+                    print(f"写入剪贴板失败: {e}")
+            if self._closed:
+                break
+
+    def _write(self, text):
+        history = self.history
+        if history is not None and not history.before_write(self._previous(), text):
+            return
+        metrics = self.metrics
+        if metrics is not None:
+            start = time.perf_counter_ns()
+        try:
+            self.backend.write(text)
+            if metrics is not None:
+                metrics.write.observe(time.perf_counter_ns() - start)
+            self._mark_written(text)
+        except Exception as e:
+            if isinstance(self.backend, PyperclipBackend):
+                print(f"写入剪贴板失败: {e}")
+                return
+            print(f"剪贴板后端 {self.backend.name} 写入失败: {e}，改用 pyperclip")
+            self.backend.close()
+            self.backend = PyperclipBackend()
+            self.backend.write(text)
+            self._mark_written(text)
+
+    def _previous(self):
+        """写入前剪贴板的内容，后端不能读取或读取失败时为上次写入的内容"""
+        read = getattr(self.backend, "read", None)
+        if read is not None:
+            try:
+                return read()
+            except Exception as e:
+                print(f"读取剪贴板失败: {e}")
+        return self._written
+
+    def _mark_written(self, text):
+        with self._written_changed:
+            self._written = text
+            self._written_changed.notify_all()
+
+    def wait_written(self, text, timeout):
+        """等待 text 写入剪贴板，之后又复制了其他文本时不再等待；超时返回 False"""
+        with self._written_changed:
+            return self._written_changed.wait_for(
+                lambda: self._written is text or self._latest is not text,
+                timeout)
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self.backend.close()
+
+
+def helper_command():
+    if getattr(sys, "frozen", False):
+        # 打包后没有独立的脚本文件，由主程序处理该参数
+        return [sys.executable, "--clipboard-helper"]
+    return [sys.executable, os.path.abspath(__file__)]
+
+
+def serve():
+    """助手进程入口: 从标准输入读取文本，常驻持有剪贴板内容"""
+    import json
+    if os.name != "nt":
+        try:
+            from PyQt6.QtCore import QSocketNotifier
+            from PyQt6.QtGui import QGuiApplication
+        except ImportError:
+            pass
+        else:
+            _serve_qt(QGuiApplication, QSocketNotifier)
+            return
+    import pyperclip
+    for line in sys.stdin:
+        pyperclip.copy(json.loads(line))
+
+
+def _serve_qt(QGuiApplication, QSocketNotifier):
+    import json
+    app = QGuiApplication([sys.argv[0]])
+    clipboard = app.clipboard()
+    fd = sys.stdin.fileno()
+    buffer = b""
+
+    def on_ready():
+        nonlocal buffer
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            app.quit()
+            return
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if lines:
+            # 一次读到多条时只保留最后一条
+            clipboard.setText(json.loads(lines[-1]))
+
+    notifier = QSocketNotifier(fd, QSocketNotifier.Type.Read)
+    notifier.activated.connect(on_ready)
+    app.exec()
+
+
+if __name__ == "__main__":
+    serve()
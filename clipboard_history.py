@@ -0,0 +1,196 @@
+"""剪贴板历史: 每次写入前记下被替换的内容，可用快捷键或延时自动恢复
+
+历史是定长的环形缓冲区，槽位和大小数组在创建时就分配好，记录和取出只是
+替换槽位中的引用、修改几个计数，不创建列表等对象。记录在剪贴板写入线程
+(或 Qt 后端的主线程)中进行，恢复快捷键与其他命令一样在分发线程中执行，
+键盘钩子线程不接触历史。被替换的内容就是本程序上一次写入的文本时，保存的是
+那个字符串对象本身，反复触发同一条短语不会在历史中留下多个副本；用户自己复制
+的内容照原样保存，超过上限后即可释放。
+"""
+import sys
+import threading
+import time
+from array import array
+
+# settings.json 的 clipboard_history 中缺省的选项
+DEFAULT_HISTORY_OPTIONS = {
+    # 最多保存的条数，为 0(默认)时不记录历史，写入前也不读取剪贴板
+    "capacity": 0,
+    # 历史中文本占用的内存上限(字节)，超过时丢弃最早的内容
+    "max_bytes": 1_048_576,
+    # 恢复为上一次被替换的剪贴板内容，连续按下依次往前恢复
+    "restore_hotkey": "cmd+alt+z",
+    # 大于 0 时，触发短语这么长时间(毫秒)之后自动恢复触发前的剪贴板内容
+    "auto_restore_ms": 0,
+}
+
+
+class ClipboardHistory:
+    """被替换的剪贴板内容，最新的在最后；超过条数或字节上限时丢弃最早的
+
+    写入剪贴板前调用 before_write(当前内容, 新内容)。take() 取出的内容
+    再写回剪贴板时不会被当作被替换的内容记录。记录和取出可能在不同线程中，
+    都在锁内完成。
+    """
+
+    def __init__(self, capacity=20, max_bytes=DEFAULT_HISTORY_OPTIONS["max_bytes"]):
+        self._lock = threading.Lock()
+        self._slots = []
+        self._head = 0
+        self.count = 0
+        self.bytes = 0
+        # 累计记录的次数，只增不减，自动恢复用它计算一次连续触发记录了几条
+        self.pushed = 0
+        # take() 取出、正在写回的文本，以及写回前剪贴板应有的内容
+        self._restoring = None
+        self._expected = None
+        # 上一次写入剪贴板的文本
+        self._written = None
+        self.resize(capacity, max_bytes)
+
+    def resize(self, capacity, max_bytes):
+        """修改容量与字节上限，保留最新的内容"""
+        with self._lock:
+            items = self._items()
+            self.capacity = max(int(capacity), 1)
+            self.max_bytes = int(max_bytes)
+            self._slots = [None] * self.capacity
+            self._sizes = array("q", [0]) * self.capacity
+            self._head = self.count = self.bytes = 0
+            for text in items[-self.capacity:]:
+                self._push(text)
+
+    def _items(self):
+        slots, capacity = self._slots, len(self._slots)
+        return [slots[(self._head - self.count + i) % capacity]
+                for i in range(self.count)]
+
+    def items(self):
+        """从早到晚的全部内容"""
+        with self._lock:
+            return self._items()
+
+    def __len__(self):
+        return self.count
+
+    def push(self, text):
+        with self._lock:
+            self._push(text)
+
+    def _push(self, text):
+        size = sys.getsizeof(text)
+        if not text or size > self.max_bytes:
+            return
+        slots, sizes, capacity = self._slots, self._sizes, self.capacity
+        while self.count and (self.count == capacity
+                              or self.bytes + size > self.max_bytes):
+            oldest = (self._head - self.count) % capacity
+            slots[oldest] = None
+            self.bytes -= sizes[oldest]
+            self.count -= 1
+        head = self._head
+        slots[head] = text
+        sizes[head] = size
+        self._head = (head + 1) % capacity
+        self.count += 1
+        self.bytes += size
+        self.pushed += 1
+
+    def take(self, count=1, expected=None):
+        """取出最新的 count 条，返回其中最早的一条；不够 count 条时不取出，返回 None
+
+        expected 不为空时，写回前剪贴板的内容已经不是 expected(用户
+        自己复制了别的内容)就放弃写回。
+        """
+        with self._lock:
+            if count < 1 or count > self.count:
+                return None
+            slots, sizes, capacity = self._slots, self._sizes, self.capacity
+            for _ in range(count):
+                self._head = (self._head - 1) % capacity
+                text = slots[self._head]
+                slots[self._head] = None
+                self.bytes -= sizes[self._head]
+                self.count -= 1
+            self._restoring = text
+            self._expected = expected
+            return text
+
+    def before_write(self, previous, text):
+        """text 即将写入剪贴板，previous 为当前内容(无法读取时为上次写入的内容)
+
+        记录被替换的内容；text 是 take() 取出的内容时不记录。返回 False 表示放弃写入。
+        """
+        with self._lock:
+            written, self._written = self._written, text
+            if previous is not written and previous == written:
+                # 读回的是本程序写入的文本，保存原来的对象，不另存一份
+                previous = written
+            if text is self._restoring:
+                expected = self._expected
+                self._restoring = self._expected = None
+                if expected is None or previous is None or previous == expected:
+                    return True
+                # 用户已经复制了别的内容，放弃恢复，取出的内容放回历史
+                self._push(text)
+                return False
+            if previous is not None and previous != text:
+                self._push(previous)
+            return True
+
+
+class ClipboardRestorer:
+    """触发短语 delay 秒后把剪贴板恢复为触发前的内容
+
+    连续触发时从最后一次重新计时，到时恢复第一次触发前的内容，
+    中间各条短语不留在历史中。schedule() 在分发线程中调用。
+    """
+
+    def __init__(self, history, clipboard, delay):
+        self.history = history
+        self.clipboard = clipboard
+        self.delay = delay
+        self.restored = 0
+        self._deadline = None
+        self._start = 0
+        self._closed = False
+        self._changed = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name="clipboard-restore", daemon=True)
+        self._thread.start()
+
+    def schedule(self):
+        with self._changed:
+            if self._deadline is None:
+                # 这次触发写入前已记录的条数，之后记录的第一条就是触发前的内容
+                self._start = self.history.pushed
+            self._deadline = time.monotonic() + self.delay
+            self._changed.notify()
+
+    def cancel(self):
+        with self._changed:
+            self._deadline = None
+
+    def close(self):
+        with self._changed:
+            self._closed = True
+            self._changed.notify()
+        self._thread.join(timeout=1)
+
+    def _run(self):
+        with self._changed:
+            while True:
+                while self._deadline is None and not self._closed:
+                    self._changed.wait()
+                if self._closed:
+                    return
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._changed.wait(remaining)
+                    continue
+                self._deadline = None
+                text = self.history.take(self.history.pushed - self._start,
+                                         self.clipboard.latest)
+                if text is not None:
+                    self.clipboard.copy(text)
+                    self.restored += 1
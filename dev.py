@@ -1,44 +1,206 @@
+"""开发模式: 修改代码后在同一进程内重新载入改动的模块并重建窗口
+
+PyQt6 只导入一次，条目等状态从旧的快捷键服务转交给新的服务；
+重新载入失败时才退回到完整重启。
+"""
+import ast
+import importlib
+import os
+import signal
 import sys
 import time
-import subprocess
-from watchdog.observers import Observer
+import traceback
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QApplication, QStyleFactory
 from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MAIN_MODULE = "dota2_clipboard"
 
 
 class ChangeHandler(FileSystemEventHandler):
-    def __init__(self):
-        self.process = None
-        self.restart_program()
+    """把 .py 文件的变化转交给界面线程，编辑器原子保存时按目标路径判断"""
+
+    # 导入模块时读取文件也会产生打开、关闭事件，只关心写入
+    EVENT_TYPES = {"modified", "created", "moved"}
+
+    def __init__(self, notify):
+        self.notify = notify
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in self.EVENT_TYPES:
+            return
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            path = os.fsdecode(path)
+            if path.endswith(".py"):
+                self.notify(os.path.abspath(path))
+
+
+def project_modules():
+    """已导入的项目模块: 模块名 -> 文件路径"""
+    modules = {}
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if (name != "__main__" and path
+                and os.path.dirname(os.path.abspath(path)) == ROOT):
+            modules[name] = os.path.abspath(path)
+    return modules
+
+
+def imported_names(path):
+    """文件中导入的顶层模块名，包括函数内的延迟导入"""
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    return names
+
 
-    def restart_program(self):
-        if self.process:
-            self.process.kill()
-            self.process.wait()
+def stale_modules(changed_paths):
+    """改动的模块以及直接或间接导入了它们的模块"""
+    modules = project_modules()
+    dependents = {name: set() for name in modules}
+    for name, path in modules.items():
+        for imported in imported_names(path):
+            if imported in dependents:
+                dependents[imported].add(name)
+    pending = [name for name, path in modules.items() if path in changed_paths]
+    stale = set(pending)
+    while pending:
+        for dependent in dependents[pending.pop()]:
+            if dependent not in stale:
+                stale.add(dependent)
+                pending.append(dependent)
+    return stale
 
-        # 启动主程序
-        self.process = subprocess.Popen([sys.executable, 'dota2_clipboard.py'])
 
-    def on_modified(self, event):
-        if event.src_path.endswith('.py'):
-            print(f"\n检测到文件变化: {event.src_path}")
-            print("重启应用...")
-            self.restart_program()
+class DevRunner(QObject):
+    """常驻的 Qt 进程，文件变化合并一段时间后重新载入"""
+
+    file_changed = pyqtSignal(str)
+
+    def __init__(self, app, delay=300):
+        super().__init__()
+        self.app = app
+        self.service = None
+        self.window = None
+        self.changed = set()
+        # 一次保存往往产生多个事件，最后一个事件之后再等待 delay 毫秒
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.reload)
+        self.file_changed.connect(self.on_file_changed)
+
+    def on_file_changed(self, path):
+        self.changed.add(path)
+        self.timer.start()
+
+    def reload(self):
+        changed, self.changed = self.changed, set()
+        for path in sorted(changed):
+            print(f"\n检测到文件变化: {os.path.relpath(path, ROOT)}")
+        start = time.perf_counter()
+        try:
+            if self.service is None:
+                # 上次启动失败，已导入的项目模块可能不完整，全部重新导入
+                stale = set(project_modules()) | {MAIN_MODULE}
+            else:
+                stale = stale_modules(changed)
+            if not stale:
+                print("改动的文件未被程序使用，不需要重新载入")
+                return
+            self.start_app(stale)
+        except Exception:
+            traceback.print_exc()
+            print("重新载入失败，完整重启...")
+            self.restart()
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"重新载入 {len(stale)} 个模块并重建窗口，用时 {elapsed:.0f} ms: "
+              f"{', '.join(sorted(stale))}")
+
+    def start_app(self, stale=()):
+        """导入(或重新导入 stale 中的)模块，用旧服务的状态创建新服务和窗口"""
+        for name in stale:
+            sys.modules.pop(name, None)
+        main_module = importlib.import_module(MAIN_MODULE)
+        service_module = importlib.import_module("service")
+
+        settings = None
+        geometry = None
+        if self.service is not None:
+            settings = self.service.settings_snapshot()
+            geometry = self.window.geometry()
+            self.close_app()
+
+        service = service_module.HotkeyService()
+        service.load(settings)
+        try:
+            service.start(watch=True)
+            window = main_module.ClipboardManager(service)
+        except Exception:
+            service.stop()
+            raise
+        if geometry is not None:
+            window.setGeometry(geometry)
+        window.show()
+        self.service, self.window = service, window
+
+    def close_app(self):
+        # 停止监听与后台线程，并写入尚未保存的设置
+        if self.service is not None:
+            self.service.stop()
+        if self.window is not None:
+            self.window.hide()
+            self.window.deleteLater()
+        self.service = None
+        self.window = None
+
+    def restart(self):
+        try:
+            self.close_app()
+        except Exception:
+            traceback.print_exc()
+        os.execv(sys.executable, [sys.executable] + sys.argv)
 
 
 if __name__ == "__main__":
     print("启动开发模式...")
-    print("监控文件变化中...")
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    app = QApplication(sys.argv)
+    app.setStyle(QStyleFactory.create("Fusion"))
+    runner = DevRunner(app)
 
-    event_handler = ChangeHandler()
     observer = Observer()
-    observer.schedule(event_handler, path='.', recursive=False)
+    observer.schedule(ChangeHandler(runner.file_changed.emit), path=ROOT,
+                      recursive=False)
     observer.start()
+    print("监控文件变化中...")
 
     try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
+        runner.start_app()
+    except Exception:
+        # 代码有错误时保持运行，修改后再重新载入
+        traceback.print_exc()
+        print("启动失败，等待文件修改...")
+    # 窗口关闭后也不退出，按 Ctrl+C 结束
+    app.setQuitOnLastWindowClosed(False)
+    signal.signal(signal.SIGINT, lambda *args: app.quit())
+    # 事件循环中定期回到 Python，以便处理 Ctrl+C
+    interrupt_timer = QTimer()
+    interrupt_timer.timeout.connect(lambda: None)
+    interrupt_timer.start(200)
+    try:
+        app.exec()
+    finally:
         observer.stop()
-        if event_handler.process:
-            event_handler.process.kill()
-    observer.join()
+        runner.close_app()
+        observer.join()
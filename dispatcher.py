@@ -0,0 +1,359 @@
+"""键盘事件分发: 钩子回调只维护按键状态并把可能触发的按键入队，匹配和复制在工作线程中完成"""
+import queue
+import threading
+import time
+import traceback
+
+from hotkeys import (MODIFIER_ALIASES, MODIFIER_ALL, MODIFIER_KEY_BITS,
+                     TriggerTable, signature_to_hotkey)
+
+PRESS = 0
+RECORD = 1
+
+# 录制多步快捷键时最多的步数；录到一步后按回车立即结束
+MAX_SEQUENCE_STEPS = 4
+RECORD_DONE = (0, "enter")
+
+# 松开后没有其他按键事件、这么短时间内又按下同一个键时视为自动重复
+# (X11 的自动重复会在每次按下之间插入松开事件)
+REPEAT_GAP_NS = 20_000_000
+
+# 入队的按键在钩子回调中读时钟，绑定为模块级名称省去属性查找
+_clock = time.perf_counter_ns
+
+
+def key_id(key):
+    """比对合成按键用的键名: 小写，左右两侧的修饰键不区分"""
+    name = getattr(key, "char", None) or getattr(key, "name", None)
+    if name is None:
+        return None
+    name = name.lower()
+    return MODIFIER_ALIASES.get(name, name)
+
+
+class HotkeyDispatcher:
+    """按键状态只在钩子线程中维护: 修饰键位掩码与按住的可触发按键
+
+    不可能完成任何快捷键的按键(按键表中没有，或当前修饰键组合下不可能)
+    在钩子线程中直接返回，不入队也不分配对象；只有可能触发的按键才把签名入队，
+    由工作线程查表并复制。
+
+    多步快捷键由工作线程沿前缀树推进，每一步只是一次字典查找；等待下一步时
+    把当前节点的按键表交给钩子线程放行，超时或按了其他键后回到根节点。
+    """
+
+    def __init__(self, index, copy, on_recorded=None, render=None):
+        self.index = index
+        self.copy = copy
+        # 将条目文本渲染为最终复制的内容(模板变量替换)，结果已缓存
+        self.render = render
+        # 快捷键签名 -> 无参数的函数，例如切换配置；优先于短语匹配
+        self.commands = {}
+        self._command_triggers = {}
+        # 录制的回调 on_recorded(快捷键, 是否结束)，每录到一步调用一次，
+        # 在工作线程中调用；界面需通过 Qt 信号转到主线程
+        self.on_recorded = on_recorded
+        self.recording = False
+        self._recorded = []
+        # 多步快捷键相邻两步之间的最长间隔，录制时同样用它判断是否结束
+        self.sequence_timeout_ns = 1_000_000_000
+        self._sequence = None
+        self._sequence_ns = 0
+        # 等待下一步时可以放行的按键，只由工作线程替换引用
+        self._sequence_triggers = None
+        self.modifiers = 0
+        self.held = set()
+        # 最近一次入队的按键及其松开时间，用于识别带松开事件的自动重复
+        self._fired_key = None
+        self._released_key = None
+        self._released_ns = 0
+        # 同一快捷键两次触发之间的最小间隔，只在工作线程中使用
+        self.min_interval_ns = 0
+        self._last_fired = {}
+
+        # 省掉的剪贴板写入: 自动重复的按下(钩子线程)与间隔内的再次触发(工作线程)
+        self.repeats = 0
+        self.throttled = 0
+        self._events = queue.SimpleQueue()
+        self._thread = None
+
+        # 入队的按键入队本身的耗时统计(纳秒)，只由钩子线程写入
+        self.hook_calls = 0
+        self.hook_total_ns = 0
+        self.hook_max_ns = 0
+        # metrics.Metrics，为 None 时不记录耗时直方图；各线程只读取一次引用
+        self.metrics = None
+        # 自动发送: paste(文本, 按键时间)，条目的 auto_paste 为真时在复制后调用
+        self.paste = None
+        # 还要忽略的合成按键事件 (是否按下, 键名)(自动发送产生)及其截止时间
+        self._synthetic = None
+        self._synthetic_deadline = 0
+        # 收到过 injected 为真的事件，说明 pynput 后端支持该标志
+        self._injected_flag = False
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="hotkey-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._events.put(None)
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def set_commands(self, commands):
+        """commands: 快捷键签名 -> 函数"""
+        self._command_triggers = TriggerTable(commands).table
+        self.commands = commands
+
+    # ---- 以下两个方法运行在 pynput 的钩子线程中 ----
+
+    def on_press(self, key, injected=None):
+        """injected: pynput 1.8 起传入，是否是程序合成的按键；更早的版本不传"""
+        if self._synthetic and self._skip_synthetic(True, key, injected):
+            return
+        # 上一个事件是否是刚触发过的按键的松开，任何其他事件都会清除
+        released, self._released_key = self._released_key, None
+        name = getattr(key, "char", None)
+        if name is None:
+            name = getattr(key, "name", None)
+            bit = MODIFIER_KEY_BITS.get(name)
+            if bit is not None:
+                self.modifiers |= bit
+                return
+            if name is None:
+                return
+        if self.recording:
+            # 录制期间按住不放只记一次，之后的各步由工作线程合并
+            key_name = name.lower()
+            if key_name not in self.held:
+                self.held.add(key_name)
+                self._push(RECORD, (self.modifiers, key_name), _clock())
+            return
+
+        modifiers = self.modifiers
+        trigger = self.index.triggers.get(name)
+        if trigger is None or not trigger[1][modifiers]:
+            # 切换配置等命令的按键、多步快捷键的下一步单独成表
+            trigger = self._command_triggers.get(name) or trigger
+            sequence = self._sequence_triggers
+            if sequence is not None:
+                step = sequence.get(name)
+                if step is not None and step[1][modifiers]:
+                    trigger = step
+                else:
+                    # 等待下一步时按了其他键，多步快捷键作废
+                    self._sequence_triggers = None
+            if trigger is None:
+                return
+        key_name, accept = trigger
+        held = self.held
+        if not accept[modifiers]:
+            held.add(key_name)
+            return
+        # 按住不放时系统会不断发送按下事件: 没有松开就再次按下，
+        # 或松开后紧接着又立即按下(X11)，都只算一次物理按键
+        if key_name in held or (
+                key_name is released and
+                time.perf_counter_ns() - self._released_ns < REPEAT_GAP_NS):
+            self.repeats += 1
+            held.add(key_name)
+            return
+        held.add(key_name)
+        self._fired_key = key_name
+        keys = key_name if len(held) == 1 else frozenset(held)
+        # 通过按键表的按键才读时钟，普通打字不读；以它为按下时间
+        self._push(PRESS, (modifiers, keys), _clock())
+
+    def on_release(self, key, injected=None):
+        if self._synthetic and self._skip_synthetic(False, key, injected):
+            return
+        self._released_key = None
+        name = getattr(key, "char", None)
+        if name is None:
+            name = getattr(key, "name", None)
+            bit = MODIFIER_KEY_BITS.get(name)
+            if bit is not None:
+                self.modifiers &= MODIFIER_ALL ^ bit
+                return
+            if name is None:
+                return
+        held = self.held
+        if held:
+            trigger = (self.index.triggers.get(name)
+                       or self._command_triggers.get(name)
+                       or (self._sequence_triggers or {}).get(name))
+            # 按下后按键表可能已经变化(切换配置)，找不到时按规范化的键名删除
+            key_name = trigger[0] if trigger else name.lower()
+            held.discard(key_name)
+            if key_name is self._fired_key:
+                self._released_key = key_name
+                self._released_ns = time.perf_counter_ns()
+
+    def _skip_synthetic(self, pressed, key, injected):
+        """是否是自动发送合成的按键事件，是则忽略
+
+        pynput 的 injected 标志只有部分后端支持，不支持的后端总是给出 False，
+        因此收到过为真的标志之后才相信 False 是真实按键。没有可信的标志时
+        与预期的按键逐个比对，其余事件照常处理，不会吞掉期间真实的按键。
+        """
+        if time.perf_counter_ns() > self._synthetic_deadline:
+            # 合成的按键没有全部回到钩子(或已经错过)，不再忽略真实按键
+            self._synthetic = None
+            return False
+        if injected:
+            self._injected_flag = True
+        elif injected is not None and self._injected_flag:
+            return False
+        try:
+            self._synthetic.remove((pressed, key_id(key)))
+        except ValueError:
+            # 不是预期的按键；带有 injected 标志的仍是合成的(键名与预期不同)
+            return bool(injected)
+        return True
+
+    def _push(self, kind, signature, start):
+        """入队，start 为决定入队时读的时钟；统计入队本身的耗时
+
+        只有通过按键表的按键才读时钟并记入指标。
+        """
+        self._events.put((kind, signature, start))
+        elapsed = _clock() - start
+        self.hook_calls += 1
+        self.hook_total_ns += elapsed
+        if elapsed > self.hook_max_ns:
+            self.hook_max_ns = elapsed
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.hook.observe(elapsed)
+
+    def start_recording(self):
+        """开始录制新的快捷键，每个普通键与当时按住的修饰键为一步
+
+        一步之后在 sequence_timeout_ns 内没有新的一步、按回车或达到
+        MAX_SEQUENCE_STEPS 步时结束。
+        """
+        self._recorded = []
+        self.recording = True
+
+    def expect_synthetic(self, events, timeout_ns):
+        """events 为将要合成的按键事件 (是否按下, 按键)，timeout_ns 内忽略它们"""
+        self._synthetic_deadline = time.perf_counter_ns() + timeout_ns
+        self._synthetic = [(pressed, key_id(key)) for pressed, key in events]
+
+    def suppression_stats(self):
+        """省掉的剪贴板写入次数"""
+        return {"repeats": self.repeats, "throttled": self.throttled}
+
+    def hook_stats(self):
+        """返回入队按键的钩子回调次数，以及入队的平均和最大耗时(微秒)"""
+        calls = self.hook_calls
+        mean = self.hook_total_ns / calls / 1000 if calls else 0.0
+        return {"calls": calls, "mean_us": mean,
+                "max_us": self.hook_max_ns / 1000}
+
+    # ---- 以下运行在工作线程中 ----
+
+    def _run(self):
+        while True:
+            try:
+                # 录制到一半时等待下一步，超时即结束录制
+                event = self._events.get(timeout=(
+                    self.sequence_timeout_ns / 1e9 if self._recorded else None))
+            except queue.Empty:
+                self._finish_recording()
+                continue
+            if event is None:
+                break
+            try:
+                self.handle_event(*event)
+            except Exception:
+                traceback.print_exc()
+
+    def handle_event(self, kind, signature, timestamp):
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.queue.observe(time.perf_counter_ns() - timestamp)
+        if kind == RECORD:
+            self._record(signature)
+            return
+        self.check_hotkeys(signature, timestamp)
+
+    def _record(self, signature):
+        steps = self._recorded
+        if not self.recording:
+            # 录制结束前已经入队的按键
+            return
+        if steps and signature == RECORD_DONE:
+            self._finish_recording()
+            return
+        steps.append(signature)
+        if len(steps) >= MAX_SEQUENCE_STEPS:
+            self._finish_recording()
+        elif self.on_recorded:
+            self.on_recorded(signature_to_hotkey(tuple(steps)), False)
+
+    def _finish_recording(self):
+        steps, self._recorded = self._recorded, []
+        self.recording = False
+        if steps and self.on_recorded:
+            self.on_recorded(signature_to_hotkey(
+                steps[0] if len(steps) == 1 else tuple(steps)), True)
+
+    def check_hotkeys(self, signature, timestamp=None):
+        metrics = self.metrics
+        if metrics is not None:
+            start = time.perf_counter_ns()
+        index = self.index
+        command = entry = node = None
+        now = time.perf_counter_ns() if timestamp is None else timestamp
+        pending = self._sequence
+        if pending is not None:
+            # 等待多步快捷键的下一步: 超时或按了其他键(钩子线程会清掉放行表)
+            # 都回到根节点
+            if (self._sequence_triggers is pending.triggers and
+                    now - self._sequence_ns <= self.sequence_timeout_ns):
+                node = pending.children.get(signature)
+            self._sequence = self._sequence_triggers = None
+        if node is None:
+            command = self.commands.get(signature)
+            if command is None:
+                entry = index.get(signature)
+                if entry is None:
+                    node = index.sequences.children.get(signature)
+        if node is not None:
+            # 某一步同时是较短快捷键的结尾时(前缀冲突)较短的优先
+            entry = node.entry
+            if entry is None:
+                self._sequence = node
+                self._sequence_ns = now
+                self._sequence_triggers = node.triggers
+            else:
+                signature = node.signature
+        if metrics is not None:
+            metrics.match.observe(time.perf_counter_ns() - start)
+        if command is None and entry is None:
+            return
+        if timestamp is not None and self.min_interval_ns:
+            last = self._last_fired.get(signature)
+            if last is not None and timestamp - last < self.min_interval_ns:
+                self.throttled += 1
+                return
+            self._last_fired[signature] = timestamp
+        if command is not None:
+            command()
+        else:
+            text = entry["text"]
+            if self.render is not None:
+                text = self.render(text)
+            self.copy(text)
+            if self.paste is not None and entry.get("auto_paste"):
+                self.paste(text, now)
+            if metrics is not None:
+                histogram = index.latency.get(signature)
+                if histogram is not None:
+                    # 从按下(直接调用时从查表开始)到交给剪贴板写入的耗时
+                    histogram.observe(time.perf_counter_ns()
+                                      - (start if timestamp is None else timestamp))
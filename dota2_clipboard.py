@@ -1,17 +1,88 @@
 import sys
-import json
-import platform
-from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
-                             QHBoxLayout, QPushButton, QLineEdit, QTableWidget,
-                             QTableWidgetItem, QHeaderView, QLabel, QMessageBox,
-                             QFrame, QStyle, QStyleFactory, QScrollArea)
-from PyQt6.QtCore import Qt, QSize
-from PyQt6.QtGui import QIcon, QFont, QPalette, QColor
-from pynput import keyboard
-from pynput.keyboard import Key, KeyCode
-import pyperclip
-import subprocess
+from profiling import StartupProfiler, runtime_profiler
+
+# 需要在导入 Qt 之前开始计时
+STARTUP = StartupProfiler(enabled="--startup-profile" in sys.argv)
+STARTUP.track_imports()
+
+if __name__ == "__main__" and "--headless" in sys.argv:
+    # 无界面模式不导入 PyQt6
+    from headless import main
+    sys.exit(main(sys.argv[1:], STARTUP))
+
 import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
+                             QHBoxLayout, QPushButton, QLineEdit, QTableView,
+                             QHeaderView, QLabel, QFrame, QStyle,
+                             QStyleFactory, QStyledItemDelegate, QComboBox,
+                             QInputDialog, QDialog, QCheckBox, QFileDialog,
+                             QMessageBox, QMenu, QProgressDialog)
+from PyQt6.QtCore import (Qt, QSize, QObject, QRect, QRectF, QEvent, QTimer,
+                          QAbstractTableModel, QModelIndex, pyqtSignal)
+from PyQt6.QtGui import QFont, QColor, QPainter
+from hotkeys import CONFLICT_LABELS, key_to_string, normalize_hotkey
+from metrics import write_report
+from phrase_io import FILE_FILTERS, PhraseImporter, export_entries
+from clipboard_backends import register_backend
+from search_index import SearchIndex
+from service import DELETE, EDIT, INSERT, HotkeyService
+from settings_store import SETTINGS_FILE
+import resources
+import theme
+
+
+class QtClipboardBackend(QObject):
+    """在主线程中通过 QClipboard 写入，主线程繁忙时连续触发只写最后一条"""
+    name = "qt"
+    coalesces = True
+    _requested = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self._pending = None
+        self.metrics = None
+        self.history = None
+        # 写入完成的回调，由 ClipboardWriter 设置
+        self.on_written = None
+        self._lock = threading.Lock()
+        # 对象属于主线程，从分发线程发出的信号会排队到主线程执行
+        self._requested.connect(self._flush)
+
+    def write(self, text):
+        with self._lock:
+            scheduled = self._pending is not None
+            self._pending = text
+        if not scheduled:
+            self._requested.emit()
+
+    def _flush(self):
+        with self._lock:
+            text, self._pending = self._pending, None
+        if text is None:
+            return
+        clipboard = QApplication.clipboard()
+        history = self.history
+        if history is not None and not history.before_write(clipboard.text(), text):
+            return
+        metrics = self.metrics
+        if metrics is None:
+            clipboard.setText(text)
+        else:
+            start = time.perf_counter_ns()
+            clipboard.setText(text)
+            metrics.write.observe(time.perf_counter_ns() - start)
+        if self.on_written is not None:
+            self.on_written(text)
+
+    def close(self):
+        self._flush()
+
+
+register_backend("qt", QtClipboardBackend)
 
 
 class ModernButton(QPushButton):
@@ -22,8 +93,7 @@ class ModernButton(QPushButton):
         if delete:
             self.setFixedHeight(28)
             self.setMinimumWidth(70)
-            icon = QIcon("delicon.svg")
-            self.setIcon(icon)
+            self.setIcon(resources.icon(resources.DELETE_ICON))
             self.setIconSize(QSize(14, 14))
             self.setText(" 删除")  # 添加空格使图标和文字有间距
             self.setLayoutDirection(Qt.LayoutDirection.LeftToRight)  # 确保图标在左边
@@ -33,168 +103,416 @@ class ModernButton(QPushButton):
         self.update_style()
 
     def update_style(self):
-        if self.primary:
-            self.setStyleSheet("""
-                QPushButton {
-                    background-color: #6c5ce7;
-                    border: none;
-                    color: white;
-                    padding: 8px 16px;
-                    border-radius: 8px;
-                    font-weight: 500;
-                    font-size: 13px;
-                }
-                QPushButton:hover {
-                    background-color: #5b4cc7;
-                }
-                QPushButton:pressed {
-                    background-color: #4a3cb7;
-                }
-            """)
-        elif self.delete:
-            self.setStyleSheet("""
-                QPushButton {
-                    background-color: #ff4757;
-                    border: none;
-                    color: white;
-                    padding: 4px 12px;
-                    border-radius: 6px;
-                    font-size: 12px;
-                    font-weight: 500;
-                }
-                QPushButton:hover {
-                    background-color: #ff6b81;
-                }
-                QPushButton:pressed {
-                    background-color: #ff4757;
-                }
-                QPushButton:focus {
-                    outline: none;
-                }
-            """)
-        else:
-            self.setStyleSheet("""
-                QPushButton {
-                    background-color: transparent;
-                    border: 1px solid #ff7675;
-                    color: #ff7675;
-                    padding: 4px 12px;
-                    border-radius: 6px;
-                    font-size: 12px;
-                }
-                QPushButton:hover {
-                    background-color: #fff5f5;
-                }
-                QPushButton:pressed {
-                    background-color: #ffe5e5;
-                }
-            """)
+        # 样式由全局主题按 variant 属性选择
+        variant = "primary" if self.primary else "delete" if self.delete else ""
+        theme.set_state(self, "variant", variant)
 
 
 class ModernLineEdit(QLineEdit):
     def __init__(self, parent=None, search=False):
         super().__init__(parent)
         self.setMinimumHeight(36)
-        style = """
-            QLineEdit {
-                border: 1px solid #dfe6e9;
-                border-radius: 8px;
-                padding: 8px 12px;
-                background-color: white;
-                color: #2d3436;
-                font-size: 13px;
-            }
-            QLineEdit:focus {
-                border: 1px solid #6c5ce7;
-                background-color: white;
-            }
-        """
         if search:
-            style = """
-                QLineEdit {
-                    border: none;
-                    border-radius: 8px;
-                    padding: 8px 12px;
-                    background-color: #f5f6fa;
-                    color: #2d3436;
-                    font-size: 13px;
-                }
-                QLineEdit:focus {
-                    background-color: #eee;
-                }
-            """
-        self.setStyleSheet(style)
-
-
-class ModernTable(QTableWidget):
+            self.setProperty("variant", "search")
+
+
+class PhraseTableModel(QAbstractTableModel):
+    """直接以条目列表为数据的表格模型，只有可见行才会被绘制
+
+    rows 为过滤后显示的条目行号(升序)，None 表示显示全部。
+    对外的 editing_row 以及 appending/removing 使用条目行号，
+    视图中的行号需经 entry_row 转换。
+    """
+    HEADERS = ["短语内容", "快捷键", "操作"]
+    # 每次绘制都会查询对齐方式，预先组合好标志
+    ALIGN_LEFT = Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft
+    ALIGN_CENTER = Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignHCenter
+
+    def __init__(self, entries, render=None, parent=None):
+        super().__init__(parent)
+        self.entries = entries
+        # 渲染模板的函数，用于在提示中预览实际复制的内容
+        self.render = render
+        self.rows = None
+        self.editing_row = -1
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.entries) if self.rows is None else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if (orientation == Qt.Orientation.Horizontal
+                and role == Qt.ItemDataRole.DisplayRole):
+            return self.HEADERS[section]
+        return None
+
+    def entry_row(self, row):
+        return row if self.rows is None else self.rows[row]
+
+    def view_row(self, entry_row):
+        """条目在视图中的行号，被过滤掉时返回 -1"""
+        if self.rows is None:
+            return entry_row
+        row = bisect_left(self.rows, entry_row)
+        if row < len(self.rows) and self.rows[row] == entry_row:
+            return row
+        return -1
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        row, column = self.entry_row(index.row()), index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                entry = self.entries[row]
+                # 复制后自动发送到聊天的短语前加标记
+                if entry.get("auto_paste"):
+                    return "⏎ " + entry["text"]
+                return entry["text"]
+            if column == 1:
+                if row == self.editing_row:
+                    return "请按下新的快捷键..."
+                return self.entries[row]["hotkey"]
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            return self.ALIGN_LEFT if column == 0 else self.ALIGN_CENTER
+        elif role == Qt.ItemDataRole.BackgroundRole:
+            if column == 1 and row == self.editing_row:
+                return theme.color("editing")
+        elif role == Qt.ItemDataRole.ToolTipRole:
+            if column == 0 and self.render is not None:
+                text = self.entries[row]["text"]
+                rendered = self.render(text)
+                return rendered if rendered != text else None
+            if column == 1:
+                # 设置快捷键单元格可点击的视觉提示
+                return "点击设置新的快捷键"
+        return None
+
+    def set_entries(self, entries):
+        self.beginResetModel()
+        self.entries = entries
+        self.rows = None
+        self.editing_row = -1
+        self.endResetModel()
+
+    def set_rows(self, rows):
+        """只显示 rows 中的条目，None 表示显示全部"""
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+    @contextmanager
+    def appending(self, count=1):
+        """在 with 块中向条目列表末尾追加 count 条
+
+        过滤时新条目暂不显示，由调用方重新过滤。
+        """
+        if self.rows is not None:
+            yield
+            return
+        row = len(self.entries)
+        self.beginInsertRows(QModelIndex(), row, row + count - 1)
+        try:
+            yield
+        finally:
+            self.endInsertRows()
+
+    @contextmanager
+    def removing(self, row):
+        """在 with 块中从条目列表删除第 row 条"""
+        view_row = self.view_row(row)
+        if view_row != -1:
+            self.beginRemoveRows(QModelIndex(), view_row, view_row)
+        try:
+            yield
+        finally:
+            if self.rows is not None:
+                if view_row != -1:
+                    del self.rows[view_row]
+                for i in range(bisect_left(self.rows, row), len(self.rows)):
+                    self.rows[i] -= 1
+            if row == self.editing_row:
+                self.editing_row = -1
+            elif row < self.editing_row:
+                self.editing_row -= 1
+            if view_row != -1:
+                self.endRemoveRows()
+
+    @contextmanager
+    def changing(self, op):
+        """在 with 块中执行一个 diff_entries 操作(外部修改设置文件时)
+
+        过滤时不逐行通知，由调用方重新过滤。
+        """
+        kind, row, value = op
+        if self.rows is not None:
+            yield
+            return
+        if kind == EDIT:
+            yield
+            self.dataChanged.emit(self.index(row, 0), self.index(row, 1))
+            return
+        if kind == DELETE:
+            self.beginRemoveRows(QModelIndex(), row, row + value - 1)
+        else:
+            self.beginInsertRows(QModelIndex(), row, row + len(value) - 1)
+        try:
+            yield
+        finally:
+            if kind == DELETE:
+                self.endRemoveRows()
+            else:
+                self.endInsertRows()
+
+    def set_editing_row(self, row):
+        previous, self.editing_row = self.editing_row, row
+        for changed in (previous, row):
+            if changed != -1:
+                self.entry_changed(changed)
+
+    def entry_changed(self, row):
+        row = self.view_row(row)
+        if row != -1:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, 1))
+
+
+class DeleteButtonDelegate(QStyledItemDelegate):
+    """在操作列绘制删除按钮，不为每一行创建控件"""
+    delete_requested = pyqtSignal(int)
+
+    BUTTON_WIDTH = 70
+    BUTTON_HEIGHT = 28
+    ICON_SIZE = 14
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.font = QFont()
+        self.font.setPixelSize(12)
+        self.font.setWeight(QFont.Weight.Medium)
+
+    def button_rect(self, cell):
+        return QRect(cell.center().x() - self.BUTTON_WIDTH // 2 + 1,
+                     cell.center().y() - self.BUTTON_HEIGHT // 2 + 1,
+                     self.BUTTON_WIDTH, self.BUTTON_HEIGHT)
+
+    def paint(self, painter, option, index):
+        # 先绘制单元格本身的背景和分隔线
+        super().paint(painter, option, index)
+        rect = self.button_rect(option.rect)
+        hovered = bool(option.state & QStyle.StateFlag.State_MouseOver)
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(theme.color("danger_hover" if hovered else "danger"))
+        painter.drawRoundedRect(QRectF(rect), 6, 6)
+
+        # 图标在左，文字在右
+        size = self.ICON_SIZE
+        icon_rect = QRect(rect.left() + 14, rect.center().y() - 6, size, size)
+        # 各行共用按尺寸缓存的图片，不再每次绘制都渲染 SVG
+        painter.drawPixmap(icon_rect, resources.pixmap(
+            resources.DELETE_ICON, size, painter.device().devicePixelRatioF()))
+        painter.setPen(QColor("white"))
+        painter.setFont(self.font)
+        text_rect = rect.adjusted(icon_rect.width() + 18, 0, 0, 0)
+        painter.drawText(text_rect, Qt.AlignmentFlag.AlignVCenter |
+                         Qt.AlignmentFlag.AlignLeft, "删除")
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and event.button() == Qt.MouseButton.LeftButton
+                and self.button_rect(option.rect).contains(
+                    event.position().toPoint())):
+            self.delete_requested.emit(index.row())
+            return True
+        return False
+
+
+class ModernTable(QTableView):
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setStyleSheet("""
-            QTableWidget {
-                background-color: white;
-                border: none;
-                border-radius: 12px;
-                gridline-color: transparent;
-            }
-            QTableWidget::item {
-                padding: 8px 16px;
-                border-bottom: 1px solid #f0f0f0;
-                color: #2d3436;
-                font-size: 13px;
-            }
-            QTableWidget::item:selected {
-                background-color: #f5f6fa;
-                color: #2d3436;
-            }
-            QHeaderView::section {
-                background-color: white;
-                color: #636e72;
-                padding: 16px;
-                border: none;
-                font-weight: 500;
-                font-size: 13px;
-                border-bottom: 1px solid #dfe6e9;
-            }
-            QHeaderView::section:first {
-                padding-left: 16px;
-            }
-            QTableWidget::item:hover {
-                background-color: #f5f6fa;
-            }
-        """)
         self.setShowGrid(False)
         self.setAlternatingRowColors(False)
         self.verticalHeader().setVisible(False)
-        self.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.horizontalHeader().setHighlightSections(False)
         self.setFrameShape(QFrame.Shape.NoFrame)
+        self.setMouseTracking(True)
 
         # 设置默认行高
         self.verticalHeader().setDefaultSectionSize(52)
         # 设置最小行高
         self.verticalHeader().setMinimumSectionSize(52)
+        # 固定行高，大量条目时无需逐行计算高度
+        self.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+
+
+def format_us(us):
+    return f"{us:.0f} µs" if us < 1000 else f"{us / 1000:.1f} ms"
+
+
+class StatsTableModel(QAbstractTableModel):
+    """统计面板中每条短语的触发次数与耗时，rows 为 metrics_report 中的 entries"""
+    HEADERS = ["短语内容", "触发次数", "p50", "p99"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if (orientation == Qt.Orientation.Horizontal
+                and role == Qt.ItemDataRole.DisplayRole):
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        row = self.rows[index.row()]
+        column = index.column()
+        if column == 0:
+            return row["text"]
+        if column == 1:
+            return str(row["count"])
+        return format_us(row["p50_us"] if column == 2 else row["p99_us"])
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+
+class StatsDialog(QDialog):
+    """统计面板: 打开期间每秒刷新一次指标"""
+    PARTS = [("hook", "键盘钩子回调"), ("queue", "排队等待"),
+             ("match", "查表匹配"), ("write", "剪贴板写入"),
+             ("paste", "按下到自动发送完成")]
+
+    def __init__(self, service, parent=None):
+        super().__init__(parent)
+        self.service = service
+        self.setWindowTitle("触发统计")
+        self.resize(640, 480)
+        layout = QVBoxLayout(self)
+        layout.setSpacing(12)
+        layout.setContentsMargins(20, 20, 20, 20)
+
+        self.enabled_box = QCheckBox("记录触发次数与耗时")
+        self.enabled_box.setChecked(bool(service.settings["metrics"]))
+        self.enabled_box.toggled.connect(self.on_enabled_toggled)
+        layout.addWidget(self.enabled_box)
+
+        self.summary_label = QLabel()
+        self.summary_label.setObjectName("subtitle")
+        layout.addWidget(self.summary_label)
+
+        self.table_model = StatsTableModel(self)
+        self.table = ModernTable()
+        self.table.verticalHeader().setDefaultSectionSize(36)
+        self.table.verticalHeader().setMinimumSectionSize(36)
+        self.table.setModel(self.table_model)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        for column in (1, 2, 3):
+            header.setSectionResizeMode(column, QHeaderView.ResizeMode.Fixed)
+            self.table.setColumnWidth(column, 90)
+        layout.addWidget(self.table, stretch=1)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        for text, slot in (("清零", self.reset), ("导出...", self.export)):
+            button = ModernButton(text)
+            theme.set_state(button, "variant", "subtle")
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        report = self.service.metrics_report()
+        lines = []
+        for part, label in self.PARTS:
+            summary = report[part]
+            lines.append(f"{label}: {summary['count']} 次，"
+                         f"p50 {format_us(summary['p50_us'])}，"
+                         f"p99 {format_us(summary['p99_us'])}，"
+                         f"最大 {format_us(summary['max_us'])}")
+        suppressed = report.get("suppressed")
+        if suppressed:
+            lines.append(f"省掉的剪贴板写入: 自动重复 {suppressed['repeats']} 次，"
+                         f"间隔内再次触发 {suppressed['throttled']} 次，"
+                         f"被下一条覆盖 {suppressed['coalesced']} 次")
+        self.summary_label.setText("\n".join(lines))
+        self.table_model.set_rows(report["entries"])
+
+    def on_enabled_toggled(self, enabled):
+        self.service.set_metrics_enabled(enabled)
+        self.refresh()
+
+    def reset(self):
+        self.service.reset_metrics()
+        self.refresh()
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "导出统计", "metrics.json",
+            "JSON (*.json);;Prometheus 文本 (*.prom)")
+        if not path:
+            return
+        try:
+            write_report(self.service.metrics_report(), path)
+        except OSError as e:
+            QMessageBox.warning(self, "导出失败", str(e))
 
 
 class ClipboardManager(QMainWindow):
-    def __init__(self):
+    # 工作线程录制到新快捷键(或多步快捷键的一步)后，通过信号在主线程更新界面
+    hotkey_recorded = pyqtSignal(str, bool)
+    # 切换配置可能发生在分发线程(切换快捷键)，同样经信号回到主线程
+    profile_changed = pyqtSignal(str)
+    # 设置文件被外部修改: 解析后的设置、预先算好的差异及其基于的条目版本
+    settings_changed = pyqtSignal(object, object, int)
+    # 导入线程解析出一批条目(条目列表, 已读取的比例)以及导入结束(统计)
+    import_batch = pyqtSignal(object, float)
+    import_finished = pyqtSignal(object)
+    NEW_PROFILE = "新建配置..."
+
+    def __init__(self, service=None, settings_path=SETTINGS_FILE,
+                 clipboard_backend=None, listener_factory=None):
+        """service 为已启动的快捷键服务；未传入时按其余参数创建并启动"""
         super().__init__()
+        if service is None:
+            service = HotkeyService(settings_path, clipboard_backend,
+                                    listener_factory)
+            service.load()
+            service.start(watch=True)
+        self.service = service
         self.setWindowTitle("Dota2本色风情")
         self.setGeometry(100, 100, 800, 600)
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: white;
-            }
-            QLabel {
-                color: #2d3436;
-                font-size: 13px;
-            }
-        """)
-
-        # 初始化键盘监听器
-        self.keyboard_listener = None
-        self.current_keys = set()
-        self.hotkey_handlers = {}
-        self.is_recording = False
+        # 整个程序共用一份样式表，只在第一次创建窗口或切换主题时设置
+        theme.apply_theme(QApplication.instance(),
+                          service.settings.get("theme", theme.DEFAULT_THEME))
 
         # 主窗口部件
         main_widget = QWidget()
@@ -211,47 +529,85 @@ class ClipboardManager(QMainWindow):
         title_layout = QVBoxLayout()
         title_layout.setSpacing(4)
         title_label = QLabel("用快捷键复制经典用语，而无需切换游戏窗口")
-        title_label.setStyleSheet("""
-            QLabel {
-                color: #2d3436;
-                font-size: 20px;
-                font-weight: 600;
-            }
-        """)
-        subtitle_label = QLabel("已添加 0 条短语")
-        subtitle_label.setStyleSheet("""
-            QLabel {
-                color: #636e72;
-                font-size: 13px;
-            }
-        """)
+        title_label.setObjectName("title")
+        self.subtitle_label = QLabel("已添加 0 条短语")
+        self.subtitle_label.setObjectName("subtitle")
         title_layout.addWidget(title_label)
-        title_layout.addWidget(subtitle_label)
+        title_layout.addWidget(self.subtitle_label)
         top_layout.addLayout(title_layout)
         top_layout.addStretch()
 
+        # 短语配置，例如天梯、加速模式各用一套
+        self.profile_box = QComboBox()
+        self.profile_box.setObjectName("profileBox")
+        self.profile_box.activated.connect(self.on_profile_selected)
+        self.update_profile_box()
+        top_layout.addWidget(self.profile_box)
+
+        # 搜索框，按短语内容或快捷键过滤
+        self.search_input = ModernLineEdit(search=True)
+        self.search_input.setPlaceholderText("搜索短语或快捷键...")
+        self.search_input.setFixedWidth(240)
+        self.search_input.textChanged.connect(self.apply_filter)
+        top_layout.addWidget(self.search_input)
+
+        # 浅色/深色主题切换
+        self.theme_button = ModernButton("")
+        theme.set_state(self.theme_button, "variant", "subtle")
+        self.theme_button.clicked.connect(self.toggle_theme)
+        self.update_theme_button()
+        top_layout.addWidget(self.theme_button)
+
+        # 触发统计，第一次打开时才创建
+        self.stats_dialog = None
+        stats_button = ModernButton("统计")
+        theme.set_state(stats_button, "variant", "subtle")
+        stats_button.clicked.connect(self.show_stats)
+        top_layout.addWidget(stats_button)
+
+        # 导入导出短语库
+        self.importer = None
+        self.import_start = 0
+        self.import_revision = 0
+        self.import_progress = None
+        for text, slot in (("导入", self.import_phrases),
+                           ("导出", self.export_phrases)):
+            button = ModernButton(text)
+            theme.set_state(button, "variant", "subtle")
+            button.clicked.connect(slot)
+            top_layout.addWidget(button)
+
         main_layout.addLayout(top_layout)
 
         # 创建表格容器
         table_container = QFrame()
-        table_container.setStyleSheet("""
-            QFrame {
-                background-color: white;
-                border: 1px solid #dfe6e9;
-                border-radius: 12px;
-            }
-        """)
+        table_container.setObjectName("tableContainer")
         table_layout = QVBoxLayout(table_container)
         table_layout.setContentsMargins(0, 0, 0, 0)
         table_layout.setSpacing(0)
 
+        self.table_model = PhraseTableModel(self.entries,
+                                            self.service.templates.render)
+        self.search_index = SearchIndex(self.entries)
+        # 空闲时分批建立搜索索引，大量条目时也不会卡住界面
+        self.index_timer = QTimer(self)
+        self.index_timer.timeout.connect(self.build_search_index)
+        self.index_timer.start(0)
         self.table = ModernTable()
-        self.table.setColumnCount(3)
-        self.table.setHorizontalHeaderLabels(["短语内容", "快捷键", "操作"])
+        self.table.setModel(self.table_model)
+        self.delete_delegate = DeleteButtonDelegate(self.table)
+        self.delete_delegate.delete_requested.connect(
+            lambda row: self.delete_entry(self.table_model.entry_row(row)))
+        self.table.setItemDelegateForColumn(2, self.delete_delegate)
         header = self.table.horizontalHeader()
 
         # 添加表格点击事件
-        self.table.cellClicked.connect(self.on_cell_clicked)
+        self.table.clicked.connect(
+            lambda index: self.on_cell_clicked(
+                self.table_model.entry_row(index.row()), index.column()))
+        # 右键菜单: 复制后自动发送
+        self.table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.table.customContextMenuRequested.connect(self.show_row_menu)
 
         # 添加当前编辑行的标记
         self.current_editing_row = -1
@@ -271,14 +627,16 @@ class ClipboardManager(QMainWindow):
 
         main_layout.addWidget(table_container, stretch=1)
 
+        # 模板变量，短语中的 {player} 等在复制时替换为这里填写的值
+        self.variables_layout = QHBoxLayout()
+        self.variables_layout.setSpacing(8)
+        self.variable_inputs = {}
+        main_layout.addLayout(self.variables_layout)
+        self.update_variable_inputs()
+
         # 底部添加区域
         bottom_frame = QFrame()
-        bottom_frame.setStyleSheet("""
-            QFrame {
-                background-color: #f5f6fa;
-                border-radius: 12px;
-            }
-        """)
+        bottom_frame.setObjectName("bottomBar")
         bottom_layout = QHBoxLayout(bottom_frame)
         bottom_layout.setContentsMargins(16, 12, 16, 12)
         bottom_layout.setSpacing(12)
@@ -304,47 +662,273 @@ class ClipboardManager(QMainWindow):
 
         main_layout.addWidget(bottom_frame)
 
-        self.entries = []
-        self.load_settings()
-
-        # 如果没有预设文案，添加默认文案
-        if not self.entries:
-            default_entries = [
-                {"text": "已使自身本场比赛的积分得失加倍!", "hotkey": "cmd+y"},
-                {"text": "由于挂机行为已经被系统从游戏中踢出，他的战绩也会记录为逃跑，玩家现在离开该场比赛将不会被判定为放弃。",
-                    "hotkey": "cmd+u"},
-                {"text": "已经放弃了游戏，这场比赛不计入天梯积分，剩余玩家可以自由退出。", "hotkey": "cmd+i"},
-                {"text": "由于长时间没有重连至游戏，系统判定他为逃跑。玩家现在离开该场比赛将不会被判定为放弃。", "hotkey": "cmd+o"},
-                {"text": "已经连续258次预测他们队伍将取得胜利！", "hotkey": "cmd+p"},
-                {"text": "经系统检测：玩家XXXXXX存在代练或共享账号嫌疑，遵守社区游戏规范，再次违反将进行封禁处理。",
-                    "hotkey": "cmd+["}
-            ]
-            for entry in default_entries:
-                self.add_preset_entry(entry["text"], entry["hotkey"])
-
         # 更新短语计数
-        subtitle_label.setText(f"已添加 {len(self.entries)} 条短语")
+        self.update_subtitle()
 
-        # 启动键盘监听
-        self.start_keyboard_listener()
+        # 键盘监听已由服务启动，录制结果经信号回到主线程
+        self.dispatcher.on_recorded = self.hotkey_recorded.emit
+        self.hotkey_recorded.connect(self.on_hotkey_recorded)
+        self.service.on_profile_changed = self.profile_changed.emit
+        self.profile_changed.connect(self.on_profile_changed)
+        self.service.on_settings_changed = self.settings_changed.emit
+        self.settings_changed.connect(self.on_settings_changed)
+        self.import_batch.connect(self.on_import_batch)
+        self.import_finished.connect(self.on_import_finished)
 
-    def get_key_string(self, key):
+    @property
+    def entries(self):
+        return self.service.entries
+
+    @property
+    def hotkey_index(self):
+        return self.service.hotkey_index
+
+    @property
+    def dispatcher(self):
+        return self.service.dispatcher
+
+    def update_subtitle(self):
+        self.subtitle_label.setText(f"已添加 {len(self.entries)} 条短语")
+
+    def update_profile_box(self):
+        self.profile_box.clear()
+        self.profile_box.addItems(list(self.service.profiles))
+        self.profile_box.addItem(self.NEW_PROFILE)
+        self.profile_box.setCurrentText(self.service.profile.name)
+
+    def on_profile_selected(self, index):
+        name = self.profile_box.itemText(index)
+        if name == self.NEW_PROFILE:
+            name, ok = QInputDialog.getText(self, "新建配置", "配置名称:")
+            name = name.strip()
+            if not ok or not name:
+                self.profile_box.setCurrentText(self.service.profile.name)
+                return
+        self.service.switch_profile(name)
+
+    def on_profile_changed(self, name):
+        self.show_entries()
+
+    def on_settings_changed(self, settings, ops, revision):
+        """设置文件被外部修改: 只把增删改的行应用到表格和搜索索引"""
+        if self.service.importing is not None:
+            # 服务推迟到导入结束后再合并，届时整体刷新表格
+            self.service.apply_settings(settings)
+            return
+        self.table_model.set_editing_row(-1)
+        self.current_editing_row = -1
+        ops = self.service.apply_settings(
+            settings, self.applying, ops=ops, revision=revision)
+        if self.service.settings["theme"] != theme.current:
+            theme.apply_theme(QApplication.instance(),
+                              self.service.settings["theme"])
+            self.update_theme_button()
+            self.table.viewport().update()
+        if ops is None:
+            self.show_entries()
+            return
+        if self.table_model.rows is not None:
+            self.apply_filter()
+        self.update_variable_inputs()
+        self.update_subtitle()
+
+    @contextmanager
+    def applying(self, op):
+        """执行一个差异操作，同时通知表格并同步搜索索引"""
+        kind, row, value = op
+        appending = kind == INSERT and row == len(self.entries)
+        with self.table_model.changing(op):
+            yield
+        if kind == DELETE:
+            for _ in range(value):
+                self.search_index.remove(row)
+        elif kind == EDIT:
+            self.search_index.update(row, value)
+        elif not appending:
+            # 搜索索引按条目顺序分配文档号，中间插入时重新建立
+            self.search_index.rebuild(self.entries)
+        # 追加的条目以及重新建立的索引都在空闲时补上
+        self.index_timer.start(0)
+
+    def show_entries(self):
+        """读取设置或切换配置后刷新表格、搜索索引等"""
+        self.current_editing_row = -1
+        self.table_model.set_entries(self.entries)
+        self.search_index.rebuild(self.entries)
+        self.index_timer.start(0)
+        self.apply_filter()
+        self.update_variable_inputs()
+        self.update_profile_box()
+        self.update_subtitle()
+
+    def build_search_index(self):
+        if self.search_index.build(500):
+            self.index_timer.stop()
+
+    def apply_filter(self, query=None):
+        if query is None:
+            query = self.search_input.text()
+        self.table_model.set_rows(self.search_index.search(query))
+
+    def update_variable_inputs(self):
+        """为模板中用到的每个变量显示一个输入框"""
+        templates = self.service.templates
+        names = templates.names()
+        if names == list(self.variable_inputs):
+            return
+        while self.variables_layout.count():
+            widget = self.variables_layout.takeAt(0).widget()
+            if widget is not None:
+                widget.deleteLater()
+        self.variable_inputs = {}
+        if not names:
+            return
+        self.variables_layout.addWidget(QLabel("模板变量"))
+        for name in names:
+            variable_input = ModernLineEdit()
+            variable_input.setPlaceholderText(f"{{{name}}}")
+            variable_input.setText(templates.variables.get(name, ""))
+            variable_input.setFixedWidth(140)
+            variable_input.editingFinished.connect(
+                lambda name=name: self.on_variable_changed(name))
+            self.variables_layout.addWidget(QLabel(f"{{{name}}}"))
+            self.variables_layout.addWidget(variable_input)
+            self.variable_inputs[name] = variable_input
+        self.variables_layout.addStretch()
+
+    def on_variable_changed(self, name):
+        value = self.variable_inputs[name].text()
+        if value != self.service.templates.variables.get(name):
+            self.service.set_variable(name, value)
+            self.save_settings()
+
+    def toggle_theme(self):
+        name = "dark" if theme.current == "light" else "light"
+        theme.apply_theme(QApplication.instance(), name)
+        self.service.settings["theme"] = name
+        self.update_theme_button()
+        # 模型中的编辑行颜色随主题变化
+        self.table.viewport().update()
+        self.save_settings()
+
+    def show_stats(self):
+        if self.stats_dialog is None:
+            self.stats_dialog = StatsDialog(self.service, self)
+        self.stats_dialog.show()
+        self.stats_dialog.raise_()
+        self.stats_dialog.activateWindow()
+
+    def import_phrases(self):
+        if self.importer is not None:
+            return
+        path, _ = QFileDialog.getOpenFileName(
+            self, "导入短语", "",
+            ";;".join(["短语文件 (*.jsonl *.csv *.json)", *FILE_FILTERS]))
+        if path:
+            self.start_import(path)
+
+    def start_import(self, path):
+        """在后台线程中读取 path，分批追加到当前配置；导入期间表格暂停重绘"""
+        self.table_model.set_editing_row(-1)
+        self.current_editing_row = -1
+        self.import_start = self.service.begin_import()
+        # 导入期间不允许修改条目，表格不重绘，搜索索引也等导入结束后再补
+        self.centralWidget().setEnabled(False)
+        self.table.setUpdatesEnabled(False)
+        self.index_timer.stop()
+        self.import_progress = QProgressDialog("正在导入短语...", "取消", 0, 1000, self)
+        self.import_progress.setWindowTitle("导入短语")
+        self.import_progress.setMinimumDuration(300)
+        self.import_progress.canceled.connect(self.cancel_import)
+        self.import_revision = self.service.revision
+        self.importer = PhraseImporter(path, self.import_batch.emit,
+                                       self.import_finished.emit,
+                                       list(self.entries))
+
+    def cancel_import(self):
+        if self.importer is not None:
+            self.importer.cancel()
+
+    def on_import_batch(self, entries, progress):
+        # 取消之前已经排队的批次不再插入
+        if self.importer is None or self.importer.cancelled:
+            return
+        with self.table_model.appending(len(entries)):
+            self.service.import_entries(entries)
+        self.import_revision = self.service.revision
+        self.import_progress.setValue(int(progress * 1000))
+        self.subtitle_label.setText(
+            f"正在导入，已添加 {len(self.entries) - self.import_start} 条...")
+
+    def on_import_finished(self, stats):
+        importer, self.importer = self.importer, None
+        start = self.import_start
+        # 导入期间切换配置等操作被推迟，条目仍在开始导入时的列表中
+        added = len(self.service.importing.entries) - start
+        # 取消或出错时整体撤销，已插入的行一并删除
+        if (importer.cancelled or stats["error"]) and added:
+            with self.table_model.changing((DELETE, start, added)):
+                deferred = self.service.cancel_import()
+            for row in range(start + added - 1, start - 1, -1):
+                self.search_index.remove(row)
+        elif importer.cancelled or stats["error"]:
+            deferred = self.service.cancel_import()
+        else:
+            # 导入期间条目有其他修改时，导入线程建好的分发表不再适用
+            index = (stats["index"]
+                     if added and self.service.revision == self.import_revision else None)
+            deferred = self.service.finish_import(index)
+        self.import_progress.canceled.disconnect(self.cancel_import)
+        self.import_progress.close()
+        self.import_progress = None
+        self.table.setUpdatesEnabled(True)
+        self.centralWidget().setEnabled(True)
+        if deferred:
+            # 导入期间推迟的外部修改与切换配置，表格改动完之后再执行
+            for action in deferred:
+                action()
+            self.show_entries()
+        else:
+            # 新条目在空闲时补进搜索索引
+            self.index_timer.start(0)
+            if self.table_model.rows is not None:
+                self.apply_filter()
+            self.update_variable_inputs()
+            self.update_subtitle()
+        if stats["error"]:
+            QMessageBox.warning(self, "导入失败", stats["error"])
+            return
+        if importer.cancelled:
+            return
+        self.save_settings()
+        skipped = stats["duplicates"] + stats["invalid"]
+        if skipped or stats["conflicts"]:
+            message = (f"已导入 {stats['imported']} 条，跳过已有或重复的 "
+                       f"{stats['duplicates']} 条、缺少内容或快捷键的 {stats['invalid']} 条")
+            if stats["conflicts"]:
+                message += (f"\n\n导入的短语中有 {stats['conflicts']} 处快捷键冲突，"
+                            "冲突的短语可能无法触发")
+            QMessageBox.information(self, "导入短语", message)
+
+    def export_phrases(self):
+        path, selected = QFileDialog.getSaveFileName(
+            self, "导出短语", f"{self.service.profile.name}.jsonl",
+            ";;".join(FILE_FILTERS))
+        if not path:
+            return
+        if not os.path.splitext(path)[1]:
+            path += FILE_FILTERS.get(selected, ".jsonl")
         try:
-            if hasattr(key, 'char'):
-                return key.char.lower()
-            elif key == Key.cmd or key == Key.cmd_r:
-                return 'cmd'
-            elif key == Key.ctrl or key == Key.ctrl_r:
-                return 'ctrl'
-            elif key == Key.alt or key == Key.alt_r:
-                return 'alt'
-            elif key == Key.shift or key == Key.shift_r:
-                return 'shift'
-            elif hasattr(key, 'name'):
-                return key.name.lower()
-        except AttributeError:
-            pass
-        return None
+            export_entries(self.entries, path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "导出失败", str(e))
+
+    def update_theme_button(self):
+        self.theme_button.setText(
+            "浅色模式" if theme.current == "dark" else "深色模式")
+
+    def get_key_string(self, key):
+        return key_to_string(key)
 
     def on_cell_clicked(self, row, column):
         # 只处理快捷键列的点击
@@ -355,206 +939,163 @@ class ClipboardManager(QMainWindow):
 
             # 设置新的编辑状态
             self.current_editing_row = row
-            self.is_recording = True
-            self.current_keys.clear()
+            self.dispatcher.start_recording()
 
             # 更新单元格样式
-            item = self.table.item(row, column)
-            item.setBackground(QColor("#fff3f3"))
-            item.setText("请按下新的快捷键...")
+            self.table_model.set_editing_row(row)
 
             # 更新当前快捷键显示
             self.hotkey_input.clear()
-            self.hotkey_input.setStyleSheet("""
-                QLineEdit {
-                    border: 1px solid #dfe6e9;
-                    border-radius: 8px;
-                    padding: 8px 12px;
-                    background-color: white;
-                    color: #2d3436;
-                    font-size: 13px;
-                }
-            """)
+            theme.set_state(self.hotkey_input, "state", "")
+
+    def show_row_menu(self, pos):
+        index = self.table.indexAt(pos)
+        if not index.isValid():
+            return
+        row = self.table_model.entry_row(index.row())
+        menu = QMenu(self)
+        action = menu.addAction("复制后自动发送到聊天")
+        action.setCheckable(True)
+        action.setChecked(bool(self.entries[row].get("auto_paste")))
+        if menu.exec(self.table.viewport().mapToGlobal(pos)) is action:
+            self.service.set_auto_paste(row, action.isChecked())
+            self.table_model.entry_changed(row)
+            self.save_settings()
 
     def reset_hotkey_cell_style(self, row):
         if row != -1:
-            item = self.table.item(row, 1)
-            if item:
-                item.setBackground(QColor("white"))
-                item.setText(self.entries[row]["hotkey"])
-
-    def start_keyboard_listener(self):
-        def on_press(key):
-            key_str = self.get_key_string(key)
-            if key_str:
-                if self.is_recording:
-                    if key_str not in ['cmd', 'ctrl', 'alt', 'shift']:
-                        self.current_keys.add(key_str)
-                        # 使用新的排序逻辑
-                        modifiers = sorted([k for k in self.current_keys if k in ['cmd', 'ctrl', 'alt', 'shift']],
-                                           key=lambda x: {'cmd': 0, 'ctrl': 1, 'alt': 2, 'shift': 3}[x])
-                        others = [k for k in self.current_keys if k not in [
-                            'cmd', 'ctrl', 'alt', 'shift']]
-                        hotkey = '+'.join(modifiers + others)
-
-                        # 更新当前编辑的单元格
-                        if self.current_editing_row != -1:
-                            self.entries[self.current_editing_row]["hotkey"] = hotkey
-                            item = self.table.item(self.current_editing_row, 1)
-                            item.setText(hotkey)
-                            item.setBackground(QColor("white"))
-                            self.current_editing_row = -1
-                            self.save_settings()  # 静默保存
-                        else:
-                            self.hotkey_input.setText(hotkey)
-                            self.hotkey_input.setStyleSheet("""
-                                QLineEdit {
-                                    border: 2px solid #e74c3c;
-                                    border-radius: 4px;
-                                    padding: 8px;
-                                    background-color: #fff3f3;
-                                }
-                            """)
-                        self.is_recording = False
-                    else:
-                        self.current_keys.add(key_str)
-                else:
-                    self.current_keys.add(key_str)
-                    self.check_hotkeys()
-
-        def on_release(key):
-            key_str = self.get_key_string(key)
-            if key_str:
-                self.current_keys.discard(key_str)
-
-        self.keyboard_listener = keyboard.Listener(
-            on_press=on_press, on_release=on_release)
-        self.keyboard_listener.start()
-
-    def check_hotkeys(self):
-        current_hotkey = '+'.join(sorted(self.current_keys))
-        for entry in self.entries:
-            if self.normalize_hotkey(entry["hotkey"]) == current_hotkey:
-                pyperclip.copy(entry["text"])
+            self.table_model.set_editing_row(-1)
 
-    def normalize_hotkey(self, hotkey):
-        # 将快捷键拆分为修饰键和普通键
-        parts = hotkey.lower().split('+')
-        modifiers = []
-        others = []
-
-        # 修饰键的优先顺序
-        modifier_order = {'cmd': 0, 'ctrl': 1, 'alt': 2, 'shift': 3}
-
-        # 分类键
-        for part in parts:
-            if part in modifier_order:
-                modifiers.append(part)
-            else:
-                others.append(part)
+    def on_hotkey_recorded(self, hotkey, finished):
+        if not finished:
+            # 多步快捷键录到一半，先显示已录的部分
+            self.hotkey_input.setText(hotkey)
+            theme.set_state(self.hotkey_input, "state", "recording")
+            return
+        # 更新当前编辑的单元格
+        if self.current_editing_row != -1:
+            row = self.current_editing_row
+            self.hotkey_input.clear()
+            theme.set_state(self.hotkey_input, "state", "")
+            if not self.confirm_hotkey(hotkey, self.entries[row]):
+                self.table_model.set_editing_row(-1)
+                self.current_editing_row = -1
+                return
+            self.service.set_hotkey(row, hotkey)
+            self.search_index.update(row, self.entries[row])
+            self.table_model.set_editing_row(-1)
+            if self.search_input.text():
+                self.apply_filter()
+            self.current_editing_row = -1
+            self.save_settings()  # 静默保存
+        else:
+            self.hotkey_input.setText(hotkey)
+            theme.set_state(self.hotkey_input, "state", "recording")
 
-        # 对修饰键按预定义顺序排序
-        modifiers.sort(key=lambda x: modifier_order[x])
+    def confirm_hotkey(self, hotkey, entry=None):
+        """快捷键与其他短语冲突时询问是否仍然使用，entry 为正在修改的条目"""
+        conflicts = self.service.hotkey_conflicts(hotkey, entry)
+        if not conflicts:
+            return True
+        lines = "\n".join(f"{normalize_hotkey(other['hotkey'])}  {other['text'][:30]}\n"
+                          f"    {CONFLICT_LABELS[kind]}"
+                          for kind, other in conflicts[:5])
+        more = f"\n...等 {len(conflicts)} 条" if len(conflicts) > 5 else ""
+        answer = QMessageBox.question(
+            self, "快捷键冲突",
+            f"{hotkey} 与以下短语的快捷键冲突:\n\n"
+            f"{lines}{more}\n\n仍然使用这个快捷键？")
+        return answer == QMessageBox.StandardButton.Yes
 
-        # 组合修饰键和其他键
-        return '+'.join(modifiers + others)
+    def normalize_hotkey(self, hotkey):
+        return normalize_hotkey(hotkey)
 
     def start_hotkey_recording(self, event):
-        self.is_recording = True
-        self.current_keys.clear()
+        self.dispatcher.start_recording()
         self.hotkey_input.setText("")
-        self.hotkey_input.setStyleSheet("""
-            QLineEdit {
-                border: 2px solid #e74c3c;
-                border-radius: 4px;
-                padding: 8px;
-                background-color: #fff3f3;
-            }
-        """)
+        theme.set_state(self.hotkey_input, "state", "recording")
 
     def add_preset_entry(self, text, hotkey):
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-
-        # 创建并设置文本项
-        text_item = QTableWidgetItem(text)
-        text_item.setTextAlignment(
-            Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft)
-        self.table.setItem(row, 0, text_item)
-
-        # 创建并设置快捷键项
-        hotkey_item = QTableWidgetItem(hotkey)
-        hotkey_item.setTextAlignment(
-            Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignHCenter)
-        # 设置快捷键单元格可点击的视觉提示
-        hotkey_item.setToolTip("点击设置新的快捷键")
-        self.table.setItem(row, 1, hotkey_item)
-
-        # 创建删除按钮
-        delete_button = ModernButton("", delete=True)
-        delete_button.clicked.connect(lambda: self.delete_entry(row))
-
-        # 创建一个容器来居中放置删除按钮
-        container = QWidget()
-        layout = QHBoxLayout(container)
-        layout.setContentsMargins(8, 4, 8, 4)  # 设置合适的边距
-        layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(delete_button)
-
-        self.table.setCellWidget(row, 2, container)
-        self.entries.append({"text": text, "hotkey": hotkey})
+        with self.table_model.appending():
+            entry = self.service.add_entry(text, hotkey)
+        self.search_index.add(entry)
+        self.update_variable_inputs()
+        self.update_subtitle()
+        if self.table_model.rows is not None:
+            self.apply_filter()
 
     def add_entry(self):
         text = self.text_input.text()
         hotkey = self.hotkey_input.text()
         if text and hotkey:
+            if not self.confirm_hotkey(hotkey):
+                return
             self.add_preset_entry(text, hotkey)
+            self.save_settings()
             self.text_input.clear()
             self.hotkey_input.clear()
-            self.hotkey_input.setStyleSheet("""
-                QLineEdit {
-                    border: 2px solid #bdc3c7;
-                    border-radius: 4px;
-                    padding: 8px;
-                    background-color: white;
-                }
-            """)
+            theme.set_state(self.hotkey_input, "state", "")
 
     def delete_entry(self, row):
-        self.table.removeRow(row)
-        del self.entries[row]
+        with self.table_model.removing(row):
+            self.service.delete_entry(row)
+        self.search_index.remove(row)
+        self.update_subtitle()
+        self.current_editing_row = self.table_model.editing_row
+        self.save_settings()
 
     def save_settings(self):
-        with open("settings.json", "w", encoding="utf-8") as f:
-            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        self.service.save()
 
     def load_settings(self):
-        try:
-            with open("settings.json", "r", encoding="utf-8") as f:
-                self.entries = json.load(f)
-                for entry in self.entries:
-                    row = self.table.rowCount()
-                    self.table.insertRow(row)
-                    self.table.setItem(row, 0, QTableWidgetItem(entry["text"]))
-                    self.table.setItem(
-                        row, 1, QTableWidgetItem(entry["hotkey"]))
-
-                    delete_button = ModernButton("", delete=True)
-                    delete_button.clicked.connect(
-                        lambda: self.delete_entry(row))
-                    self.table.setCellWidget(row, 2, delete_button)
-        except FileNotFoundError:
-            pass
+        self.service.load()
+        self.show_entries()
 
     def closeEvent(self, event):
-        if self.keyboard_listener:
-            self.keyboard_listener.stop()
+        if self.importer is not None:
+            self.importer.cancel()
+        self.service.stop()
         super().closeEvent(event)
 
 
 if __name__ == "__main__":
+    if "--clipboard-helper" in sys.argv:
+        # 打包版本中作为剪贴板助手进程运行
+        from clipboard_backends import serve
+        serve()
+        sys.exit()
+
+    STARTUP.mark("导入模块")
+    # --runtime-profile 或环境变量 DOTA2_CLIPBOARD_PROFILE 开启运行时分析
+    profiler = runtime_profiler(sys.argv)
+    if profiler is not None:
+        profiler.start()
     app = QApplication(sys.argv)
     app.setStyle(QStyleFactory.create("Fusion"))
-    window = ClipboardManager()
-    window.show()
+    STARTUP.mark("创建 QApplication")
+
+    # 先读取设置、编译快捷键并启动监听，窗口在事件循环开始后再构建
+    service = HotkeyService()
+    service.profiler = profiler
+    service.load()
+    STARTUP.mark("读取设置并编译快捷键")
+    service.start(watch=True)
+    STARTUP.mark("启动键盘监听")
+
+    def show_window():
+        app.window = ClipboardManager(service)
+        if profiler is not None:
+            profiler.add_info("表格行数", app.window.table_model.rowCount)
+        STARTUP.mark("构建窗口")
+        app.window.show()
+        STARTUP.mark("显示窗口")
+        STARTUP.report()
+
+    QTimer.singleShot(0, show_window)
+    if profiler is not None:
+        # 让 Python 定期有机会执行 SIGUSR1 的处理函数
+        signal_timer = QTimer()
+        signal_timer.timeout.connect(lambda: None)
+        signal_timer.start(200)
+        profiler.profile_thread("qt")
     sys.exit(app.exec())
@@ -0,0 +1,366 @@
+"""无界面模式: 只运行快捷键监听与剪贴板写入，不导入 PyQt6
+
+    python dota2_clipboard.py --headless                  # 运行守护进程
+    python dota2_clipboard.py --headless list             # 列出短语
+    python dota2_clipboard.py --headless add 文本 cmd+k    # 添加短语
+    python dota2_clipboard.py --headless add 文本 "alt+q, 3"  # 多步快捷键
+    python dota2_clipboard.py --headless remove 3         # 按序号或快捷键删除
+    python dota2_clipboard.py --headless conflicts        # 列出快捷键冲突的短语
+    python dota2_clipboard.py --headless set player 张三   # 设置模板变量
+    python dota2_clipboard.py --headless import pack.csv  # 导入短语(.jsonl/.csv/.json)
+    python dota2_clipboard.py --headless export pack.jsonl  # 导出当前配置的短语
+    python dota2_clipboard.py --headless profile turbo    # 切换(或新建)短语配置
+    python dota2_clipboard.py --headless reload           # 让运行中的守护进程重新读取设置
+    python dota2_clipboard.py --headless stats            # 运行中的守护进程的触发统计与耗时
+    python dota2_clipboard.py --headless --runtime-profile  # 运行守护进程并记录性能分析
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import threading
+
+from clipboard_backends import create_backend
+from hotkeys import (CONFLICT_LABELS, hotkey_combo, hotkey_signature,
+                     normalize_hotkey)
+from phrase_io import count_conflicts, export_entries, read_batches
+from profiling import StartupProfiler, runtime_profiler, strip_profile_flag
+from service import HotkeyService
+from settings_store import SETTINGS_FILE
+
+
+def control_file(settings_path):
+    """记录守护进程控制端口的文件，与设置文件放在一起"""
+    return settings_path + ".daemon"
+
+
+class ControlServer:
+    """本机回环地址上的控制端口，每个连接读取一行命令并回复一行"""
+
+    def __init__(self, service, path):
+        self.service = service
+        self.path = path
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.listen()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"pid": os.getpid(),
+                       "port": self._socket.getsockname()[1]}, f)
+        self._thread = threading.Thread(
+            target=self._run, name="headless-control", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                break
+            with conn:
+                try:
+                    command = conn.makefile("r", encoding="utf-8").readline()
+                    reply = self.handle(command.strip())
+                    conn.sendall((reply + "\n").encode("utf-8"))
+                except OSError:
+                    pass
+
+    def handle(self, command):
+        if command == "reload":
+            self.service.load()
+            return f"ok {len(self.service.entries)}"
+        if command == "ping":
+            return "ok"
+        if command == "stats":
+            return "ok " + json.dumps(self.service.metrics_report(),
+                                      ensure_ascii=False)
+        return f"error 未知命令: {command}"
+
+    def close(self):
+        self._socket.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def send_command(settings_path, command, timeout=1.0):
+    """向运行中的守护进程发送命令，没有守护进程时返回 None"""
+    try:
+        with open(control_file(settings_path), "r", encoding="utf-8") as f:
+            port = json.load(f)["port"]
+    except (OSError, ValueError, KeyError):
+        return None
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout) as conn:
+            conn.sendall((command + "\n").encode("utf-8"))
+            return conn.makefile("r", encoding="utf-8").readline().strip()
+    except OSError:
+        return None
+
+
+def headless_backend(name):
+    """无界面模式的剪贴板后端，auto 时不使用助手进程
+
+    Linux 上的助手进程要导入 PyQt6(打包后还会重新运行整个主程序)，
+    常驻内存比守护进程本身还大，因此改用 pyperclip。
+    """
+    return create_backend("pyperclip" if name == "auto" else name)
+
+
+def run(args, startup, profiler=None):
+    startup.mark("导入模块")
+    service = HotkeyService(args.settings)
+    if profiler is not None:
+        profiler.start()
+        service.profiler = profiler
+    service.load()
+    service.clipboard_backend = headless_backend(
+        service.settings["clipboard_backend"])
+    startup.mark("读取设置并编译快捷键")
+    service.start(watch=True)
+    startup.mark("启动键盘监听")
+    startup.report()
+
+    server = ControlServer(service, control_file(args.settings))
+    stop = threading.Event()
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    print(f"无界面模式已启动，配置 {service.profile.name}，"
+          f"共 {len(service.entries)} 条短语，按 Ctrl+C 退出", flush=True)
+    try:
+        # 带超时等待，Windows 上也能及时响应 Ctrl+C
+        while not stop.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        service.stop()
+    return 0
+
+
+def list_entries(args):
+    service = HotkeyService(args.settings)
+    service.load()
+    variables = service.templates.variables
+    if variables:
+        print("变量: " + "  ".join(f"{{{name}}}={value}"
+                                  for name, value in variables.items()))
+    for number, entry in enumerate(service.entries, 1):
+        mark = "⏎ " if entry.get("auto_paste") else ""
+        print(f"{number:>4}  {normalize_hotkey(entry['hotkey']):<16} {mark}{entry['text']}")
+    return 0
+
+
+def list_profiles(args):
+    service = HotkeyService(args.settings)
+    service.load()
+    for name, profile in service.profiles.items():
+        mark = "*" if profile is service.profile else " "
+        print(f"{mark} {name}  ({len(profile.entries)} 条)")
+    return 0
+
+
+def modify_entries(args):
+    service = HotkeyService(args.settings)
+    service.load()
+    if args.command == "add":
+        hotkey = normalize_hotkey(args.hotkey)
+        if not args.text or hotkey_signature(hotkey) is None:
+            # 与导入文件时一样: 没有内容、只有修饰键或无法解析的快捷键不能触发
+            print(f"无效的短语或快捷键: {args.hotkey}")
+            return 1
+        conflicts = service.hotkey_conflicts(hotkey)
+        if conflicts and not args.force:
+            print(f"{hotkey} 与以下短语的快捷键冲突:")
+            for kind, other in conflicts:
+                print(f"    {normalize_hotkey(other['hotkey']):<16} {other['text']}"
+                      f"  ({CONFLICT_LABELS[kind]})")
+            print("仍要添加请加上 --force")
+            return 1
+        entry = service.add_entry(args.text, hotkey)
+        if args.auto_paste:
+            service.set_auto_paste(len(service.entries) - 1, True)
+        print(f"已添加: {entry['hotkey']}  {entry['text']}")
+    elif args.command == "profile":
+        service.switch_profile(args.name)
+        print(f"已切换到配置: {args.name}")
+    elif args.command == "set":
+        service.set_variable(args.name, args.value)
+        print(f"已设置: {{{args.name}}}={args.value}")
+    else:
+        row = find_entry(service.entries, args.target)
+        if row is None:
+            print(f"找不到短语: {args.target}")
+            return 1
+        entry = service.entries[row]
+        service.delete_entry(row)
+        print(f"已删除: {entry['hotkey']}  {entry['text']}")
+    service.save()
+    service.store.close()
+    notify_reload(args.settings)
+    return 0
+
+
+def list_conflicts(args):
+    """列出设置文件(当前配置)中所有的快捷键冲突，有冲突时返回 1"""
+    service = HotkeyService(args.settings)
+    service.load()
+    entries = service.entries
+    conflicts = service.find_conflicts()
+    for kind, row, other in conflicts:
+        entry, winner = entries[row], entries[other]
+        print(f"{row + 1:>4}  {normalize_hotkey(entry['hotkey']):<16} {entry['text']}")
+        print(f"      第 {other + 1} 条 {normalize_hotkey(winner['hotkey'])} "
+              f"{CONFLICT_LABELS[kind]}: {winner['text']}")
+    print(f"共 {len(conflicts)} 处冲突" if conflicts else "没有快捷键冲突")
+    return 1 if conflicts else 0
+
+
+def import_entries(args):
+    service = HotkeyService(args.settings)
+    service.load()
+    start = service.begin_import()
+    existing = {(entry["text"], entry["hotkey"]) for entry in service.entries}
+    stats = {}
+    try:
+        for batch, _ in read_batches(args.path, existing, stats=stats):
+            service.import_entries(batch)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        print(f"导入失败: {e}")
+        return 1
+    service.finish_import()
+    print(f"已导入 {stats['imported']} 条，跳过已有或重复的 {stats['duplicates']} 条、"
+          f"缺少内容或快捷键的 {stats['invalid']} 条")
+    conflicts = count_conflicts(service.entries, start)
+    if conflicts:
+        print(f"导入的短语中有 {conflicts} 处快捷键冲突，用 conflicts 命令查看")
+    service.save()
+    service.store.close()
+    notify_reload(args.settings)
+    return 0
+
+
+def export(args):
+    service = HotkeyService(args.settings)
+    service.load()
+    try:
+        export_entries(service.entries, args.path)
+    except (OSError, ValueError) as e:
+        print(f"导出失败: {e}")
+        return 1
+    print(f"已导出 {len(service.entries)} 条短语到 {args.path}")
+    return 0
+
+
+def find_entry(entries, target):
+    """按 list 显示的序号或快捷键查找条目"""
+    if target.isdigit():
+        row = int(target) - 1
+        return row if 0 <= row < len(entries) else None
+    combo = hotkey_combo(target)
+    for row, entry in enumerate(entries):
+        if hotkey_combo(entry["hotkey"]) == combo:
+            return row
+    return None
+
+
+def notify_reload(settings_path):
+    reply = send_command(settings_path, "reload")
+    if reply is None:
+        print("没有运行中的守护进程")
+    else:
+        print(f"守护进程已重新读取设置: {reply}")
+    return 0 if reply is None or reply.startswith("ok") else 1
+
+
+METRIC_LABELS = {
+    "hook": "键盘钩子回调",
+    "queue": "排队等待",
+    "match": "查表匹配",
+    "write": "剪贴板写入",
+    "paste": "按下到自动发送完成",
+}
+# stats 只列出触发最多的这么多条短语
+STATS_TOP = 10
+
+
+def format_summary(summary):
+    return (f"{summary['count']:>6} 次  p50 {summary['p50_us']:.0f} µs  "
+            f"p99 {summary['p99_us']:.0f} µs  最大 {summary['max_us']:.0f} µs")
+
+
+def show_stats(settings_path):
+    reply = send_command(settings_path, "stats")
+    if reply is None or not reply.startswith("ok "):
+        print(reply or "没有运行中的守护进程")
+        return 1
+    report = json.loads(reply[3:])
+    suppressed = report["suppressed"]
+    print(f"自动重复的按下: {suppressed['repeats']} 次")
+    print(f"最小间隔内的再次触发: {suppressed['throttled']} 次")
+    print(f"写入前被下一条覆盖: {suppressed['coalesced']} 次")
+    print(f"共省掉剪贴板写入: {sum(suppressed.values())} 次")
+    if not report["enabled"]:
+        print("未记录耗时统计(settings.json 的 metrics 为 false)")
+        return 0
+    for part, label in METRIC_LABELS.items():
+        print(f"{label}: {format_summary(report[part])}")
+    for number, entry in enumerate(report["entries"][:STATS_TOP], 1):
+        print(f"{number:>4}  {format_summary(entry)}  {entry['text']}")
+    return 0
+
+
+def main(argv, startup=None):
+    startup = startup or StartupProfiler()
+    profiler = runtime_profiler(argv)
+    argv = strip_profile_flag(
+        [arg for arg in argv if arg not in ("--headless", "--startup-profile")])
+    parser = argparse.ArgumentParser(prog="dota2_clipboard.py --headless",
+                                     description="无界面模式")
+    parser.add_argument('--settings', default=SETTINGS_FILE,
+                        help='设置文件路径')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('run', help='运行快捷键守护进程(默认)')
+    commands.add_parser('list', help='列出短语')
+    add = commands.add_parser('add', help='添加短语')
+    add.add_argument('text', help='短语内容')
+    add.add_argument('hotkey', help='快捷键，例如 cmd+k，多步快捷键用逗号分隔，例如 "alt+q, 3"')
+    add.add_argument('--force', action='store_true',
+                     help='与已有快捷键前缀冲突时仍然添加')
+    add.add_argument('--auto-paste', action='store_true',
+                     help='复制后自动打开聊天框、粘贴并发送')
+    remove = commands.add_parser('remove', help='删除短语')
+    remove.add_argument('target', help='list 显示的序号或快捷键')
+    variable = commands.add_parser('set', help='设置模板变量')
+    variable.add_argument('name', help='变量名，例如 player')
+    variable.add_argument('value', help='变量值')
+    profile = commands.add_parser('profile', help='列出或切换短语配置')
+    profile.add_argument('name', nargs='?', help='配置名称，不存在时新建')
+    import_parser = commands.add_parser('import', help='导入短语')
+    import_parser.add_argument('path', help='.jsonl、.csv 或 settings.json 格式的文件')
+    export_parser = commands.add_parser('export', help='导出当前配置的短语')
+    export_parser.add_argument('path', help='.jsonl、.csv 或 .json，按扩展名选择格式')
+    commands.add_parser('conflicts', help='列出快捷键相同或互相抢先触发的短语')
+    commands.add_parser('reload', help='让运行中的守护进程重新读取设置')
+    commands.add_parser('stats', help='显示运行中的守护进程的触发统计与耗时')
+    args = parser.parse_args(argv)
+
+    if args.command in (None, 'run'):
+        return run(args, startup, profiler)
+    if args.command == 'list':
+        return list_entries(args)
+    if args.command == 'profile' and args.name is None:
+        return list_profiles(args)
+    if args.command == 'reload':
+        return notify_reload(args.settings)
+    if args.command == 'stats':
+        return show_stats(args.settings)
+    if args.command == 'conflicts':
+        return list_conflicts(args)
+    if args.command == 'import':
+        return import_entries(args)
+    if args.command == 'export':
+        return export(args)
+    return modify_entries(args)
@@ -0,0 +1,478 @@
+"""快捷键规范化与匹配
+
+按键状态用修饰键位掩码加一个普通键名表示，快捷键编译为同样形式的签名
+(位掩码, 普通键)：只有一个普通键时为驻留的键名字符串，多个时为 frozenset。
+用逗号分隔的多步快捷键(例如 "alt+q, 3")编译为各步签名组成的元组，
+由前缀树(SequenceNode)逐步匹配。
+"""
+import itertools
+import re
+import sys
+
+from metrics import Histogram
+
+# 修饰键的优先顺序
+MODIFIER_ORDER = {'cmd': 0, 'ctrl': 1, 'alt': 2, 'shift': 3}
+
+# 左右两侧的修饰键统一为同一个名字
+MODIFIER_ALIASES = {
+    'cmd_l': 'cmd', 'cmd_r': 'cmd',
+    'ctrl_l': 'ctrl', 'ctrl_r': 'ctrl',
+    'alt_l': 'alt', 'alt_r': 'alt',
+    'shift_l': 'shift', 'shift_r': 'shift',
+}
+
+# 多步快捷键各步之间的分隔
+SEQUENCE_SEPARATOR = ", "
+# 一步: 按键名用 + 连接，逗号键本身也可以作为按键名(例如 ctrl+,)
+_KEY = r"(?:[^+,\s]+|,)"
+_STEP = re.compile(rf"\s*({_KEY}(?:\+{_KEY})*)\s*(?:,|$)")
+
+# 修饰键 -> 位掩码中的位；pynput 的按键名(含左右两侧)同样可以直接查到
+MODIFIER_BITS = {name: 1 << order for name, order in MODIFIER_ORDER.items()}
+MODIFIER_KEY_BITS = dict(MODIFIER_BITS, **{
+    name: MODIFIER_BITS[alias] for name, alias in MODIFIER_ALIASES.items()})
+MODIFIER_MASKS = 1 << len(MODIFIER_BITS)
+MODIFIER_ALL = MODIFIER_MASKS - 1
+
+# 快捷键冲突的类型，从被检查的快捷键一方来看
+DUPLICATE = "duplicate"   # 快捷键相同，只有列表中靠后的一条会触发
+SHADOWED = "shadowed"     # 按下它的过程中会先触发对方(对方的按键是它的子集，或是它的前几步)
+SHADOWS = "shadows"       # 反过来，按下对方的过程中会先触发它
+CONFLICT_LABELS = {
+    DUPLICATE: "快捷键相同，只有靠后的一条会触发",
+    SHADOWED: "按下时会先触发这条较短的快捷键",
+    SHADOWS: "按下这条时会先触发较短的一方",
+}
+
+
+def key_to_string(key):
+    """将 pynput 的 Key/KeyCode 转换为小写按键名，无法识别时返回 None"""
+    try:
+        if hasattr(key, 'char'):
+            return key.char.lower()
+        name = key.name
+        return MODIFIER_ALIASES.get(name, name.lower())
+    except AttributeError:
+        pass
+    return None
+
+
+def hotkey_steps(hotkey):
+    """把多步快捷键拆分为各步，例如 "alt+q, 3" -> ["alt+q", "3"]"""
+    hotkey = hotkey.lower().strip()
+    steps = []
+    position = 0
+    while position < len(hotkey):
+        match = _STEP.match(hotkey, position)
+        if match is None or match.end() == position:
+            # 无法识别的写法按一步处理
+            return [hotkey]
+        steps.append(match.group(1))
+        position = match.end()
+    return steps or [hotkey]
+
+
+def _normalize_step(step):
+    parts = step.split('+')
+    modifiers = sorted([p for p in parts if p in MODIFIER_ORDER],
+                       key=lambda x: MODIFIER_ORDER[x])
+    others = [p for p in parts if p not in MODIFIER_ORDER]
+    return '+'.join(modifiers + others)
+
+
+def normalize_hotkey(hotkey):
+    """将快捷键整理为 修饰键(按优先顺序)+普通键 的字符串，多步时逐步整理"""
+    return SEQUENCE_SEPARATOR.join(map(_normalize_step, hotkey_steps(hotkey)))
+
+
+def hotkey_combo(hotkey):
+    """将快捷键字符串转换为与按键顺序无关的按键集合，多步时为各步集合的元组"""
+    combos = tuple(frozenset(p for p in step.split('+') if p)
+                   for step in hotkey_steps(hotkey))
+    return combos[0] if len(combos) == 1 else combos
+
+
+def key_signature(names):
+    """按键名集合 -> (修饰键位掩码, 普通键)，只有修饰键时返回 None"""
+    mask = 0
+    keys = []
+    for name in names:
+        bit = MODIFIER_BITS.get(name)
+        if bit:
+            mask |= bit
+        else:
+            keys.append(name)
+    if not keys:
+        return None
+    return mask, (sys.intern(keys[0]) if len(keys) == 1 else frozenset(keys))
+
+
+def hotkey_signature(hotkey):
+    """快捷键字符串的签名，与按键顺序无关；多步快捷键为各步签名的元组。
+
+    只有修饰键的快捷键(或其中一步)无法触发，返回 None。
+    """
+    steps = []
+    for step in hotkey_steps(hotkey):
+        signature = key_signature(p for p in step.split('+') if p)
+        if signature is None:
+            return None
+        steps.append(signature)
+    return steps[0] if len(steps) == 1 else tuple(steps)
+
+
+def chord_subsets(signature):
+    """多键组合的各个真子集，修饰键相同，例如 cmd+a+b -> cmd+a、cmd+b
+
+    钩子按住的普通键逐个加入组合，按 cmd+a+b 时会先经过 cmd+a 或 cmd+b。
+    修饰键必须完全相同才会匹配，cmd+k 与 cmd+shift+k 互不影响。
+    """
+    mask, keys = signature
+    if isinstance(keys, str):
+        return []
+    keys = sorted(keys)
+    subsets = [(mask, sys.intern(key)) for key in keys]
+    for size in range(2, len(keys)):
+        subsets.extend((mask, frozenset(combo))
+                       for combo in itertools.combinations(keys, size))
+    return subsets
+
+
+def is_sequence(signature):
+    return isinstance(signature[0], tuple)
+
+
+def first_step(signature):
+    """多步快捷键的第一步，单步快捷键为其本身"""
+    return signature[0] if isinstance(signature[0], tuple) else signature
+
+
+def signature_keys(signature):
+    mask, keys = signature
+    return (keys,) if isinstance(keys, str) else keys
+
+
+def signature_to_hotkey(signature):
+    if is_sequence(signature):
+        return SEQUENCE_SEPARATOR.join(map(signature_to_hotkey, signature))
+    mask, keys = signature
+    modifiers = [name for name, bit in MODIFIER_BITS.items() if mask & bit]
+    return '+'.join(modifiers + sorted(signature_keys(signature)))
+
+
+class TriggerTable:
+    """能够完成某个快捷键的普通键
+
+    table 为 pynput 给出的按键名(字符的大小写两种形式或特殊键名)
+    -> (规范键名, 按修饰键位掩码索引的布尔元组)。键盘钩子对每次按键只查这张表，
+    不在表中或当前修饰键组合不可能完成快捷键的按键(绝大多数打字)直接忽略，
+    不分配任何对象。按键与修饰键组合的引用计数随快捷键增删增量维护。
+    """
+
+    def __init__(self, signatures=()):
+        self._counts = {}         # 规范键名 -> 各修饰键组合的快捷键数
+        self.table = {}
+        # 整体建表时先累计计数，每个按键只生成一次表项
+        for signature in signatures:
+            signature = first_step(signature)
+            for name in signature_keys(signature):
+                counts = self._counts.get(name)
+                if counts is None:
+                    counts = self._counts[name] = [0] * MODIFIER_MASKS
+                counts[signature[0]] += 1
+        for name, counts in self._counts.items():
+            self._update(name, counts)
+
+    def add(self, signature, delta=1):
+        # 多步快捷键只有第一步需要在键盘钩子中放行，之后各步由前缀树当前节点的表放行
+        signature = first_step(signature)
+        mask = signature[0]
+        for name in signature_keys(signature):
+            counts = self._counts.get(name)
+            if counts is None:
+                counts = self._counts[name] = [0] * MODIFIER_MASKS
+            counts[mask] += delta
+            self._update(name, counts)
+
+    def remove(self, signature):
+        self.add(signature, -1)
+
+    def _update(self, name, counts):
+        names = {name, name.upper()} if len(name) == 1 else {name}
+        if any(counts):
+            trigger = (name, tuple(count > 0 for count in counts))
+            for raw in names:
+                self.table[raw] = trigger
+        else:
+            del self._counts[name]
+            for raw in names:
+                self.table.pop(raw, None)
+
+
+class SequenceNode:
+    """多步快捷键的前缀树节点
+
+    children 为下一步的签名 -> 子节点，entry 为在此结束的条目，
+    triggers 为下一步可用的按键表(与 TriggerTable.table 形式相同)，
+    等待下一步时交给键盘钩子放行这些按键。
+    """
+    __slots__ = ("children", "entry", "signature", "triggers")
+
+    def __init__(self, signature=None):
+        self.children = {}
+        self.entry = None
+        self.signature = signature
+        self.triggers = None
+
+
+def build_sequences(sequences):
+    """由多步快捷键签名 -> 条目 建立前缀树，返回根节点"""
+    root = SequenceNode()
+    for signature, entry in sequences.items():
+        node = root
+        for depth, step in enumerate(signature, 1):
+            child = node.children.get(step)
+            if child is None:
+                child = node.children[step] = SequenceNode(signature[:depth])
+            node = child
+        node.entry = entry
+    pending = list(root.children.values())
+    while pending:
+        node = pending.pop()
+        if node.children:
+            node.triggers = TriggerTable(node.children).table
+            pending.extend(node.children.values())
+    return root
+
+
+def _sequence_entries(node):
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if node.entry is not None:
+            yield node.entry
+        pending.extend(node.children.values())
+
+
+class HotkeyIndex:
+    """预编译的快捷键分发表: 快捷键签名 -> 条目
+
+    只在条目变化时重建，按键时只需一次哈希查找。
+    同一快捷键对应多个条目时，以列表中靠后的条目为准(与逐条复制时最后一次生效一致)。
+    triggers 为用到的按键表(TriggerTable.table)，供键盘钩子快速忽略无关按键。
+    多步快捷键另存一张表，sequences 为由它建立的前缀树的根节点，
+    只在多步快捷键变化时整体重建。
+    latency 为快捷键签名 -> 触发耗时的直方图，记录指标时在编译和增删条目时
+    分配好，触发时只需查表。
+    """
+
+    def __init__(self, entries=(), latency=False):
+        self._table = {}
+        self._sequences = {}
+        self._counts = {}         # 签名 -> 使用该快捷键的条目数
+        self._supersets = {}      # 组合 -> 包含它的多键组合的签名，用于检查冲突
+        self._triggers = TriggerTable()
+        self.triggers = self._triggers.table
+        self.sequences = SequenceNode()
+        self._latency = latency
+        self.latency = {}
+        self.rebuild(entries)
+
+    def rebuild(self, entries):
+        table = {}
+        sequences = {}
+        counts = {}
+        for entry in entries:
+            signature = hotkey_signature(entry["hotkey"])
+            if signature:
+                (sequences if is_sequence(signature) else table)[signature] = entry
+                counts[signature] = counts.get(signature, 0) + 1
+        triggers = TriggerTable(counts)
+        latency = {}
+        if self._latency:
+            # 快捷键没有变化的条目保留已有的记录
+            latency = {signature: self.latency.get(signature) or Histogram()
+                       for signature in counts}
+        supersets = {}
+        for signature in table:
+            for subset in chord_subsets(signature):
+                supersets.setdefault(subset, set()).add(signature)
+        # 整体替换，监听线程不会看到构建到一半的表
+        self._counts = counts
+        self._supersets = supersets
+        self._table = table
+        self._sequences = sequences
+        self._triggers = triggers
+        self.sequences = build_sequences(sequences)
+        self.triggers = triggers.table
+        self.latency = latency
+
+    def track_latency(self, enabled, reset=False):
+        """开始或停止为每个快捷键记录触发耗时，reset 为 True 时清零已有的记录"""
+        if not enabled:
+            self.latency = {}
+        elif reset or not self._latency:
+            self.latency = {signature: Histogram() for signature in self._counts}
+        self._latency = enabled
+
+    def triggered(self):
+        """触发过的 [(条目, 耗时直方图)]"""
+        triggered = []
+        for signature, histogram in list(self.latency.items()):
+            entry = self._store(signature).get(signature)
+            if histogram.count and entry is not None:
+                triggered.append((entry, histogram))
+        return triggered
+
+    def _store(self, signature):
+        return self._sequences if is_sequence(signature) else self._table
+
+    def add(self, entry):
+        """条目追加到列表末尾时调用"""
+        signature = hotkey_signature(entry["hotkey"])
+        if signature:
+            self._count(signature, 1)
+            self._store(signature)[signature] = entry
+            if is_sequence(signature):
+                self.sequences = build_sequences(self._sequences)
+
+    def _count(self, signature, delta):
+        count = self._counts.get(signature, 0) + delta
+        if count:
+            self._counts[signature] = count
+        else:
+            del self._counts[signature]
+            self.latency.pop(signature, None)
+        # 快捷键第一次出现或最后一条被删除时更新按键表
+        if count == 0 or (delta > 0 and count == 1):
+            if count and self._latency:
+                self.latency[signature] = Histogram()
+            self._triggers.add(signature, delta)
+            if not is_sequence(signature):
+                for subset in chord_subsets(signature):
+                    supersets = self._supersets.setdefault(subset, set())
+                    if count:
+                        supersets.add(signature)
+                    else:
+                        supersets.discard(signature)
+                        if not supersets:
+                            del self._supersets[subset]
+        return count
+
+    def update(self, removed, added, entries):
+        """增量更新: removed 为移出列表(或修改前)的条目，added 为插入列表的条目
+
+        只有涉及重复的快捷键时，才需要扫描更新后的 entries 确定以哪一条为准。
+        """
+        ambiguous = set()
+        sequences_changed = False
+        for entry in removed:
+            signature = hotkey_signature(entry["hotkey"])
+            if not signature:
+                continue
+            sequences_changed = sequences_changed or is_sequence(signature)
+            if self._count(signature, -1):
+                ambiguous.add(signature)
+            else:
+                self._store(signature).pop(signature, None)
+        for entry in added:
+            signature = hotkey_signature(entry["hotkey"])
+            if not signature:
+                continue
+            sequences_changed = sequences_changed or is_sequence(signature)
+            if self._count(signature, 1) == 1:
+                self._store(signature)[signature] = entry
+            else:
+                ambiguous.add(signature)
+        if ambiguous:
+            for entry in entries:
+                signature = hotkey_signature(entry["hotkey"])
+                if signature in ambiguous:
+                    self._store(signature)[signature] = entry
+        if sequences_changed:
+            self.sequences = build_sequences(self._sequences)
+
+    def get(self, signature):
+        return self._table.get(signature)
+
+    def lookup(self, keys):
+        """按按键名集合查找，例如 {'cmd', 'k'}"""
+        signature = key_signature(keys)
+        return self._table.get(signature) if signature else None
+
+    def count(self, signature):
+        """使用该快捷键的条目数"""
+        return self._counts.get(signature, 0)
+
+    def conflicts(self, hotkey):
+        """与 hotkey 冲突的条目 [(类型, 条目)]，类型见 DUPLICATE、SHADOWED、SHADOWS
+
+        相同的快捷键与多键组合的子集、超集都只需查表，与条目总数无关；
+        多步快捷键沿前缀树走 hotkey 的步数，再列出以它开头的较长快捷键。
+        同一快捷键有多条时只列出会触发的那条。
+        """
+        signature = hotkey_signature(hotkey)
+        if not signature:
+            return []
+        conflicts = []
+        entry = self._store(signature).get(signature)
+        if entry is not None:
+            conflicts.append((DUPLICATE, entry))
+        if not is_sequence(signature):
+            # 多键组合: 子集会先触发，包含它的组合会被它抢先
+            table = self._table
+            conflicts.extend((SHADOWED, table[subset])
+                             for subset in chord_subsets(signature)
+                             if subset in table)
+            conflicts.extend((SHADOWS, table[superset])
+                             for superset in self._supersets.get(signature, ()))
+        steps = signature if is_sequence(signature) else (signature,)
+        # 较短的一方: 单步快捷键，以及走到这一步的路径上结束的多步快捷键(例如 alt+q 与 alt+q, 3)
+        entry = self._table.get(steps[0])
+        if entry is not None and len(steps) > 1:
+            conflicts.append((SHADOWED, entry))
+        node = self.sequences
+        for depth, step in enumerate(steps, 1):
+            node = node.children.get(step)
+            if node is None:
+                return conflicts
+            if node.entry is not None and depth < len(steps):
+                conflicts.append((SHADOWED, node.entry))
+        # 较长的一方: 以 hotkey 开头的多步快捷键
+        for child in node.children.values():
+            conflicts.extend((SHADOWS, other) for other in _sequence_entries(child))
+        return conflicts
+
+    def __len__(self):
+        return len(self._table) + len(self._sequences)
+
+
+def find_conflicts(entries):
+    """列出条目列表中所有的快捷键冲突 [(类型, 行号, 对方行号)]
+
+    第 row 条因为第 other 条而不能(可靠地)触发，类型为 DUPLICATE 或 SHADOWED。
+    先按签名分组，之后每条只需常数次查表。
+    """
+    signatures = [hotkey_signature(entry["hotkey"]) for entry in entries]
+    rows_of = {}
+    for row, signature in enumerate(signatures):
+        if signature:
+            rows_of.setdefault(signature, []).append(row)
+    conflicts = []
+    for row, signature in enumerate(signatures):
+        if not signature:
+            continue
+        last = rows_of[signature][-1]
+        if last != row:
+            conflicts.append((DUPLICATE, row, last))
+        if is_sequence(signature):
+            shorter = [signature[0]]
+            shorter.extend(signature[:depth] for depth in range(2, len(signature)))
+        else:
+            shorter = chord_subsets(signature)
+        for other in shorter:
+            rows = rows_of.get(other)
+            if rows:
+                conflicts.append((SHADOWED, row, rows[-1]))
+    return conflicts
@@ -0,0 +1,196 @@
+"""运行时指标: 键盘钩子、匹配、剪贴板写入的耗时直方图与每条短语的触发统计
+
+直方图按 2 的幂分桶，计数保存在创建时就分配好的定长列表中，记录一次耗时
+只是一次 bit_length 查表和几次加法，不创建列表、字典等对象。每个直方图只由
+一个线程写入(钩子线程、分发线程或剪贴板写入线程)，界面读取时不加锁，
+读到的数字可能相差一两次，不影响显示。
+"""
+import json
+import os
+import threading
+import time
+
+# 分桶上界(纳秒): 1.024 微秒到 67 毫秒之间的 2 的幂，超过最后一个上界的计入溢出桶
+BUCKET_BOUNDS_NS = tuple(1 << bits for bits in range(10, 27))
+BUCKETS = len(BUCKET_BOUNDS_NS) + 1
+# 耗时的二进制位数 -> 分桶，比二分查找分桶上界快
+_BUCKET_OF_BITS = tuple(min(max(bits - 10, 0), BUCKETS - 1)
+                        for bits in range(65))
+# 分桶计数之后依次保存样本数、总耗时与最大耗时
+_COUNT = BUCKETS
+_TOTAL = BUCKETS + 1
+_MAX = BUCKETS + 2
+
+# 指标文件的写入间隔(秒)
+DUMP_INTERVAL = 10
+
+PROMETHEUS_PREFIX = "dota2_clipboard"
+
+
+class Histogram:
+    """固定分桶的耗时直方图"""
+    __slots__ = ("counts",)
+
+    def __init__(self):
+        self.counts = [0] * (BUCKETS + 3)
+
+    def observe(self, ns):
+        counts = self.counts
+        counts[_BUCKET_OF_BITS[ns.bit_length()]] += 1
+        counts[_COUNT] += 1
+        counts[_TOTAL] += ns
+        if ns > counts[_MAX]:
+            counts[_MAX] = ns
+
+    @property
+    def count(self):
+        return self.counts[_COUNT]
+
+    def quantile(self, q):
+        """按分桶估计的分位数(纳秒): 所在分桶的上界，溢出桶取最大值"""
+        counts = self.counts
+        total = counts[_COUNT]
+        if not total:
+            return 0
+        rank = q * total
+        seen = 0
+        for bucket, bound in enumerate(BUCKET_BOUNDS_NS):
+            seen += counts[bucket]
+            if seen >= rank:
+                return min(bound, counts[_MAX])
+        return counts[_MAX]
+
+    def summary(self):
+        counts = self.counts
+        total = counts[_COUNT]
+        return {
+            "count": total,
+            "mean_us": counts[_TOTAL] / total / 1000 if total else 0.0,
+            "p50_us": self.quantile(0.5) / 1000,
+            "p99_us": self.quantile(0.99) / 1000,
+            "max_us": counts[_MAX] / 1000,
+            "buckets": counts[:BUCKETS],
+            "sum_us": counts[_TOTAL] / 1000,
+        }
+
+
+class Metrics:
+    """一次运行的全部指标"""
+
+    def __init__(self):
+        # 入队按键入队本身的耗时，直接忽略的按键不读时钟也不计时(钩子线程)
+        self.hook = Histogram()
+        # 按键入队到分发线程取出的等待时间(分发线程)
+        self.queue = Histogram()
+        # 快捷键签名查表的耗时(分发线程)
+        self.match = Histogram()
+        # 剪贴板后端写入的耗时(剪贴板写入线程或主线程)
+        self.write = Histogram()
+        # 自动发送: 从按下到合成的回车发出(自动发送线程)
+        self.paste = Histogram()
+        # 每条短语从按下到交给剪贴板的耗时由 HotkeyIndex.latency 记录，
+        # 直方图在编译分发表时分配好
+
+    def report(self, entries=()):
+        """整理为可序列化的字典，entries 为 [(条目, 耗时直方图)]，按触发次数从多到少排列"""
+        entries = [dict(text=entry["text"], hotkey=entry["hotkey"],
+                        **histogram.summary())
+                   for entry, histogram in entries]
+        entries.sort(key=lambda entry: -entry["count"])
+        return {
+            "timestamp": time.time(),
+            "bucket_bounds_us": [bound / 1000 for bound in BUCKET_BOUNDS_NS],
+            "hook": self.hook.summary(),
+            "queue": self.queue.summary(),
+            "match": self.match.summary(),
+            "write": self.write.summary(),
+            "paste": self.paste.summary(),
+            "entries": entries,
+        }
+
+
+def _label(value):
+    return (str(value).replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"'))
+
+
+def _prometheus_histogram(lines, name, summary, labels=""):
+    cumulative = 0
+    for bound, count in zip(BUCKET_BOUNDS_NS, summary["buckets"]):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels}le="{bound / 1e9:g}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {summary["count"]}')
+    labels = "{" + labels.rstrip(",") + "}" if labels else ""
+    lines.append(f'{name}_sum{labels} {summary["sum_us"] / 1e6:g}')
+    lines.append(f'{name}_count{labels} {summary["count"]}')
+
+
+def to_prometheus(report):
+    """Prometheus 文本格式，可由 node_exporter 的 textfile 收集器读取"""
+    lines = []
+    for part, description in (
+            ("hook", "Keyboard hook callback duration"),
+            ("queue", "Time a key press waits in the dispatch queue"),
+            ("match", "Hotkey lookup duration"),
+            ("write", "Clipboard backend write duration"),
+            ("paste", "Time from key press to the synthesized send key")):
+        name = f"{PROMETHEUS_PREFIX}_{part}_seconds"
+        lines.append(f"# HELP {name} {description}.")
+        lines.append(f"# TYPE {name} histogram")
+        _prometheus_histogram(lines, name, report[part])
+
+    name = f"{PROMETHEUS_PREFIX}_entry_latency_seconds"
+    lines.append(f"# HELP {name} Time from key press to clipboard hand-off per phrase.")
+    lines.append(f"# TYPE {name} histogram")
+    for entry in report["entries"]:
+        _prometheus_histogram(lines, name, entry,
+                              f'phrase="{_label(entry["text"])}",')
+
+    suppressed = report.get("suppressed")
+    if suppressed:
+        name = f"{PROMETHEUS_PREFIX}_suppressed_writes_total"
+        lines.append(f"# HELP {name} Clipboard writes skipped, by reason.")
+        lines.append(f"# TYPE {name} counter")
+        for reason, count in suppressed.items():
+            lines.append(f'{name}{{reason="{reason}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+def write_report(report, path):
+    """按扩展名写入 JSON 或 Prometheus 文本(.prom/.txt)，先写临时文件再替换"""
+    if path.endswith((".prom", ".txt")):
+        data = to_prometheus(report)
+    else:
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class MetricsFile:
+    """后台线程定期把 report() 的结果写入文件，关闭时再写一次"""
+
+    def __init__(self, path, report, interval=DUMP_INTERVAL):
+        self.path = path
+        self.report = report
+        self.interval = interval
+        self._closing = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-file", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._closing.wait(self.interval):
+            self.dump()
+
+    def dump(self):
+        try:
+            write_report(self.report(), self.path)
+        except OSError as e:
+            print(f"写入指标文件 {self.path} 失败: {e}")
+
+    def close(self):
+        self._closing.set()
+        self._thread.join(timeout=1)
+        self.dump()
@@ -0,0 +1,211 @@
+"""短语库的导入导出: JSON Lines、CSV 与 settings.json 格式
+
+导入在后台线程中逐条解析，每解析出 BATCH_SIZE 条交给调用方一次，
+调用方分批追加到条目列表；快捷键分发表也在导入线程中一次建好，界面只需换上。
+"""
+import csv
+import itertools
+import json
+import os
+import threading
+import traceback
+
+from hotkeys import HotkeyIndex, find_conflicts, hotkey_signature, normalize_hotkey
+from settings_store import parse_settings, write_settings
+
+# 每批交给界面的条目数
+BATCH_SIZE = 2000
+
+# 扩展名 -> 格式，.json 为 settings.json 的格式(只导入当前配置的条目)
+FORMATS = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv", ".json": "json"}
+# 文件对话框的过滤器及其对应的扩展名
+FILE_FILTERS = {
+    "JSON Lines (*.jsonl)": ".jsonl",
+    "CSV (*.csv)": ".csv",
+    "设置文件 (*.json)": ".json",
+}
+# CSV 的列，没有表头时也按这个顺序读取
+CSV_FIELDS = ["text", "hotkey", "auto_paste"]
+
+
+def file_format(path):
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"不支持的文件格式: {os.path.basename(path)}"
+                         "，请使用 .jsonl、.csv 或 .json")
+    return fmt
+
+
+def _truthy(value):
+    return str(value).strip().lower() in ("1", "true", "yes")
+
+
+def make_entry(record):
+    """文件中的一条记录 -> 条目，缺少文本或快捷键无法触发时返回 None"""
+    if not isinstance(record, dict):
+        return None
+    text, hotkey = record.get("text"), record.get("hotkey")
+    if not isinstance(text, str) or not isinstance(hotkey, str) or not text:
+        return None
+    hotkey = normalize_hotkey(hotkey)
+    if hotkey_signature(hotkey) is None:
+        return None
+    entry = {"text": text, "hotkey": hotkey}
+    if _truthy(record.get("auto_paste")):
+        entry["auto_paste"] = True
+    return entry
+
+
+def read_records(f, fmt):
+    """逐条生成文件中的记录，JSON Lines 中无法解析的行生成 None"""
+    if fmt == "jsonl":
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+    elif fmt == "csv":
+        rows = csv.reader(f)
+        header = next(rows, None)
+        if header is None:
+            return
+        names = [name.strip().lower() for name in header]
+        if "text" not in names or "hotkey" not in names:
+            # 没有表头，第一行也是短语
+            rows = itertools.chain([header], rows)
+            names = CSV_FIELDS
+        for row in rows:
+            yield dict(zip(names, row))
+    else:
+        # json 模块不能流式解析，设置文件整体读取后再逐条生成
+        yield from parse_settings(json.load(f))["entries"]
+
+
+def count_conflicts(entries, start):
+    """导入后的条目中涉及第 start 条之后(导入的)条目的快捷键冲突数"""
+    return sum(1 for _, row, other in find_conflicts(entries)
+               if row >= start or other >= start)
+
+
+def read_batches(path, existing=(), batch_size=BATCH_SIZE, stats=None):
+    """逐批生成 (条目列表, 已读取的比例)
+
+    existing 为已有条目的 (文本, 快捷键)，与之相同以及文件中重复的条目跳过。
+    stats 不为空时在其中累计 imported、duplicates、invalid。
+    """
+    fmt = file_format(path)
+    if stats is None:
+        stats = {}
+    stats.update(imported=0, duplicates=0, invalid=0)
+    seen = set(existing)
+    # utf-8-sig 兼容 Excel 保存的带 BOM 的 CSV
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        size = os.fstat(f.fileno()).st_size or 1
+        batch = []
+        for record in read_records(f, fmt):
+            entry = make_entry(record)
+            if entry is None:
+                stats["invalid"] += 1
+                continue
+            key = (entry["text"], entry["hotkey"])
+            if key in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(key)
+            batch.append(entry)
+            if len(batch) == batch_size:
+                stats["imported"] += len(batch)
+                # 文本层按块读取，底层文件的位置略微超前，足够显示进度
+                yield batch, min(f.buffer.tell() / size, 1.0)
+                batch = []
+        if batch:
+            stats["imported"] += len(batch)
+            yield batch, 1.0
+
+
+class PhraseImporter:
+    """后台线程读取短语文件
+
+    entries 为导入前条目列表的副本，与之重复的条目跳过。每批调用一次
+    on_batch(entries, progress)，结束后调用 on_finished(stats)，都在导入线程中调用。
+    成功时 stats 的 index 为按导入后的条目建好的快捷键分发表，conflicts 为
+    导入的条目涉及的快捷键冲突数，出错时 error 为
+    错误信息；cancel() 之后不再生成新的批次，已交出的批次由调用方自行撤销。
+    """
+
+    def __init__(self, path, on_batch, on_finished, entries=(),
+                 batch_size=BATCH_SIZE):
+        self.path = path
+        self.on_batch = on_batch
+        self.on_finished = on_finished
+        self.entries = entries
+        self.batch_size = batch_size
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="phrase-import", daemon=True)
+        self._thread.start()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def _run(self):
+        stats = {"error": None, "index": None, "conflicts": 0}
+        entries = list(self.entries)
+        existing = {(entry["text"], entry["hotkey"]) for entry in entries}
+        try:
+            for batch, progress in read_batches(
+                    self.path, existing, self.batch_size, stats):
+                if self._cancelled.is_set():
+                    break
+                self.on_batch(batch, progress)
+                entries.extend(batch)
+            if not self._cancelled.is_set():
+                stats["index"] = HotkeyIndex(entries)
+                stats["conflicts"] = count_conflicts(entries, len(self.entries))
+        except (OSError, UnicodeDecodeError, ValueError, csv.Error) as e:
+            stats["error"] = str(e)
+        except Exception as e:
+            traceback.print_exc()
+            stats["error"] = str(e)
+        self.on_finished(stats)
+
+
+def export_entries(entries, path):
+    """按扩展名写入条目，先写临时文件再替换；.json 写为只有条目的设置文件"""
+    fmt = file_format(path)
+    if fmt == "json":
+        write_settings({"entries": list(entries)}, path)
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        # CSV 带 BOM，Excel 打开时中文不会乱码
+        with open(tmp_path, "w", newline="",
+                  encoding="utf-8-sig" if fmt == "csv" else "utf-8") as f:
+            if fmt == "jsonl":
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False))
+                    f.write("\n")
+            else:
+                writer = csv.writer(f)
+                writer.writerow(CSV_FIELDS)
+                writer.writerows(
+                    (entry["text"], entry["hotkey"],
+                     "true" if entry.get("auto_paste") else "")
+                    for entry in entries)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
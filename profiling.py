@@ -0,0 +1,292 @@
+"""性能分析: 启动耗时，以及按需开启的运行时 cProfile、栈采样与内存快照"""
+import atexit
+import builtins
+import os
+import signal
+import sys
+import threading
+import time
+
+# 打开运行时分析的环境变量，值为分析文件的输出目录
+PROFILE_ENV = "DOTA2_CLIPBOARD_PROFILE"
+# 命令行参数，可写为 --runtime-profile=目录
+PROFILE_FLAG = "--runtime-profile"
+DEFAULT_PROFILE_DIR = "profiles"
+# 栈采样的间隔(秒)
+SAMPLE_INTERVAL = 0.005
+# 内存报告中列出的条数
+MEMORY_TOP = 25
+
+
+class StartupProfiler:
+    """记录启动各阶段与顶层模块导入的耗时，未启用时 mark 不做任何事"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.phases = []
+        self.imports = {}
+        self._original_import = None
+
+    def track_imports(self):
+        """替换 __import__，统计每个模块首次导入(含其依赖)的耗时"""
+        if not self.enabled or self._original_import:
+            return
+        original = self._original_import = builtins.__import__
+        imports = self.imports
+        depth = 0
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            nonlocal depth
+            # 只统计最外层的首次导入，嵌套的导入计入外层模块
+            if depth or level or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            depth += 1
+            start = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                depth -= 1
+                imports[name] = imports.get(name, 0) + time.perf_counter() - start
+
+        builtins.__import__ = timed_import
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def report(self, top=10):
+        if not self.enabled:
+            return
+        if self._original_import:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+        print("\n=== 启动耗时 ===")
+        for phase, seconds in self.phases:
+            print(f"  {phase:<24} {seconds * 1000:8.1f} ms")
+        print(f"  {'合计':<24} {(self.last - self.start) * 1000:8.1f} ms")
+        if self.imports:
+            print(f"\n=== 导入耗时 (前 {top}) ===")
+            ranked = sorted(self.imports.items(), key=lambda x: -x[1])
+            for name, seconds in ranked[:top]:
+                print(f"  {name:<24} {seconds * 1000:8.1f} ms")
+        sys.stdout.flush()
+
+
+def runtime_profiler(argv):
+    """命令行带 --runtime-profile 或设置了环境变量时返回 RuntimeProfiler，否则返回 None"""
+    directory = os.environ.get(PROFILE_ENV)
+    for arg in argv:
+        if arg == PROFILE_FLAG:
+            directory = directory or DEFAULT_PROFILE_DIR
+        elif arg.startswith(PROFILE_FLAG + "="):
+            directory = arg.split("=", 1)[1]
+    if not directory:
+        return None
+    return RuntimeProfiler(directory)
+
+
+def strip_profile_flag(argv):
+    return [arg for arg in argv
+            if arg != PROFILE_FLAG and not arg.startswith(PROFILE_FLAG + "=")]
+
+
+def concurrent_profiles():
+    """能否同时打开多个 cProfile；3.12 起分析器由整个进程共用，同时只能有一个"""
+    import cProfile
+    first, second = cProfile.Profile(), cProfile.Profile()
+    try:
+        first.enable()
+        second.enable()
+    except ValueError:
+        # 已有其他分析工具，或不允许再打开第二个
+        return False
+    finally:
+        first.disable()
+    second.disable()
+    return True
+
+
+class _ThreadProfile:
+    """一个线程的 cProfile(只做栈采样时为 None)，depth 为正在执行的被分析函数的层数"""
+    __slots__ = ("name", "profile", "depth", "thread")
+
+    def __init__(self, name, profile):
+        self.name = name
+        self.profile = profile
+        self.depth = 0
+        self.thread = threading.current_thread()
+
+
+class RuntimeProfiler:
+    """运行时分析: 被包装的函数所在线程的 cProfile、这些线程的栈采样与 tracemalloc 快照
+
+    wrap() 返回的函数在调用时打开所在线程的 cProfile，钩子线程、分发线程等
+    都是这样接入的；未启用分析时调用方不包装，热路径上没有任何额外开销。
+    profile_thread() 让当前线程(Qt 事件循环所在的主线程)一直处于分析状态。
+    不能同时打开多个 cProfile 时(3.12 起)只做栈采样，被包装的函数只登记所在线程。
+    退出时，以及在支持的系统上收到 SIGUSR1 时，把结果写入带时间戳的文件:
+    每个线程一个 .prof(可用 pstats 或 snakeviz 查看)、栈采样的 .folded
+    (flamegraph.pl 可直接读取)，以及内存的 .tracemalloc 快照与文本摘要。
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        # 每个线程的 _ThreadProfile 保存在线程局部变量中，线程结束后 id 可能被复用
+        self._local = threading.local()
+        self._threads = []
+        # 名称 -> 无参数的函数，写入内存摘要，例如条目数
+        self._info = {}
+        # (线程名, 栈上的代码对象...) -> 采样次数
+        self._samples = {}
+        self._sampling = threading.Event()
+        self._lock = threading.Lock()
+        # 启动时检测一次，之后包装函数时据此选择是否使用 cProfile
+        self.cprofile = concurrent_profiles()
+
+    def start(self):
+        """开始记录内存分配与栈采样，注册退出与信号时的写入"""
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._sampling.set()
+        threading.Thread(target=self._sample, name="profile-sampler",
+                         daemon=True).start()
+        atexit.register(self.dump)
+        if hasattr(signal, "SIGUSR1"):
+            # 信号处理函数只在主线程执行 Python 代码时运行，Qt 事件循环中需要定时器唤醒
+            signal.signal(signal.SIGUSR1, lambda *_: self.dump())
+        print(f"运行时分析已开启，退出时写入 {os.path.abspath(self.directory)}"
+              + (f"，kill -USR1 {os.getpid()} 立即写入"
+                 if hasattr(signal, "SIGUSR1") else ""), flush=True)
+        if not self.cprofile:
+            print(f"警告: Python {sys.version_info.major}.{sys.version_info.minor} "
+                  "同时只能有一个 cProfile，运行时分析只使用栈采样", flush=True)
+
+    def add_info(self, name, value):
+        self._info[name] = value
+
+    def _thread_profile(self, name):
+        record = getattr(self._local, "record", None)
+        if record is None:
+            profile = None
+            if self.cprofile:
+                import cProfile
+                profile = cProfile.Profile()
+            record = self._local.record = _ThreadProfile(
+                f"{name}-{threading.current_thread().name}", profile)
+            with self._lock:
+                self._threads.append(record)
+        return record
+
+    def wrap(self, name, func):
+        """返回分析 func 的函数，第一次在某个线程中调用时为该线程创建 cProfile
+
+        只做栈采样时返回的函数不打开分析器，只确认所在线程已登记到栈采样中。
+        """
+        thread_profile = self._thread_profile
+        if not self.cprofile:
+            def sampled(*args, **kwargs):
+                thread_profile(name)
+                return func(*args, **kwargs)
+            return sampled
+
+        def profiled(*args, **kwargs):
+            record = thread_profile(name)
+            if not record.depth:
+                record.profile.enable()
+            record.depth += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record.depth -= 1
+                if not record.depth:
+                    record.profile.disable()
+        return profiled
+
+    def profile_thread(self, name):
+        """当前线程从此一直处于分析状态，用于 Qt 事件循环"""
+        record = self._thread_profile(name)
+        if record.profile is not None and not record.depth:
+            record.profile.enable()
+        record.depth += 1
+
+    def _sample(self):
+        samples = self._samples
+        while self._sampling.is_set():
+            time.sleep(SAMPLE_INTERVAL)
+            frames = sys._current_frames()
+            for record in list(self._threads):
+                thread = record.thread
+                # 线程结束后它的 id 可能已经属于别的线程
+                frame = frames.get(thread.ident) if thread.is_alive() else None
+                if frame is None:
+                    continue
+                stack = [record.name]
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                key = tuple(stack)
+                samples[key] = samples.get(key, 0) + 1
+            del frames
+
+    def dump(self):
+        """把目前为止的结果写入带时间戳的文件"""
+        import marshal
+        import tracemalloc
+        os.makedirs(self.directory, exist_ok=True)
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+        prefix = os.path.join(
+            self.directory, f"{stamp}.{int(now * 1000) % 1000:03d}-{os.getpid()}")
+        written = []
+        for record in list(self._threads):
+            if record.profile is None:
+                continue
+            # snapshot_stats 不关闭分析，其他线程可以继续运行
+            record.profile.snapshot_stats()
+            path = f"{prefix}-{record.name}.prof"
+            with open(path, "wb") as f:
+                marshal.dump(record.profile.stats, f)
+            written.append(path)
+
+        path = f"{prefix}-samples.folded"
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(list(self._samples.items()),
+                                       key=lambda item: -item[1]):
+                name, codes = stack[0], stack[:0:-1]
+                frames = ";".join(f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                                  f":{code.co_firstlineno})" for code in codes)
+                f.write(f"{name};{frames} {count}\n")
+        written.append(path)
+
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            snapshot.dump(f"{prefix}.tracemalloc")
+            path = f"{prefix}-memory.txt"
+            with open(path, "w", encoding="utf-8") as f:
+                self._write_memory(f, snapshot, tracemalloc)
+            written.extend([f"{prefix}.tracemalloc", path])
+        print("分析结果已写入:\n  " + "\n  ".join(written), flush=True)
+
+    def _write_memory(self, f, snapshot, tracemalloc):
+        current, peak = tracemalloc.get_traced_memory()
+        f.write(f"当前 {current / 1024:.0f} KiB，峰值 {peak / 1024:.0f} KiB\n")
+        for name, value in self._info.items():
+            try:
+                f.write(f"{name}: {value()}\n")
+            except Exception as e:
+                f.write(f"{name}: {e}\n")
+        # 条目由 json 解析创建，分发表在 hotkeys.py，表格与搜索索引在界面模块中
+        for group in ("filename", "lineno"):
+            f.write(f"\n=== 按{'文件' if group == 'filename' else '行'} (前 {MEMORY_TOP}) ===\n")
+            for stat in snapshot.statistics(group)[:MEMORY_TOP]:
+                f.write(f"{stat}\n")
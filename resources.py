@@ -0,0 +1,52 @@
+"""界面资源: 图标等文件的查找与缓存
+
+编译进程序的 Qt 资源(:/ 路径)优先；否则打包后在 PyInstaller 的解包目录
+sys._MEIPASS 中查找，开发时在源码目录中查找，与当前工作目录无关。
+路径只解析一次；QIcon 按名称缓存，光栅化后的图片按名称、尺寸和设备像素比缓存，
+表格各行绘制时共用同一张图片。只能在创建 QApplication 之后使用。
+"""
+import os
+import sys
+
+from PyQt6.QtCore import QFile, QSize
+from PyQt6.QtGui import QIcon
+
+DELETE_ICON = "delicon.svg"
+
+_paths = {}
+_icons = {}
+_pixmaps = {}
+
+
+def resource_dir():
+    if getattr(sys, "frozen", False):
+        return getattr(sys, "_MEIPASS", os.path.dirname(sys.executable))
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def resource_path(name):
+    path = _paths.get(name)
+    if path is None:
+        path = ":/" + name
+        if not QFile.exists(path):
+            path = os.path.join(resource_dir(), name)
+            if not os.path.exists(path):
+                print(f"找不到资源文件: {path}")
+        _paths[name] = path
+    return path
+
+
+def icon(name):
+    result = _icons.get(name)
+    if result is None:
+        result = _icons[name] = QIcon(resource_path(name))
+    return result
+
+
+def pixmap(name, size, ratio=1.0):
+    """size x size(逻辑像素)的图片，ratio 为绘制设备的像素比"""
+    key = (name, size, ratio)
+    result = _pixmaps.get(key)
+    if result is None:
+        result = _pixmaps[key] = icon(name).pixmap(QSize(size, size), ratio)
+    return result
@@ -0,0 +1,165 @@
+"""短语搜索: 条目文本与快捷键的 n-gram 倒排索引
+
+中文查询通常只有一两个字，三元组无法覆盖，因此按单字和二元组建立索引:
+一两个字的查询直接取对应的倒排表，更长的查询取其中最短的二元组倒排表，
+再逐条确认子串。
+"""
+from bisect import bisect_left
+from operator import add
+
+from hotkeys import normalize_hotkey
+
+# 文本与快捷键之间的分隔符，查询不会跨越两个字段
+SEPARATOR = "\x01"
+
+
+def normalize_text(text):
+    return text.casefold()
+
+
+def document_text(entry):
+    return (normalize_text(entry["text"]) + SEPARATOR +
+            normalize_hotkey(entry["hotkey"]))
+
+
+def document_grams(text):
+    """文本中出现的所有单字与二元组"""
+    grams = set(text)
+    grams.update(map(add, text, text[1:]))
+    return grams
+
+
+class SearchIndex:
+    """按条目增删改增量维护的倒排索引
+
+    每个条目分配一个递增的文档号。条目只会追加到末尾或被删除，
+    因此文档号的顺序就是条目在列表中的顺序，倒排表按文档号升序保存，
+    查询结果不需要再排序。条目列表与调用方共享，增删改之后再通知索引。
+    索引由界面在空闲时分批建立；查询时尚未索引的条目逐条比较，
+    不在查询中一次建完索引。
+    """
+
+    def __init__(self, entries=()):
+        self.rebuild(entries)
+
+    def rebuild(self, entries):
+        """重新开始为 entries 建立索引，实际的索引工作由 build 完成"""
+        self._entries = entries
+        self._order = []          # 已索引条目的文档号，按条目顺序排列
+        self._texts = {}          # 文档号 -> 规范化后的文本
+        self._postings = {}       # 单字或二元组 -> 升序的文档号列表
+        self._row_of = None       # 文档号 -> 行号，删除条目后才需要
+        self._next_doc = 0
+        # 上一次逐条比较的 (查询, 条目数, 匹配的行号)，逐字输入时只需再比较这些行
+        self._scanned = None
+
+    def build(self, limit=None):
+        """继续索引尚未处理的条目，最多 limit 条，返回是否已全部完成
+
+        界面可在空闲时分批调用，避免一次建立大索引时卡顿。
+        """
+        entries = self._entries
+        start = len(self._order)
+        end = len(entries) if limit is None else min(len(entries), start + limit)
+        for row in range(start, end):
+            self._append(entries[row])
+        return end == len(entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, entry):
+        """条目追加到列表末尾后调用，尚未索引到的条目由 build 处理"""
+        self._scanned = None
+        if len(self._order) == len(self._entries) - 1:
+            self._append(entry)
+
+    def _append(self, entry):
+        doc = self._next_doc
+        self._next_doc += 1
+        self._order.append(doc)
+        if self._row_of is not None:
+            self._row_of[doc] = len(self._order) - 1
+        self._index(doc, document_text(entry))
+
+    def remove(self, row):
+        """第 row 条从列表删除后调用"""
+        self._scanned = None
+        if row < len(self._order):
+            doc = self._order.pop(row)
+            self._row_of = None
+            self._unindex(doc)
+
+    def update(self, row, entry):
+        """条目的文本或快捷键修改后重新索引"""
+        self._scanned = None
+        if row < len(self._order):
+            doc = self._order[row]
+            self._unindex(doc)
+            self._index(doc, document_text(entry))
+
+    def _index(self, doc, text):
+        self._texts[doc] = text
+        for gram in document_grams(text):
+            docs = self._postings.setdefault(gram, [])
+            # 修改已有条目时文档号不在末尾
+            if docs and docs[-1] > doc:
+                docs.insert(bisect_left(docs, doc), doc)
+            else:
+                docs.append(doc)
+
+    def _unindex(self, doc):
+        text = self._texts.pop(doc)
+        for gram in document_grams(text):
+            docs = self._postings[gram]
+            del docs[bisect_left(docs, doc)]
+            if not docs:
+                del self._postings[gram]
+
+    def search(self, query):
+        """返回匹配条目的行号(升序)，查询为空时返回 None"""
+        query = normalize_text(query).strip()
+        if not query:
+            return None
+        if len(query) <= 2:
+            docs = self._postings.get(query, ())
+        else:
+            rarest = min((self._postings.get(query[i:i + 2], ())
+                          for i in range(len(query) - 1)), key=len)
+            texts = self._texts
+            docs = [doc for doc in rarest if query in texts[doc]]
+        rows = self._rows(docs)
+        if len(self._order) < len(self._entries):
+            rows.extend(self._scan(query))
+        return rows
+
+    def _scan(self, query):
+        """逐条比较尚未索引的条目
+
+        只比较文本和保存的快捷键(本程序写入的快捷键都已规范化)，不为每条
+        计算规范化的快捷键。查询是上一次查询的延长时只比较上次匹配的行。
+        """
+        entries = self._entries
+        start = len(self._order)
+        scanned = self._scanned
+        if (scanned is not None and scanned[0] in query
+                and scanned[1] == len(entries)):
+            rows = (row for row in scanned[2] if row >= start)
+        else:
+            rows = range(start, len(entries))
+        matches = []
+        for row in rows:
+            entry = entries[row]
+            if (query in normalize_text(entry["text"])
+                    or query in entry["hotkey"].lower()):
+                matches.append(row)
+        self._scanned = (query, len(entries), matches)
+        return matches
+
+    def _rows(self, docs):
+        if self._next_doc == len(self._order):
+            # 没有删除过条目时文档号就是行号
+            return list(docs)
+        if self._row_of is None:
+            self._row_of = {doc: row for row, doc in enumerate(self._order)}
+        return list(map(self._row_of.__getitem__, docs))
@@ -0,0 +1,620 @@
+"""快捷键服务: 条目、快捷键分发表、剪贴板写入与键盘监听，不依赖界面"""
+import queue
+import threading
+from contextlib import nullcontext
+from difflib import SequenceMatcher
+
+from autopaste import AutoPaster
+from clipboard_backends import ClipboardWriter, create_backend
+from clipboard_history import (DEFAULT_HISTORY_OPTIONS, ClipboardHistory,
+                               ClipboardRestorer)
+from dispatcher import HotkeyDispatcher
+from hotkeys import HotkeyIndex, find_conflicts, hotkey_signature
+from metrics import Metrics, MetricsFile
+from settings_store import (DEFAULT_OPTIONS, SETTINGS_FILE, SettingsStore,
+                            read_settings)
+from templates import TemplateRenderer
+
+# 没有预设文案时使用的默认文案
+DEFAULT_ENTRIES = [
+    {"text": "已使自身本场比赛的积分得失加倍!", "hotkey": "cmd+y"},
+    {"text": "由于挂机行为已经被系统从游戏中踢出，他的战绩也会记录为逃跑，玩家现在离开该场比赛将不会被判定为放弃。",
+        "hotkey": "cmd+u"},
+    {"text": "已经放弃了游戏，这场比赛不计入天梯积分，剩余玩家可以自由退出。", "hotkey": "cmd+i"},
+    {"text": "由于长时间没有重连至游戏，系统判定他为逃跑。玩家现在离开该场比赛将不会被判定为放弃。", "hotkey": "cmd+o"},
+    {"text": "已经连续{count}次预测他们队伍将取得胜利！", "hotkey": "cmd+p"},
+    {"text": "经系统检测：玩家{player}存在代练或共享账号嫌疑，遵守社区游戏规范，再次违反将进行封禁处理。",
+        "hotkey": "cmd+["}
+]
+
+
+DEFAULT_PROFILE = "默认"
+
+# 条目差异操作: (DELETE, 行号, 条数) / (INSERT, 行号, 条目列表) / (EDIT, 行号, 新条目)
+DELETE = "delete"
+INSERT = "insert"
+EDIT = "edit"
+
+
+def _entry_key(entry):
+    return entry.get("text"), entry.get("hotkey")
+
+
+def diff_entries(old, new):
+    """计算把 old 变为 new 的增删改操作，按行号从大到小排列，可依次执行
+
+    先去掉相同的开头和结尾，只对中间变化的部分做序列比较，
+    通常的修改(追加、改一两条)与条目总数无关。序列比较只看文本和快捷键，
+    对齐后再逐条比较，其他字段的变化也会成为修改操作。
+    """
+    start, limit = 0, min(len(old), len(new))
+    while start < limit and old[start] == new[start]:
+        start += 1
+    old_end, new_end = len(old), len(new)
+    while old_end > start and new_end > start and old[old_end - 1] == new[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+    if start == old_end == new_end:
+        return []
+
+    matcher = SequenceMatcher(
+        None, [_entry_key(e) for e in old[start:old_end]],
+        [_entry_key(e) for e in new[start:new_end]], autojunk=False)
+    groups = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        i1, i2, j1, j2 = i1 + start, i2 + start, j1 + start, j2 + start
+        if tag == "equal":
+            groups.extend([(EDIT, i1 + k, new[j1 + k])]
+                          for k in range(i2 - i1) if old[i1 + k] != new[j1 + k])
+            continue
+        if tag == "replace" and i2 - i1 == j2 - j1:
+            groups.append([(EDIT, i1 + k, new[j1 + k]) for k in range(i2 - i1)][::-1])
+            continue
+        group = []
+        if i2 > i1:
+            group.append((DELETE, i1, i2 - i1))
+        if j2 > j1:
+            group.append((INSERT, i1, new[j1:j2]))
+        groups.append(group)
+    return [op for group in reversed(groups) for op in group]
+
+
+class Profile:
+    """一组短语。快捷键分发表在第一次使用时才编译，之后切换只需替换引用"""
+
+    def __init__(self, name, entries):
+        self.name = name
+        self.entries = entries
+        self.index = None
+        # 切换配置的线程与界面线程可能同时编译同一个配置，只编译一次
+        self._compile_lock = threading.Lock()
+
+    def compile(self, templates, latency=False):
+        """latency 为 True 时同时为每个快捷键分配触发耗时的直方图"""
+        with self._compile_lock:
+            if self.index is None:
+                for entry in self.entries:
+                    templates.add(entry["text"])
+                self.index = HotkeyIndex(self.entries, latency)
+            return self.index
+
+
+class ImportTarget:
+    """一次导入的目标: 开始导入时的配置与它的条目列表，以及导入期间推迟的操作"""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.entries = profile.entries
+        self.start = len(profile.entries)
+        self.deferred = []
+
+
+class HotkeyService:
+    def __init__(self, settings_path=SETTINGS_FILE, clipboard_backend=None,
+                 listener_factory=None, controller_factory=None):
+        """clipboard_backend、listener_factory 与 controller_factory 用于测试和基准，
+        可替换剪贴板后端、pynput 的 keyboard.Listener 与 keyboard.Controller"""
+        self.settings_path = settings_path
+        self.clipboard_backend = clipboard_backend
+        self.listener_factory = listener_factory
+        self.controller_factory = controller_factory
+        self.settings = dict(DEFAULT_OPTIONS)
+        self.profile = Profile(DEFAULT_PROFILE, [])
+        self.profile.index = HotkeyIndex()
+        self.profiles = {DEFAULT_PROFILE: self.profile}
+        self.templates = TemplateRenderer()
+        # 切换配置后的回调，可能在分发线程中调用
+        self.on_profile_changed = None
+        # 编译后再切换配置的任务队列，第一次需要时才创建线程
+        self._profile_jobs = None
+        # 设置文件被外部修改后的回调，在监视线程中调用；未设置时直接合并
+        self.on_settings_changed = None
+        self.watcher = None
+        # 正在进行的导入(ImportTarget)；导入期间切换配置与合并外部修改的设置都推迟
+        self.importing = None
+        self._import_lock = threading.RLock()
+        # 条目每次变化加一，用于判断后台算好的差异是否仍然适用
+        self.revision = 0
+        self.store = SettingsStore(self.settings_snapshot, settings_path)
+        self.clipboard = None
+        self.dispatcher = None
+        self.keyboard_listener = None
+        self.paster = None
+        # 剪贴板历史，clipboard_history 的 capacity 为 0 时为 None
+        self.history = None
+        self.restorer = None
+        self.metrics = Metrics()
+        self.metrics_file = None
+        # profiling.RuntimeProfiler，在 start() 之前设置时分析钩子、分发与设置写入
+        self.profiler = None
+
+    @property
+    def entries(self):
+        return self.profile.entries
+
+    @property
+    def hotkey_index(self):
+        return self.profile.index
+
+    def load(self, settings=None):
+        """读取设置并编译当前配置的快捷键，其余配置在切换到时才编译
+
+        entries 保存当前配置的条目，profiles 保存其余配置；
+        只有一个配置且没有条目时使用默认文案。settings 为
+        settings_snapshot() 的结果时直接使用，不读取文件。
+        """
+        if settings is not None:
+            settings = dict(settings)
+        else:
+            try:
+                settings = read_settings(self.settings_path)
+            except FileNotFoundError:
+                settings = dict(DEFAULT_OPTIONS, entries=[])
+        entries = settings.pop("entries")
+        others = settings.pop("profiles", {})
+        name = settings.pop("profile", DEFAULT_PROFILE)
+        self.settings = settings
+        if not entries and not others:
+            entries = [dict(entry) for entry in DEFAULT_ENTRIES]
+        self._set_profiles(name, entries, others)
+
+    def _set_profiles(self, name, entries, others):
+        profiles = {name: Profile(name, entries)}
+        for other, other_entries in others.items():
+            profiles.setdefault(other, Profile(other, other_entries))
+        self.templates.load(entries, self.settings["variables"])
+        # 按名称排列，切换快捷键的顺序不随当前配置变化
+        self.profiles = dict(sorted(profiles.items()))
+        self._activate(profiles[name])
+        self._configure_dispatcher()
+
+    def _submit_profile_job(self, name):
+        """在后台线程中编译 name 配置后切换过去；入队不等待"""
+        if self._profile_jobs is None:
+            self._profile_jobs = queue.SimpleQueue()
+            threading.Thread(target=self._run_profile_jobs, args=(self._profile_jobs,),
+                             name="profile-compile", daemon=True).start()
+        self._profile_jobs.put(name)
+
+    def _run_profile_jobs(self, jobs):
+        while True:
+            self.switch_profile(jobs.get())
+
+    def start(self, on_recorded=None, watch=False):
+        """创建剪贴板后端与分发线程，并启动键盘监听
+
+        watch 为 True 时监视设置文件的外部修改。
+        """
+        backend = self.clipboard_backend
+        if backend is None:
+            # 剪贴板后端可在 settings.json 的 clipboard_backend 中选择
+            backend = create_backend(self.settings["clipboard_backend"])
+        self.clipboard = ClipboardWriter(backend)
+        self.dispatcher = HotkeyDispatcher(
+            self.hotkey_index, self.clipboard.copy, on_recorded=on_recorded,
+            render=self.templates.render)
+        self.dispatcher.paste = self._auto_paste
+        self._configure_dispatcher()
+        on_press = self.dispatcher.on_press
+        on_release = self.dispatcher.on_release
+        profiler = self.profiler
+        if profiler is not None:
+            # 只在启用分析时包装，未启用时钩子回调没有额外开销
+            on_press = profiler.wrap("hook", on_press)
+            on_release = profiler.wrap("hook", on_release)
+            self.dispatcher.handle_event = profiler.wrap(
+                "dispatcher", self.dispatcher.handle_event)
+            self.store.save = profiler.wrap("settings", self.store.save)
+            profiler.add_info("条目数", lambda: len(self.entries))
+        self.dispatcher.start()
+
+        listener_factory = self.listener_factory
+        if listener_factory is None:
+            # 延迟导入: 没有图形环境的 Linux 上导入 pynput 会失败
+            from pynput import keyboard
+            listener_factory = keyboard.Listener
+        # 钩子回调只入队，匹配、复制在分发线程完成
+        self.keyboard_listener = listener_factory(
+            on_press=on_press, on_release=on_release)
+        self.keyboard_listener.start()
+        if watch:
+            self.watch_settings()
+
+    def _auto_paste(self, text, timestamp):
+        # 第一次自动发送时才创建 Controller，不影响启动时间
+        if self.paster is None:
+            controller_factory = self.controller_factory
+            try:
+                if controller_factory is None:
+                    from pynput.keyboard import Controller as controller_factory
+                paster = AutoPaster(controller_factory(), self.dispatcher,
+                                    self.clipboard, self.settings["auto_paste"])
+            except Exception as e:
+                print(f"无法模拟按键，自动发送不可用: {e}")
+                self.dispatcher.paste = None
+                return
+            paster.metrics = self.dispatcher.metrics
+            self.paster = paster
+        self.paster.paste(text, timestamp)
+
+    def watch_settings(self):
+        try:
+            from settings_watcher import SettingsWatcher
+        except ImportError:
+            print("未安装 watchdog，不监视设置文件的修改")
+            return
+        self.watcher = SettingsWatcher(
+            self.settings_path, self._settings_changed, self.store)
+
+    def _settings_changed(self, settings):
+        # 在监视线程中预先算好差异，界面线程只需执行
+        revision = self.revision
+        ops = diff_entries(list(self.entries), settings["entries"])
+        if self.on_settings_changed:
+            self.on_settings_changed(settings, ops, revision)
+        else:
+            self.apply_settings(settings, ops=ops, revision=revision)
+
+    def apply_settings(self, settings, changing=None, ops=None, revision=None):
+        """合并外部修改后的设置
+
+        当前配置和配置列表不变时，只对当前配置的条目执行增删改并返回这些操作；
+        否则整体替换并返回 None。changing(op) 是可选的上下文管理器，
+        界面用它在每个操作前后通知表格。ops 为基于第 revision 版条目
+        预先算好的差异，条目在此之后又有修改时重新计算。
+        """
+        with self._import_lock:
+            # 导入结束后再合并，届时条目已变化，重新计算差异；返回 None 由界面整体刷新
+            if self._defer_during_import(lambda: self.apply_settings(settings)):
+                return None
+        settings = dict(settings)
+        entries = settings.pop("entries")
+        others = settings.pop("profiles", {})
+        name = settings.pop("profile", DEFAULT_PROFILE)
+        self.settings = settings
+        if settings["variables"] != self.templates.variables:
+            self.templates.set_variables(settings["variables"])
+        if name != self.profile.name or {name, *others} != set(self.profiles):
+            self._set_profiles(name, entries, others)
+            return None
+        for other, other_entries in others.items():
+            if other != name and self.profiles[other].entries != other_entries:
+                self.profiles[other] = Profile(other, other_entries)
+        if ops is None or revision != self.revision:
+            ops = diff_entries(self.entries, entries)
+        self.apply_entry_ops(ops, changing)
+        self._configure_dispatcher()
+        return ops
+
+    def apply_entry_ops(self, ops, changing=None):
+        """依次执行 diff_entries 返回的操作，快捷键分发表随之增量更新"""
+        entries = self.entries
+        removed, added = [], []
+        for op in ops:
+            kind, row, value = op
+            with changing(op) if changing else nullcontext():
+                if kind == DELETE:
+                    removed.extend(entries[row:row + value])
+                    del entries[row:row + value]
+                elif kind == INSERT:
+                    entries[row:row] = value
+                    added.extend(value)
+                else:
+                    removed.append(entries[row])
+                    entries[row] = value
+                    added.append(value)
+        for entry in added:
+            self.templates.add(entry["text"])
+        self.hotkey_index.update(removed, added, entries)
+        self.revision += 1
+
+    def stop(self):
+        if self.watcher:
+            self.watcher.close()
+            self.watcher = None
+        if self.keyboard_listener:
+            self.keyboard_listener.stop()
+            self.keyboard_listener = None
+        if self.dispatcher:
+            self.dispatcher.stop()
+        if self.paster:
+            self.paster.close()
+            self.paster = None
+        if self.restorer:
+            self.restorer.close()
+            self.restorer = None
+        if self.clipboard:
+            self.clipboard.close()
+        if self.metrics_file:
+            # 最后再写一次，包括退出前的触发
+            self.metrics_file.close()
+            self.metrics_file = None
+        self.store.close()
+
+    def add_entry(self, text, hotkey):
+        entry = {"text": text, "hotkey": hotkey}
+        self.entries.append(entry)
+        self.templates.add(text)
+        self.hotkey_index.add(entry)
+        self.revision += 1
+        return entry
+
+    def begin_import(self):
+        """开始向当前配置导入，返回导入前的条数
+
+        导入只作用于此时的配置和条目列表；到 finish_import 或 cancel_import
+        之前，切换配置和合并外部修改的设置都推迟到导入结束后执行。
+        """
+        with self._import_lock:
+            self.importing = ImportTarget(self.profile)
+            return self.importing.start
+
+    def import_entries(self, entries):
+        """追加一批导入的条目；快捷键分发表等到 finish_import 时才重建"""
+        self.importing.entries.extend(entries)
+        self.revision += 1
+
+    def finish_import(self, index=None):
+        """导入完成: 编译新条目的模板，换上或整体重建一次快捷键分发表
+
+        index 为导入线程按导入后的条目建好的分发表，调用方确认条目在导入
+        期间没有其他修改时才传入。返回导入期间推迟的操作，调用方更新完界面后
+        依次执行。
+        """
+        with self._import_lock:
+            target, self.importing = self.importing, None
+            entries = target.entries
+            for row in range(target.start, len(entries)):
+                self.templates.add(entries[row]["text"])
+            profile = target.profile
+            if index is None:
+                if len(entries) > target.start:
+                    profile.index.rebuild(entries)
+            else:
+                index.track_latency(self.settings["metrics"])
+                # 只替换引用，分发线程要么看到旧表要么看到新表
+                profile.index = index
+                if self.dispatcher and profile is self.profile:
+                    self.dispatcher.index = index
+            self.revision += 1
+        return target.deferred
+
+    def cancel_import(self):
+        """撤销导入: 删除开始导入的配置中追加的条目，分发表尚未包含它们
+
+        与 finish_import 一样返回导入期间推迟的操作。
+        """
+        with self._import_lock:
+            target, self.importing = self.importing, None
+            del target.entries[target.start:]
+            self.revision += 1
+        return target.deferred
+
+    def _defer_during_import(self, action):
+        """正在导入时推迟 action 并返回 True；在导入锁内调用"""
+        if self.importing is None:
+            return False
+        self.importing.deferred.append(action)
+        return True
+
+    def hotkey_conflicts(self, hotkey, entry=None):
+        """当前配置中与 hotkey 冲突的条目 [(类型, 条目)]，不含 entry 本身
+
+        只需查表，添加或修改一条短语前都可以检查。
+        """
+        return [(kind, other) for kind, other in self.hotkey_index.conflicts(hotkey)
+                if other is not entry]
+
+    def find_conflicts(self):
+        """当前配置中所有的快捷键冲突 [(类型, 行号, 对方行号)]，扫描一遍条目"""
+        return find_conflicts(self.entries)
+
+    def delete_entry(self, row):
+        entry = self.entries.pop(row)
+        self.hotkey_index.update([entry], [], self.entries)
+        self.revision += 1
+
+    def set_hotkey(self, row, hotkey):
+        entry = self.entries[row]
+        previous = dict(entry)
+        entry["hotkey"] = hotkey
+        self.hotkey_index.update([previous], [entry], self.entries)
+        self.revision += 1
+
+    def set_auto_paste(self, row, enabled):
+        """复制后是否自动打开聊天框、粘贴并发送；分发线程直接读取条目的这个字段"""
+        entry = self.entries[row]
+        if enabled:
+            entry["auto_paste"] = True
+        else:
+            entry.pop("auto_paste", None)
+        self.revision += 1
+
+    def set_variable(self, name, value):
+        """修改模板变量，之前的渲染缓存随之作废"""
+        self.templates.set_variable(name, value)
+        self.settings["variables"] = self.templates.variables
+
+    def switch_profile(self, name):
+        """切换到 name 配置，不存在时新建一个空配置
+
+        正在导入时推迟到导入结束后在后台线程中切换，返回 None。
+        """
+        with self._import_lock:
+            if self._defer_during_import(lambda: self._submit_profile_job(name)):
+                return None
+            profile = self.profiles.get(name)
+            if profile is None:
+                profile = Profile(name, [])
+                self.profiles = dict(sorted({**self.profiles, name: profile}.items()))
+                self._configure_dispatcher()
+            if profile is not self.profile:
+                self._activate(profile)
+                self.save()
+                if self.on_profile_changed:
+                    self.on_profile_changed(profile.name)
+            return profile
+
+    def next_profile(self):
+        """按顺序切换到下一个配置，由切换快捷键在分发线程中调用
+
+        配置已编译过时直接替换引用；第一次切换到它时交给另一个线程
+        编译后再切换，分发线程不等待，期间仍按原配置触发。
+        """
+        names = list(self.profiles)
+        name = names[(names.index(self.profile.name) + 1) % len(names)]
+        if self.profiles[name].index is None:
+            self._submit_profile_job(name)
+        else:
+            self.switch_profile(name)
+
+    def _activate(self, profile):
+        profile.compile(self.templates, self.settings["metrics"])
+        profile.index.track_latency(self.settings["metrics"])
+        self.revision += 1
+        # 只替换引用，分发线程要么看到旧表要么看到新表
+        self.profile = profile
+        if self.dispatcher:
+            self.dispatcher.index = profile.index
+
+    def _configure_dispatcher(self):
+        """按设置更新分发器: 有多个配置时注册切换配置的快捷键，
+        同一快捷键的最小触发间隔、多步快捷键的步间超时、自动发送的按键、
+        剪贴板历史，以及是否记录指标"""
+        if self.dispatcher is None:
+            return
+        self.dispatcher.min_interval_ns = int(
+            self.settings["hotkey_interval_ms"] * 1_000_000)
+        self.dispatcher.sequence_timeout_ns = int(
+            self.settings["sequence_timeout_ms"] * 1_000_000)
+        metrics = self.metrics if self.settings["metrics"] else None
+        self._track_latency()
+        self.dispatcher.metrics = metrics
+        self.clipboard.set_metrics(metrics)
+        if self.paster:
+            self.paster.metrics = metrics
+            self.paster.configure(self.settings["auto_paste"])
+        path = self.settings["metrics_file"] if metrics else ""
+        if self.metrics_file and self.metrics_file.path != path:
+            self.metrics_file.close()
+            self.metrics_file = None
+        if path and self.metrics_file is None:
+            self.metrics_file = MetricsFile(path, self.metrics_report)
+        commands = {}
+        signature = hotkey_signature(self.settings["profile_hotkey"])
+        if signature and len(self.profiles) > 1:
+            commands[signature] = self.next_profile
+        signature = self._configure_history()
+        if signature:
+            commands[signature] = self.restore_clipboard
+        self.dispatcher.set_commands(commands)
+
+    def _configure_history(self):
+        """按设置创建或关闭剪贴板历史与自动恢复，返回恢复快捷键的签名"""
+        options = dict(DEFAULT_HISTORY_OPTIONS, **self.settings["clipboard_history"])
+        history = None
+        if options["capacity"] > 0:
+            history = self.history
+            if history is None:
+                history = ClipboardHistory(options["capacity"], options["max_bytes"])
+            elif (history.capacity, history.max_bytes) != (
+                    options["capacity"], options["max_bytes"]):
+                history.resize(options["capacity"], options["max_bytes"])
+        self.history = history
+        self.clipboard.set_history(history)
+        delay = options["auto_restore_ms"] / 1000 if history is not None else 0
+        if self.restorer and (delay <= 0 or self.restorer.history is not history):
+            self.restorer.close()
+            self.restorer = None
+        if delay > 0:
+            if self.restorer is None:
+                self.restorer = ClipboardRestorer(history, self.clipboard, delay)
+            self.restorer.delay = delay
+            self.dispatcher.copy = self._copy_and_restore
+        else:
+            self.dispatcher.copy = self.clipboard.copy
+        return (hotkey_signature(options["restore_hotkey"])
+                if history is not None else None)
+
+    def _copy_and_restore(self, text):
+        self.clipboard.copy(text)
+        self.restorer.schedule()
+
+    def restore_clipboard(self):
+        """把剪贴板恢复为上一次被替换的内容，由恢复快捷键在分发线程中调用"""
+        if self.history is None:
+            return False
+        if self.restorer:
+            # 手动恢复后不再自动恢复，否则会多取出一条
+            self.restorer.cancel()
+        text = self.history.take()
+        if text is None:
+            return False
+        self.clipboard.copy(text)
+        return True
+
+    def set_metrics_enabled(self, enabled):
+        self.settings["metrics"] = enabled
+        self._configure_dispatcher()
+        self.save()
+
+    def reset_metrics(self):
+        """清零指标: 换一个新的对象，各线程之后读到的都是新对象"""
+        self.metrics = Metrics()
+        self._track_latency(reset=True)
+        self._configure_dispatcher()
+
+    def _track_latency(self, reset=False):
+        """按设置为各配置已编译的分发表分配或释放每个快捷键的耗时直方图"""
+        enabled = bool(self.settings["metrics"])
+        for profile in list(self.profiles.values()):
+            if profile.index is not None:
+                profile.index.track_latency(enabled, reset)
+
+    def metrics_report(self):
+        """指标与省掉的剪贴板写入次数，可直接序列化为 JSON"""
+        entries = []
+        for profile in list(self.profiles.values()):
+            if profile.index is not None:
+                entries.extend(profile.index.triggered())
+        report = self.metrics.report(entries)
+        report["enabled"] = bool(self.settings["metrics"])
+        if self.dispatcher is not None:
+            report["suppressed"] = dict(self.dispatcher.suppression_stats(),
+                                        coalesced=self.clipboard.coalesced)
+        return report
+
+    def settings_snapshot(self):
+        # 在写入线程中调用，复制列表避免与其他线程的增删冲突
+        active = self.profile
+        profiles = {name: list(profile.entries)
+                    for name, profile in list(self.profiles.items())
+                    if profile is not active}
+        snapshot = dict(self.settings, entries=list(active.entries))
+        if profiles or active.name != DEFAULT_PROFILE:
+            snapshot.update(profile=active.name, profiles=profiles)
+        return snapshot
+
+    def save(self):
+        # 只标记修改，由后台线程合并写入
+        self.store.mark_dirty()
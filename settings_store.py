@@ -0,0 +1,174 @@
+"""settings.json 的读写"""
+import json
+import os
+import threading
+
+from autopaste import DEFAULT_PASTE_OPTIONS
+from clipboard_history import DEFAULT_HISTORY_OPTIONS
+from templates import DEFAULT_VARIABLES
+
+SETTINGS_FILE = "settings.json"
+
+# 除条目外的可选设置及其默认值
+DEFAULT_OPTIONS = {
+    "clipboard_backend": "auto",
+    "variables": DEFAULT_VARIABLES,
+    "theme": "light",
+    # 有多个短语配置时，按下该快捷键切换到下一个配置
+    "profile_hotkey": "cmd+alt+p",
+    # 同一快捷键两次触发之间的最小间隔(毫秒)，间隔内的再次触发不写剪贴板
+    "hotkey_interval_ms": 100,
+    # 多步快捷键(例如 "alt+q, 3")相邻两步之间的最长间隔(毫秒)，超时后从第一步重新开始
+    "sequence_timeout_ms": 1000,
+    # 记录快捷键触发次数与耗时直方图，在窗口的统计面板或 --headless stats 中查看
+    "metrics": True,
+    # 条目的 auto_paste 为 true 时，复制后打开聊天框、粘贴并发送；这里是按键与等待时间
+    "auto_paste": DEFAULT_PASTE_OPTIONS,
+    # 非空时定期把指标写入该文件，扩展名为 .prom/.txt 时使用 Prometheus 文本格式，否则为 JSON
+    "metrics_file": "",
+    # 剪贴板历史: 条数与字节上限、恢复上一次内容的快捷键、触发后自动恢复的延时
+    "clipboard_history": DEFAULT_HISTORY_OPTIONS,
+}
+
+
+def read_settings(path=SETTINGS_FILE):
+    """读取设置，兼容旧版只保存条目列表的格式；文件不存在时抛出 FileNotFoundError"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return parse_settings(data)
+
+
+def parse_settings(data):
+    """把解析后的 JSON 整理为设置字典，补全缺省的选项"""
+    if isinstance(data, list):
+        data = {"entries": data}
+    settings = dict(DEFAULT_OPTIONS)
+    settings.update(data)
+    settings.setdefault("entries", [])
+    return settings
+
+
+def write_settings(settings, path=SETTINGS_FILE):
+    """写入同目录下的临时文件并 fsync，再原子替换，崩溃时不会留下写了一半的文件"""
+    import tempfile
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=".settings-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            # 带缩进时 iterencode 分段生成，长时间序列化不会一直占用 GIL
+            encoder = json.JSONEncoder(ensure_ascii=False, indent=2)
+            for chunk in encoder.iterencode(settings):
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(directory)
+
+
+def file_signature(path):
+    """用于判断文件是否变化: 原子替换后 inode 会变，原地修改时大小或修改时间会变"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _fsync_directory(directory):
+    if os.name == "nt":
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class SettingsStore:
+    """延迟写入: 每次修改只标记为脏，后台线程把一段时间内的修改合并为一次写入
+
+    snapshot 是返回待保存数据的函数，在后台线程中调用。
+    """
+
+    def __init__(self, snapshot, path=SETTINGS_FILE, delay=0.5):
+        self.snapshot = snapshot
+        self.path = path
+        self.delay = delay
+        self.writes = 0
+        # 最近一次由本程序写入后的文件签名，监视文件变化时据此忽略自己的写入
+        self.written_signature = None
+        self._version = 0
+        self._saved_version = 0
+        self._write_lock = threading.Lock()
+        # 保护版本号与写入线程的创建；分发线程(切换配置)、界面与监视线程都会标记修改，
+        # 写入期间也只短暂持有，不会等待磁盘
+        self._dirty_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closing = threading.Event()
+        self._thread = None
+
+    @property
+    def dirty(self):
+        return self._version != self._saved_version
+
+    def mark_dirty(self):
+        with self._dirty_lock:
+            self._version += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="settings-writer", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            if self._closing.is_set():
+                break
+            # 等待一小段时间，把连续的修改合并为一次写入
+            self._closing.wait(self.delay)
+            self._wake.clear()
+            self.save()
+            if self._closing.is_set():
+                break
+
+    def save(self):
+        """立即写入尚未保存的修改"""
+        with self._write_lock:
+            version = self._version
+            if version == self._saved_version:
+                return
+            try:
+                write_settings(self.snapshot(), self.path)
+            except (OSError, RuntimeError, TypeError, ValueError) as e:
+                print(f"保存设置失败: {e}")
+                return
+            self.written_signature = file_signature(self.path)
+            self._saved_version = version
+            self.writes += 1
+
+    def is_own_write(self, signature):
+        """文件当前的内容是否是本程序最近一次写入的"""
+        with self._write_lock:
+            return signature is not None and signature == self.written_signature
+
+    def close(self):
+        """停止后台线程并写入剩余的修改"""
+        self._closing.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.save()
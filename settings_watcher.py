@@ -0,0 +1,103 @@
+"""监视 settings.json 的外部修改(例如从共享仓库同步)，在后台线程中读取和解析"""
+import json
+import os
+import threading
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from settings_store import file_signature, parse_settings
+
+
+class _SettingsFileHandler(FileSystemEventHandler):
+    """只关心设置文件本身，原子替换产生的移动事件按目标路径判断"""
+
+    def __init__(self, path, notify):
+        self.path = path
+        self.notify = notify
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            if path and os.path.realpath(os.fsdecode(path)) == self.path:
+                self.notify()
+                return
+
+
+class SettingsWatcher:
+    """文件变化后等待一小段时间，确认内容稳定且是完整的 JSON 后再回调
+
+    on_change(settings) 在监视线程中调用。本程序自己写入的内容
+    (store.is_own_write) 和已经读取过的内容不会触发回调；
+    写了一半的文件会稍后重试，不会被读取。
+    """
+
+    def __init__(self, path, on_change, store=None, delay=0.2, retries=5):
+        self.path = os.path.realpath(path)
+        self.on_change = on_change
+        self.store = store
+        self.delay = delay
+        self.retries = retries
+        self._loaded_signature = file_signature(self.path)
+        self._wake = threading.Event()
+        self._closing = threading.Event()
+        self._observer = Observer()
+        self._observer.schedule(
+            _SettingsFileHandler(self.path, self._wake.set),
+            os.path.dirname(self.path), recursive=False)
+        self._observer.start()
+        self._thread = threading.Thread(
+            target=self._run, name="settings-watcher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            # 编辑器保存时会连续产生多个事件，等待一小段时间后合并处理
+            if self._closing.wait(self.delay):
+                break
+            self._wake.clear()
+            self.check()
+
+    def check(self):
+        """读取有变化的文件并回调，内容不完整时稍后重试"""
+        for _ in range(self.retries):
+            signature = file_signature(self.path)
+            if signature is None or signature == self._loaded_signature:
+                return
+            if self.store is not None and self.store.is_own_write(signature):
+                self._loaded_signature = signature
+                return
+            settings = self._read(signature)
+            if settings is not None:
+                self._loaded_signature = signature
+                try:
+                    self.on_change(settings)
+                except Exception as e:
+                    print(f"应用设置文件的修改失败: {e}")
+                return
+            if self._closing.wait(self.delay):
+                return
+        print(f"{self.path} 不是完整的设置文件，等待下一次修改")
+
+    def _read(self, signature):
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        # 读取期间文件又被改动，说明还在写入
+        if file_signature(self.path) != signature:
+            return None
+        try:
+            return parse_settings(json.loads(data))
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+    def close(self):
+        self._closing.set()
+        self._wake.set()
+        self._observer.stop()
+        self._observer.join(timeout=1)
+        self._thread.join(timeout=1)
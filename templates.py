@@ -0,0 +1,78 @@
+"""短语模板: 文本中的 {player}、{count} 等变量在载入时编译，渲染结果按变量版本缓存"""
+import re
+
+VARIABLE = re.compile(r"\{(\w+)\}")
+
+# 默认文案中使用的变量及其默认值
+DEFAULT_VARIABLES = {"player": "XXXXXX", "count": "258"}
+
+
+def compile_template(text):
+    """编译为 (字面量, 变量名, 字面量, ..., 字面量) 元组，不含变量时返回 None"""
+    parts = VARIABLE.split(text)
+    return tuple(parts) if len(parts) > 1 else None
+
+
+def render_template(compiled, values):
+    parts = list(compiled)
+    # 没有值的变量原样保留，便于发现漏填
+    parts[1::2] = [values.get(name, "{" + name + "}") for name in compiled[1::2]]
+    return "".join(parts)
+
+
+class TemplateRenderer:
+    """保存已编译的模板与变量值
+
+    变量值与渲染缓存作为一个整体替换，修改变量后旧版本的缓存整体作废，
+    分发线程不会拿到新旧混合的结果。
+    """
+
+    def __init__(self, variables=None):
+        self._compiled = {}       # 文本 -> 编译结果，不含变量时为 None
+        self._names = {}          # 用到的变量名，按首次出现的顺序
+        self._state = (dict(variables or {}), {})
+        self.version = 0
+
+    @property
+    def variables(self):
+        return self._state[0]
+
+    def load(self, entries, variables):
+        """载入设置时编译全部条目"""
+        compiled, names = {}, {}
+        for entry in entries:
+            self._compile(entry["text"], compiled, names)
+        # 构建完成后整体替换，分发线程不会看到编译到一半的表
+        self._compiled, self._names = compiled, names
+        self.set_variables(variables)
+
+    def add(self, text):
+        """新条目在添加时编译，触发时不再解析"""
+        return self._compile(text, self._compiled, self._names)
+
+    def _compile(self, text, compiled, names):
+        if text not in compiled:
+            template = compiled[text] = compile_template(text)
+            if template is not None:
+                names.update(dict.fromkeys(template[1::2]))
+        return compiled[text]
+
+    def set_variables(self, variables):
+        self._state = (dict(variables), {})
+        self.version += 1
+
+    def set_variable(self, name, value):
+        self.set_variables(dict(self.variables, **{name: value}))
+
+    def names(self):
+        """模板中用到的变量名，删除条目后直到重新载入前仍会保留"""
+        return list(self._names)
+
+    def render(self, text):
+        values, rendered = self._state
+        result = rendered.get(text)
+        if result is None:
+            compiled = self.add(text)
+            result = text if compiled is None else render_template(compiled, values)
+            rendered[text] = result
+        return result
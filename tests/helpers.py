@@ -0,0 +1,31 @@
+"""测试共用: 写临时设置文件、不启动真实键盘钩子的服务"""
+import json
+import os
+import time
+
+from bench import _NullListener
+from clipboard_backends import FakeBackend
+from service import HotkeyService
+
+
+def write_settings_file(directory, entries, **options):
+    path = os.path.join(directory, "settings.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(options, entries=entries), f, ensure_ascii=False)
+    return path
+
+
+def start_service(path, backend=None, **kwargs):
+    service = HotkeyService(path, backend or FakeBackend(), _NullListener, **kwargs)
+    service.load()
+    service.start()
+    return service
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
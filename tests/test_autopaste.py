@@ -0,0 +1,80 @@
+"""自动发送合成的按键: 分发器只忽略预期的按键，期间真实的按键照常处理"""
+from bench import make_key_factory
+from dispatcher import HotkeyDispatcher
+from hotkeys import HotkeyIndex
+
+KEY = make_key_factory()
+LIBRARY = [{"text": "发送", "hotkey": "ctrl+v"},
+           {"text": "回车", "hotkey": "enter"},
+           {"text": "短", "hotkey": "alt+e"}]
+# 自动发送 ctrl+v 再回车时合成的按键
+PASTE = [(True, KEY("ctrl")), (True, KEY("v")), (False, KEY("v")),
+         (False, KEY("ctrl")), (True, KEY("enter")), (False, KEY("enter"))]
+
+
+class Harness:
+    def __init__(self):
+        self.copied = []
+        self.dispatcher = HotkeyDispatcher(HotkeyIndex(LIBRARY), self.copied.append)
+        self.dispatcher.expect_synthetic(PASTE, 10**9)
+
+    def send(self, events, injected=None):
+        dispatcher = self.dispatcher
+        # injected 为 None 时像 pynput 1.8 之前一样只传按键
+        flag = () if injected is None else (injected,)
+        for pressed, key in events:
+            (dispatcher.on_press if pressed else dispatcher.on_release)(key, *flag)
+        while not dispatcher._events.empty():
+            dispatcher.handle_event(*dispatcher._events.get())
+        return self
+
+
+def real(*names):
+    return ([(True, KEY(name)) for name in names] +
+            [(False, KEY(name)) for name in reversed(names)])
+
+
+def test_synthetic_keys_are_ignored():
+    harness = Harness().send(PASTE)
+    assert harness.copied == []
+    assert harness.dispatcher.modifiers == 0
+    assert not harness.dispatcher._synthetic
+
+
+def test_real_keys_during_paste_are_not_swallowed():
+    harness = Harness()
+    # 用户在合成按键之间按下 alt+e: 修饰键状态不会卡住，快捷键照常触发
+    harness.send(PASTE[:2]).send(real("alt", "e")).send(PASTE[2:])
+    assert harness.copied == ["短"]
+    assert harness.dispatcher.modifiers == 0
+
+
+def test_left_and_right_modifiers_match_expected():
+    harness = Harness()
+    harness.send([(True, KEY("ctrl_l")), (True, KEY("v")), (False, KEY("v")),
+                  (False, KEY("ctrl_l"))] + PASTE[4:])
+    assert harness.copied == []
+    assert harness.dispatcher.modifiers == 0
+
+
+def test_injected_flag_tells_real_from_synthetic():
+    harness = Harness()
+    harness.send(PASTE[:4], injected=True)
+    # 与预期的回车相同，但 injected 为 False: 后端支持该标志，是真实按键
+    harness.send(real("enter"), injected=False)
+    assert harness.copied == ["回车"]
+    harness.send(PASTE[4:], injected=True)
+    assert harness.copied == ["回车"]
+
+
+def test_unsupported_injected_flag_falls_back_to_matching():
+    # 不支持的后端总是给出 False，不能据此放行合成的按键
+    harness = Harness().send(PASTE, injected=False)
+    assert harness.copied == []
+
+
+def test_keys_after_deadline_are_handled():
+    harness = Harness()
+    harness.dispatcher.expect_synthetic(PASTE, 0)
+    harness.send(real("enter"))
+    assert harness.copied == ["回车"]
@@ -0,0 +1,61 @@
+"""端到端延迟基准: 用假剪贴板后端与假 Controller 回放合成按键，检查结果"""
+import pytest
+
+import bench
+
+
+def test_core_replay_hits_every_trigger():
+    library = bench.make_library(200)
+    events = bench.synthetic_stream(library, triggers=100, noise=4)
+    result = bench.run_benchmark(library, events)
+    assert result["entries"] == 200
+    assert result["triggers"] == 100
+    assert result["missed"] == 0
+    assert 0 < result["p50_us"] <= result["p99_us"]
+    assert result["events_per_sec"] > 0
+    assert result["hook_max_us"] > 0
+
+
+def test_expected_texts_follow_held_keys():
+    library = [{"text": "a", "hotkey": "cmd+k"}, {"text": "b", "hotkey": "ctrl+j"}]
+    index = bench.HotkeyIndex(library)
+    events = [("press", "cmd"), ("press", "k"), ("release", "k"),
+              ("release", "cmd"), ("press", "j"), ("release", "j"),
+              ("press", "ctrl"), ("press", "j")]
+    assert bench.expected_texts(index, events) == [
+        None, "a", None, None, None, None, None, "b"]
+
+
+def test_replay_without_triggers_is_an_error():
+    library = bench.make_library(10)
+    with pytest.raises(RuntimeError):
+        bench.run_benchmark(library, [("press", "a"), ("release", "a")])
+
+
+def test_typing_never_reaches_the_queue():
+    result = bench.measure_typing(100, keystrokes=2000)
+    assert result["events"] >= 4000
+    assert result["queued"] == 0
+
+
+def test_auto_paste_keys_do_not_retrigger():
+    # 假 Controller 把合成的按键回送给钩子，库中 ctrl+v 与 enter 本身就是快捷键
+    result = bench.measure_paste(0, 0, triggers=10)
+    assert result["triggers"] == 10
+    assert result["retriggered"] == 0
+
+
+def test_gui_replay_hits_every_trigger():
+    pytest.importorskip("PyQt6.QtWidgets")
+    library = bench.make_library(50)
+    events = bench.synthetic_stream(library, triggers=30, noise=2)
+    result = bench.run_benchmark(library, events, harness_class=bench.GuiHarness)
+    assert result["triggers"] == 30
+    assert result["missed"] == 0
+
+
+def test_theme_bench_reports_timings():
+    pytest.importorskip("PyQt6.QtWidgets")
+    result = bench.measure_theme(windows=1, adds=3, size=10)
+    assert result["window_ms"] > 0 and result["switch_ms"] > 0
+    assert result["add_repaint_ms"] >= result["add_ms"] > 0
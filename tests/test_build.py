@@ -0,0 +1,59 @@
+"""打包脚本的启动耗时测量: 卡住的程序在超时后被结束"""
+import os
+import sys
+import time
+
+import pytest
+
+import build
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32",
+                                reason="用 shell 脚本模拟打包后的程序")
+
+
+def fake_exe(tmp_path, body):
+    path = tmp_path / "app"
+    path.write_text("#!/bin/sh\n" + body + "\n", encoding="utf-8")
+    os.chmod(path, 0o755)
+    return str(path)
+
+
+def test_measures_until_listener_armed(tmp_path):
+    exe = fake_exe(tmp_path, f"echo {build.LISTENER_ARMED}\nexec sleep 60")
+    start = time.monotonic()
+    assert build.measure_startup(exe, runs=1, timeout=10) is not None
+    assert time.monotonic() - start < 10
+
+
+def test_hung_program_is_killed_at_deadline(tmp_path, capsys):
+    exe = fake_exe(tmp_path, "echo 正在启动\nexec sleep 60")
+    start = time.monotonic()
+    assert build.measure_startup(exe, runs=1, timeout=0.5) is None
+    assert time.monotonic() - start < 5
+    output = capsys.readouterr().out
+    assert "正在启动" in output and "已结束进程" in output
+
+
+def test_program_exiting_early_is_an_error(tmp_path, capsys):
+    exe = fake_exe(tmp_path, "echo 出错了\nexit 1")
+    assert build.measure_startup(exe, runs=1, timeout=10) is None
+    assert "出错了" in capsys.readouterr().out
+
+
+def startup_check(tmp_path, monkeypatch, elapsed, **kwargs):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(build, "measure_startup", lambda exe_path: elapsed)
+    return build.check_startup("app", "linux-onedir", **kwargs)
+
+
+def test_missing_baseline_fails(tmp_path, monkeypatch, capsys):
+    assert not startup_check(tmp_path, monkeypatch, 300.0)
+    assert "--record-baseline" in capsys.readouterr().out
+    assert not (tmp_path / build.STARTUP_BASELINE_FILE).exists()
+
+
+def test_record_then_compare_with_baseline(tmp_path, monkeypatch):
+    assert startup_check(tmp_path, monkeypatch, 300.0, record_baseline=True)
+    assert (tmp_path / build.STARTUP_BASELINE_FILE).exists()
+    assert startup_check(tmp_path, monkeypatch, 350.0)
+    assert not startup_check(tmp_path, monkeypatch, 400.0)
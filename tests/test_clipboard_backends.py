@@ -0,0 +1,128 @@
+"""剪贴板写入: 按设置选择后端、后端失败时退回 pyperclip，以及连续复制时只写最后一条"""
+import threading
+
+import pytest
+
+import clipboard_backends
+from bench import _NullListener
+from clipboard_backends import (ClipboardWriter, FakeBackend, PyperclipBackend,
+                                create_backend)
+from service import HotkeyService
+from tests.helpers import wait_until, write_settings_file
+
+pyperclip = pytest.importorskip("pyperclip")
+
+
+class BrokenBackend(FakeBackend):
+    name = "broken"
+
+    def __init__(self):
+        super().__init__()
+        self.closed = False
+
+    def write(self, text):
+        raise OSError("助手进程已退出")
+
+    def close(self):
+        self.closed = True
+
+
+class BlockingBackend(FakeBackend):
+    """第一次写入阻塞到 release 为止，期间的复制只能排队"""
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.started.set()
+        self.release.wait(5)
+        super().write(text)
+
+
+@pytest.fixture
+def pyperclip_copies(monkeypatch):
+    copies = []
+    monkeypatch.setattr(pyperclip, "copy", copies.append)
+    return copies
+
+
+def test_create_backend_by_name(monkeypatch):
+    monkeypatch.delitem(clipboard_backends.BACKENDS, "qt", raising=False)
+    assert isinstance(create_backend("fake"), FakeBackend)
+    monkeypatch.setattr(clipboard_backends.sys, "platform", "linux")
+    assert clipboard_backends.default_backend_name() == "helper"
+    monkeypatch.setattr(clipboard_backends.sys, "platform", "win32")
+    assert clipboard_backends.default_backend_name() == "pyperclip"
+    assert isinstance(create_backend("auto"), PyperclipBackend)
+
+
+def test_auto_prefers_registered_qt_backend(monkeypatch):
+    monkeypatch.setitem(clipboard_backends.BACKENDS, "qt", FakeBackend)
+    assert isinstance(create_backend("auto"), FakeBackend)
+
+
+def test_unavailable_backend_falls_back_to_pyperclip(monkeypatch, capsys):
+    def unavailable():
+        raise RuntimeError("没有显示服务器")
+    monkeypatch.setitem(clipboard_backends.BACKENDS, "broken", unavailable)
+    assert isinstance(create_backend("broken"), PyperclipBackend)
+    assert isinstance(create_backend("no-such-backend"), PyperclipBackend)
+    assert "没有显示服务器" in capsys.readouterr().out
+
+
+def test_service_uses_backend_from_settings(tmp_path, monkeypatch):
+    monkeypatch.setitem(clipboard_backends.BACKENDS, "broken", BrokenBackend)
+    path = write_settings_file(tmp_path, [], clipboard_backend="broken")
+    # 不传入后端时按设置文件的 clipboard_backend 创建
+    service = HotkeyService(path, listener_factory=_NullListener)
+    service.load()
+    service.start()
+    try:
+        assert isinstance(service.clipboard.backend, BrokenBackend)
+    finally:
+        service.stop()
+
+
+def test_failed_write_falls_back_to_pyperclip(pyperclip_copies):
+    backend = BrokenBackend()
+    writer = ClipboardWriter(backend)
+    writer.copy("短语")
+    assert writer.wait_written("短语", 5)
+    assert pyperclip_copies == ["短语"]
+    assert backend.closed
+    assert isinstance(writer.backend, PyperclipBackend)
+    writer.close()
+
+
+def test_failed_fallback_keeps_writer_running(monkeypatch, capsys):
+    def fail(text):
+        raise RuntimeError("没有可用的剪贴板程序")
+    monkeypatch.setattr(pyperclip, "copy", fail)
+    writer = ClipboardWriter(BrokenBackend())
+    writer.copy("第一条")
+    assert wait_until(lambda: "没有可用的剪贴板程序" in capsys.readouterr().out)
+
+    copies = []
+    monkeypatch.setattr(pyperclip, "copy", copies.append)
+    # 兜底后端在创建时取得 pyperclip.copy，换成新的后端验证线程仍在处理
+    writer.backend = PyperclipBackend()
+    writer.copy("第二条")
+    assert writer.wait_written("第二条", 5)
+    assert copies == ["第二条"]
+    writer.close()
+
+
+def test_copies_during_slow_write_are_coalesced():
+    backend = BlockingBackend()
+    writer = ClipboardWriter(backend)
+    writer.copy("a")
+    assert backend.started.wait(5)
+    for text in ("b", "c", "d"):
+        writer.copy(text)
+    backend.release.set()
+    assert writer.wait_written("d", 5)
+    assert [text for text, _ in backend.writes] == ["a", "d"]
+    assert writer.coalesced == 2
+    writer.close()
@@ -0,0 +1,83 @@
+"""剪贴板历史: 默认关闭；环形缓冲区的上限、恢复，以及本程序写入的文本不另存副本"""
+import sys
+
+from clipboard_backends import ClipboardWriter, FakeBackend
+from clipboard_history import ClipboardHistory
+from tests.helpers import start_service, write_settings_file
+
+
+class CountingBackend(FakeBackend):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def read(self):
+        self.reads += 1
+        return super().read()
+
+
+def test_history_is_off_by_default(tmp_path):
+    backend = CountingBackend()
+    service = start_service(write_settings_file(tmp_path, []), backend)
+    try:
+        assert service.history is None
+        service.clipboard.copy("短语")
+        service.clipboard.wait_written(service.clipboard.latest, 1)
+        assert backend.reads == 0
+    finally:
+        service.stop()
+
+
+def test_capacity_and_byte_limit_drop_the_oldest():
+    history = ClipboardHistory(capacity=3, max_bytes=1 << 20)
+    for text in "abcde":
+        history.push(text)
+    assert history.items() == ["c", "d", "e"]
+    texts = ["x" * 1000, "y" * 1000, "z" * 1000]
+    history = ClipboardHistory(capacity=10,
+                               max_bytes=sum(map(sys.getsizeof, texts[1:])))
+    for text in texts:
+        history.push(text)
+    assert history.items() == texts[1:]
+    assert history.bytes <= history.max_bytes
+
+
+def test_take_is_not_recorded_again():
+    history = ClipboardHistory()
+    assert history.before_write("用户复制的", "短语")
+    text = history.take()
+    assert text == "用户复制的"
+    assert history.before_write("短语", text)
+    assert history.items() == []
+
+
+def test_restore_gives_up_when_user_copied_something_else():
+    history = ClipboardHistory()
+    history.before_write("原来的", "短语")
+    text = history.take(expected="短语")
+    assert not history.before_write("用户后来复制的", text)
+    assert history.items() == ["原来的"]
+
+
+def test_own_text_is_kept_as_the_same_object():
+    history = ClipboardHistory()
+    phrase = "".join(["重复", "的短语"])
+    history.before_write(None, phrase)
+    # 从剪贴板读回的是内容相同的新字符串
+    history.before_write("".join(["重复的", "短语"]), "另一条")
+    assert history.items()[0] is phrase
+
+
+def test_writer_without_read_records_its_own_last_write():
+    backend = FakeBackend()
+    backend.read = None
+    writer = ClipboardWriter(backend)
+    history = ClipboardHistory()
+    writer.set_history(history)
+    try:
+        for text in ("一", "二"):
+            writer.copy(text)
+            assert writer.wait_written(text, 1)
+        assert history.items() == ["一"]
+    finally:
+        writer.close()
@@ -0,0 +1,51 @@
+"""快捷键冲突: 添加前查表检查，以及扫描整个列表"""
+from hotkeys import (DUPLICATE, SHADOWED, SHADOWS, HotkeyIndex, find_conflicts,
+                     hotkey_signature)
+
+LIBRARY = [{"text": "甲", "hotkey": "alt+1"},
+           {"text": "乙", "hotkey": "alt+1"},
+           {"text": "丙", "hotkey": "ctrl+a+b"},
+           {"text": "丁", "hotkey": "alt+q"},
+           {"text": "戊", "hotkey": "alt+q, 3"}]
+
+
+def texts(conflicts):
+    return sorted((kind, entry["text"]) for kind, entry in conflicts)
+
+
+def test_duplicate_reports_the_entry_that_fires():
+    index = HotkeyIndex(LIBRARY)
+    assert texts(index.conflicts("alt+1")) == [(DUPLICATE, "乙")]
+    assert index.count(hotkey_signature("alt+1")) == 2
+    assert index.lookup({"alt", "1"})["text"] == "乙"
+
+
+def test_chord_subsets_and_supersets():
+    index = HotkeyIndex(LIBRARY)
+    assert texts(index.conflicts("ctrl+a+b+c")) == [(SHADOWED, "丙")]
+    assert texts(index.conflicts("ctrl+a")) == [(SHADOWS, "丙")]
+
+
+def test_sequence_prefixes():
+    index = HotkeyIndex(LIBRARY)
+    assert texts(index.conflicts("alt+q, 3, 4")) == [(SHADOWED, "丁"), (SHADOWED, "戊")]
+    assert texts(index.conflicts("alt+q")) == [(DUPLICATE, "丁"), (SHADOWS, "戊")]
+
+
+def test_no_conflicts():
+    assert HotkeyIndex(LIBRARY).conflicts("alt+9") == []
+
+
+def test_find_conflicts_scans_the_list():
+    assert sorted(find_conflicts(LIBRARY)) == [(DUPLICATE, 0, 1), (SHADOWED, 4, 3)]
+
+
+def test_index_updates_keep_conflicts_current():
+    entries = [dict(entry) for entry in LIBRARY]
+    index = HotkeyIndex(entries)
+    removed = entries.pop(1)
+    index.update([removed], [], entries)
+    assert texts(index.conflicts("alt+1")) == [(DUPLICATE, "甲")]
+    removed = entries.pop(2)
+    index.update([removed], [], entries)
+    assert texts(index.conflicts("alt+q, 3, 4")) == [(SHADOWED, "戊")]
@@ -0,0 +1,60 @@
+"""外部修改设置文件时的条目差异: 依次执行 diff_entries 的操作得到新列表"""
+import random
+
+from service import DELETE, EDIT, INSERT, diff_entries
+
+
+def apply(old, ops):
+    entries = list(old)
+    for kind, row, value in ops:
+        if kind == DELETE:
+            del entries[row:row + value]
+        elif kind == INSERT:
+            entries[row:row] = value
+        else:
+            assert kind == EDIT
+            entries[row] = value
+    return entries
+
+
+def entry(i, **extra):
+    return dict({"text": f"短语{i}", "hotkey": f"alt+{i}"}, **extra)
+
+
+OLD = [entry(i) for i in range(10)]
+
+
+def test_no_change_is_empty():
+    assert diff_entries(OLD, [dict(e) for e in OLD]) == []
+
+
+def test_append_and_edit_are_single_ops():
+    new = OLD + [entry(10)]
+    assert diff_entries(OLD, new) == [(INSERT, 10, [entry(10)])]
+    new = list(OLD)
+    new[4] = entry(4, auto_paste=True)
+    assert diff_entries(OLD, new) == [(EDIT, 4, new[4])]
+
+
+def test_ops_run_from_the_end():
+    new = OLD[:2] + OLD[3:7] + [entry(20)] + OLD[7:]
+    ops = diff_entries(OLD, new)
+    rows = [row for _, row, _ in ops]
+    assert rows == sorted(rows, reverse=True)
+    assert apply(OLD, ops) == new
+
+
+def test_random_edits_round_trip():
+    rng = random.Random(0)
+    for _ in range(200):
+        new = [dict(e) for e in OLD]
+        for _ in range(rng.randint(1, 4)):
+            action = rng.choice("ide")
+            row = rng.randrange(len(new) + 1)
+            if action == "i":
+                new.insert(row, entry(rng.randint(100, 200)))
+            elif new and action == "d":
+                del new[min(row, len(new) - 1)]
+            elif new:
+                new[min(row, len(new) - 1)]["text"] += "改"
+        assert apply(OLD, diff_entries(OLD, new)) == new
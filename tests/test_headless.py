@@ -0,0 +1,102 @@
+"""无界面模式: 命令行增删短语、控制端口的命令，以及不使用助手进程的剪贴板后端"""
+import json
+
+import pytest
+
+import headless
+from clipboard_backends import PyperclipBackend
+from tests.helpers import start_service, write_settings_file
+
+ENTRIES = [{"text": "一", "hotkey": "alt+1"}, {"text": "二", "hotkey": "alt+2"}]
+
+
+def read_entries(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["entries"]
+
+
+@pytest.fixture
+def settings(tmp_path):
+    return write_settings_file(str(tmp_path), ENTRIES)
+
+
+def cli(settings, *argv):
+    return headless.main(["--headless", "--settings", settings, *argv])
+
+
+def test_list(settings, capsys):
+    assert cli(settings, "list") == 0
+    output = capsys.readouterr().out
+    assert "alt+1" in output and "二" in output
+
+
+def test_add_and_remove(settings):
+    assert cli(settings, "add", "三", "Alt+3", "--auto-paste") == 0
+    assert read_entries(settings)[-1] == {"text": "三", "hotkey": "alt+3",
+                                          "auto_paste": True}
+    assert cli(settings, "remove", "1") == 0
+    assert cli(settings, "remove", "alt+3") == 0
+    assert read_entries(settings) == ENTRIES[1:]
+
+
+@pytest.mark.parametrize("hotkey", ["cmd", "alt+shift", ""])
+def test_add_rejects_hotkey_that_cannot_trigger(settings, capsys, hotkey):
+    assert cli(settings, "add", "三", hotkey) == 1
+    assert "无效" in capsys.readouterr().out
+    assert read_entries(settings) == ENTRIES
+
+
+def test_add_rejects_empty_text(settings):
+    assert cli(settings, "add", "", "alt+3") == 1
+    assert read_entries(settings) == ENTRIES
+
+
+def test_add_conflict_needs_force(settings, capsys):
+    assert cli(settings, "add", "重复", "alt+1") == 1
+    assert "--force" in capsys.readouterr().out
+    assert read_entries(settings) == ENTRIES
+    assert cli(settings, "add", "重复", "alt+1", "--force") == 0
+    assert len(read_entries(settings)) == 3
+
+
+def test_remove_missing_entry(settings):
+    assert cli(settings, "remove", "9") == 1
+    assert cli(settings, "remove", "alt+9") == 1
+    assert read_entries(settings) == ENTRIES
+
+
+def test_auto_backend_does_not_start_helper():
+    assert isinstance(headless.headless_backend("auto"), PyperclipBackend)
+    assert headless.headless_backend("fake").name == "fake"
+
+
+@pytest.fixture
+def server(settings):
+    service = start_service(settings)
+    server = headless.ControlServer(service, headless.control_file(settings))
+    yield service, server
+    server.close()
+    service.stop()
+
+
+def test_control_commands(settings, server):
+    assert headless.send_command(settings, "ping") == "ok"
+    assert headless.send_command(settings, "nonsense").startswith("error")
+    reply = headless.send_command(settings, "stats")
+    assert reply.startswith("ok ")
+    assert "suppressed" in json.loads(reply[3:])
+
+
+def test_cli_change_reloads_running_daemon(settings, server, capsys):
+    service, _ = server
+    assert cli(settings, "add", "三", "alt+3") == 0
+    assert "守护进程已重新读取设置: ok 3" in capsys.readouterr().out
+    assert [entry["text"] for entry in service.entries] == ["一", "二", "三"]
+    assert cli(settings, "reload") == 0
+
+
+def test_closed_server_removes_control_file(settings, server):
+    _, server = server
+    server.close()
+    assert headless.send_command(settings, "ping") is None
+    assert cli(settings, "reload") == 0
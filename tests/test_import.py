@@ -0,0 +1,65 @@
+"""导入短语: 导入期间切换配置或合并外部修改不会把条目写进、撤销到别的配置"""
+from bench import make_library
+from hotkeys import hotkey_signature
+from tests.helpers import start_service, wait_until, write_settings_file
+
+A = [{"text": "甲", "hotkey": "alt+1"}]
+B = [{"text": "乙", "hotkey": "alt+2"}]
+BATCH = [{"text": "导入的", "hotkey": "alt+3"}]
+
+
+def run(actions):
+    for action in actions:
+        action()
+
+
+def test_switch_during_import_waits_for_it(tmp_path):
+    service = start_service(write_settings_file(tmp_path, A, profile="a",
+                                                profiles={"b": B}))
+    try:
+        a = service.profile
+        assert service.begin_import() == 1
+        service.import_entries(BATCH)
+        assert service.switch_profile("b") is None
+        assert service.profile is a
+        run(service.finish_import())
+        assert wait_until(lambda: service.profile.name == "b")
+        assert [entry["text"] for entry in a.entries] == ["甲", "导入的"]
+        assert a.index.get(hotkey_signature("alt+3"))["text"] == "导入的"
+        assert service.profiles["b"].entries == B
+    finally:
+        service.stop()
+
+
+def test_cancel_rolls_back_the_profile_it_started_in(tmp_path):
+    service = start_service(write_settings_file(tmp_path, A, profile="a",
+                                                profiles={"b": B}))
+    try:
+        a = service.profile
+        service.begin_import()
+        service.import_entries(BATCH)
+        service.switch_profile("b")
+        run(service.cancel_import())
+        assert wait_until(lambda: service.profile.name == "b")
+        assert a.entries == A
+        assert service.entries == B
+    finally:
+        service.stop()
+
+
+def test_settings_reload_during_import_is_merged_afterwards(tmp_path):
+    service = start_service(write_settings_file(tmp_path, make_library(5)))
+    try:
+        entries = service.entries
+        service.begin_import()
+        service.import_entries(BATCH)
+        # 外部修改的内容基于导入前的条目
+        assert service.apply_settings(dict(service.settings,
+                                           entries=make_library(3))) is None
+        assert len(entries) == 6
+        deferred = service.cancel_import()
+        assert len(entries) == 5
+        run(deferred)
+        assert service.entries == make_library(3)
+    finally:
+        service.stop()
@@ -0,0 +1,83 @@
+"""运行时指标: 普通打字不计时，每条短语的直方图在编译分发表时分配好"""
+from bench import make_key_factory
+from clipboard_backends import FakeBackend
+from tests.helpers import start_service, wait_until, write_settings_file
+
+LIBRARY = [{"text": "你好", "hotkey": "alt+1"},
+           {"text": "再见", "hotkey": "alt+2"},
+           {"text": "多步", "hotkey": "alt+q, 3"}]
+
+
+def press(dispatcher, *names):
+    key = make_key_factory()
+    for name in names:
+        dispatcher.on_press(key(name))
+    for name in reversed(names):
+        dispatcher.on_release(key(name))
+
+
+def test_histograms_are_allocated_when_compiled(tmp_path):
+    path = write_settings_file(tmp_path, LIBRARY, metrics=True)
+    service = start_service(path)
+    try:
+        index = service.hotkey_index
+        assert len(index.latency) == len(LIBRARY)
+        histograms = dict(index.latency)
+        backend = service.clipboard.backend
+        press(service.dispatcher, "alt", "1")
+        press(service.dispatcher, "alt", "q")
+        # 分发线程处理完第一步后钩子才放行第二步，真实按键不会这么快
+        assert wait_until(lambda: service.dispatcher._sequence_triggers is not None)
+        press(service.dispatcher, "3")
+        assert wait_until(lambda: [text for text, _ in backend.writes] == ["你好", "多步"])
+        assert wait_until(lambda: len(index.triggered()) == 2)
+        # 触发时只查表，不新建直方图
+        assert index.latency == histograms
+        report = service.metrics_report()
+        assert sorted(row["text"] for row in report["entries"]) == ["你好", "多步"]
+    finally:
+        service.stop()
+
+
+def test_typing_is_not_timed(tmp_path):
+    path = write_settings_file(tmp_path, LIBRARY, metrics=True)
+    service = start_service(path)
+    try:
+        for char in "hello world":
+            press(service.dispatcher, char)
+        assert service.metrics.hook.count == 0
+        press(service.dispatcher, "alt", "2")
+        assert service.metrics.hook.count == 1
+        assert wait_until(lambda: service.clipboard.backend.text == "再见")
+    finally:
+        service.stop()
+
+
+def test_edits_and_reset_keep_histograms_per_hotkey(tmp_path):
+    path = write_settings_file(tmp_path, LIBRARY, metrics=True)
+    service = start_service(path)
+    try:
+        index = service.hotkey_index
+        service.add_entry("新的", "alt+4")
+        assert len(index.latency) == 4
+        service.delete_entry(0)
+        assert len(index.latency) == 3
+        press(service.dispatcher, "alt", "2")
+        assert wait_until(lambda: len(index.triggered()) == 1)
+        service.reset_metrics()
+        assert index.triggered() == []
+        service.set_metrics_enabled(False)
+        assert index.latency == {}
+    finally:
+        service.stop()
+
+
+def test_disabled_metrics_allocate_nothing(tmp_path):
+    path = write_settings_file(tmp_path, LIBRARY, metrics=False)
+    service = start_service(path, FakeBackend())
+    try:
+        assert service.hotkey_index.latency == {}
+        service.set_metrics_enabled(True)
+        assert len(service.hotkey_index.latency) == len(LIBRARY)
+    finally:
+        service.stop()
@@ -0,0 +1,67 @@
+"""短语库的流式导入导出: 分批读取、跳过重复与无效的记录，后台导入可取消"""
+import threading
+
+import pytest
+
+from phrase_io import PhraseImporter, export_entries, read_batches
+
+ENTRIES = [{"text": f"短语{i}", "hotkey": f"alt+{i % 10}"} for i in range(25)]
+ENTRIES[3]["auto_paste"] = True
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".csv", ".json"])
+def test_export_then_import_round_trip(tmp_path, suffix):
+    path = str(tmp_path / ("pack" + suffix))
+    export_entries(ENTRIES, path)
+    batches = list(read_batches(path, batch_size=10))
+    assert [len(batch) for batch, _ in batches] == [10, 10, 5]
+    assert batches[-1][1] == 1.0
+    assert [entry for batch, _ in batches for entry in batch] == ENTRIES
+
+
+def test_duplicates_and_invalid_records_are_counted(tmp_path):
+    path = tmp_path / "pack.jsonl"
+    path.write_text("\n".join([
+        '{"text": "已有", "hotkey": "alt+1"}',
+        '{"text": "新的", "hotkey": "Alt+2"}',
+        '{"text": "新的", "hotkey": "alt+2"}',
+        '{"text": "", "hotkey": "alt+3"}',
+        '{"text": "没有快捷键"}',
+        'not json',
+    ]), encoding="utf-8")
+    stats = {}
+    batches = list(read_batches(str(path), {("已有", "alt+1")}, stats=stats))
+    assert [entry["text"] for batch, _ in batches for entry in batch] == ["新的"]
+    assert stats == {"imported": 1, "duplicates": 2, "invalid": 3}
+
+
+def test_csv_without_header(tmp_path):
+    path = tmp_path / "pack.csv"
+    path.write_text("你好,alt+1,true\n再见,alt+2,\n", encoding="utf-8")
+    entries = [entry for batch, _ in read_batches(str(path)) for entry in batch]
+    assert entries == [{"text": "你好", "hotkey": "alt+1", "auto_paste": True},
+                       {"text": "再见", "hotkey": "alt+2"}]
+
+
+def test_unknown_format_is_an_error(tmp_path):
+    with pytest.raises(ValueError):
+        list(read_batches(str(tmp_path / "pack.txt")))
+
+
+def test_importer_stops_after_cancel(tmp_path):
+    path = str(tmp_path / "pack.jsonl")
+    export_entries(ENTRIES, path)
+    release = threading.Event()
+    batches, finished = [], []
+
+    def on_batch(batch, progress):
+        # 等 importer 赋值后再取消
+        release.wait(5)
+        batches.append(batch)
+        importer.cancel()
+
+    importer = PhraseImporter(path, on_batch, finished.append, batch_size=5)
+    release.set()
+    importer.join(5)
+    assert len(batches) == 1
+    assert finished[0]["index"] is None
@@ -0,0 +1,84 @@
+"""短语配置: 第一次切换到某个配置时才编译，切换快捷键不在分发线程上编译"""
+import threading
+
+from bench import make_library
+from settings_store import SettingsStore
+from tests.helpers import start_service, wait_until, write_settings_file
+
+
+def test_inactive_profiles_stay_uncompiled(tmp_path):
+    path = write_settings_file(tmp_path, make_library(10), profile="a",
+                               profiles={"b": make_library(10)})
+    service = start_service(path)
+    try:
+        assert service.profiles["a"].index is not None
+        settings = service.settings_snapshot()
+        settings["profiles"]["b"] = make_library(20)
+        service.apply_settings(settings)
+        # 给可能存在的后台任务留出时间
+        assert not wait_until(lambda: service.profiles["b"].index is not None,
+                              timeout=0.2)
+        assert service.profiles["b"].entries == make_library(20)
+        service.switch_profile("b")
+        assert service.profiles["b"].index is not None
+        assert service.dispatcher.index is service.profiles["b"].index
+    finally:
+        service.stop()
+
+
+def test_next_profile_hands_uncompiled_profile_to_worker(tmp_path):
+    path = write_settings_file(tmp_path, make_library(10), profile="a",
+                               profiles={"b": make_library(10)})
+    service = start_service(path)
+    try:
+        compiled_on = []
+        compile = service.profiles["b"].compile
+
+        def record(templates, latency=False):
+            compiled_on.append(threading.current_thread().name)
+            return compile(templates, latency)
+        service.profiles["b"].compile = record
+        service.next_profile()
+        assert wait_until(lambda: service.profile.name == "b")
+        assert compiled_on and threading.current_thread().name not in compiled_on
+        index = service.profiles["b"].index
+        assert service.dispatcher.index is index
+        # 已编译过的配置直接切换，不再重新编译
+        service.next_profile()
+        service.next_profile()
+        assert service.profile.name == "b"
+        assert service.dispatcher.index is index
+    finally:
+        service.stop()
+
+
+def test_concurrent_compile_builds_one_index(tmp_path):
+    path = write_settings_file(tmp_path, make_library(10), profile="a",
+                               profiles={"b": make_library(2000)})
+    service = start_service(path)
+    try:
+        profile = service.profiles["b"]
+        indexes = []
+        threads = [threading.Thread(
+            target=lambda: indexes.append(profile.compile(service.templates)))
+            for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(indexes) == 4
+        assert all(index is profile.index for index in indexes)
+    finally:
+        service.stop()
+
+
+def test_mark_dirty_from_many_threads_counts_every_change(tmp_path):
+    store = SettingsStore(lambda: {"entries": []}, str(tmp_path / "s.json"), delay=60)
+    threads = [threading.Thread(target=lambda: [store.mark_dirty() for _ in range(2000)])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store._version == 8000
+    store.close()
@@ -0,0 +1,47 @@
+"""运行时分析: 启动时检测能否同时打开多个 cProfile，不能时只做栈采样"""
+import sys
+import threading
+
+import pytest
+
+from profiling import RuntimeProfiler, concurrent_profiles
+
+
+def call_in_thread(func):
+    thread = threading.Thread(target=func, name="worker")
+    thread.start()
+    thread.join()
+
+
+def test_detects_process_wide_profiler():
+    assert concurrent_profiles() == (sys.version_info < (3, 12))
+
+
+def test_sampling_only_registers_threads_without_cprofile(tmp_path, capsys):
+    profiler = RuntimeProfiler(str(tmp_path))
+    profiler.cprofile = False
+    profiler.profile_thread("qt")
+    calls = []
+    wrapped = profiler.wrap("hook", lambda: calls.append(1))
+    call_in_thread(wrapped)
+    wrapped()
+    assert calls == [1, 1]
+    assert sorted(record.name for record in profiler._threads) == [
+        "hook-worker", "qt-MainThread"]
+    assert all(record.profile is None for record in profiler._threads)
+    profiler.dump()
+    assert not list(tmp_path.glob("*.prof"))
+    assert list(tmp_path.glob("*-samples.folded"))
+
+
+@pytest.mark.skipif(not concurrent_profiles(), reason="3.12 起分析器由整个进程共用")
+def test_each_thread_gets_its_own_profile(tmp_path, capsys):
+    profiler = RuntimeProfiler(str(tmp_path))
+    wrapped = profiler.wrap("hook", sum)
+    call_in_thread(lambda: wrapped([1, 2]))
+    assert wrapped([3]) == 3
+    profiler.dump()
+    names = sorted(path.name for path in tmp_path.glob("*.prof"))
+    assert len(names) == 2
+    assert names[0].endswith("-hook-MainThread.prof")
+    assert names[1].endswith("-hook-worker.prof")
@@ -0,0 +1,120 @@
+"""搜索索引: 增删改之后的查询结果与逐条比较一致，未建完索引时也是如此"""
+from bench import make_library
+from search_index import SearchIndex, normalize_text
+
+
+def expected(entries, query):
+    query = normalize_text(query)
+    return [row for row, entry in enumerate(entries)
+            if query in normalize_text(entry["text"])
+            or query in entry["hotkey"]]
+
+
+QUERIES = ["短", "短语", "短语1", "短语12", "语3", "alt", "ctrl+a", "不存在"]
+
+
+def check(index, entries):
+    for query in QUERIES:
+        assert index.search(query) == expected(entries, query), query
+
+
+def built(size):
+    entries = make_library(size)
+    index = SearchIndex(entries)
+    assert index.build()
+    return entries, index
+
+
+def test_empty_query_returns_none():
+    _, index = built(10)
+    assert index.search("") is None
+    assert index.search("  ") is None
+
+
+def test_search_built_index():
+    entries, index = built(300)
+    check(index, entries)
+
+
+def test_query_is_case_insensitive():
+    entries, index = built(10)
+    entries.append({"text": "Hello World", "hotkey": "alt+f1"})
+    index.add(entries[-1])
+    assert index.search("HELLO") == [10]
+    assert index.search("o w") == [10]
+
+
+def test_add_remove_update():
+    entries, index = built(100)
+    entries.append({"text": "新加的短语", "hotkey": "alt+shift+f2"})
+    index.add(entries[-1])
+    check(index, entries)
+    assert index.search("新加") == [100]
+
+    del entries[5]
+    index.remove(5)
+    del entries[0]
+    index.remove(0)
+    check(index, entries)
+    assert index.search("新加") == [98]
+
+    entries[10] = {"text": "改过的短语", "hotkey": entries[10]["hotkey"]}
+    index.update(10, entries[10])
+    check(index, entries)
+    assert index.search("改过") == [10]
+    assert index.search("短语12") == expected(entries, "短语12")
+
+
+def test_search_does_not_build_index():
+    entries = make_library(1000)
+    index = SearchIndex(entries)
+    check(index, entries)
+    assert len(index._order) == 0
+
+
+def test_search_partially_built_index():
+    entries = make_library(1000)
+    index = SearchIndex(entries)
+    assert not index.build(limit=400)
+    check(index, entries)
+    assert not index.build(limit=400)
+    check(index, entries)
+    assert index.build(limit=400)
+    check(index, entries)
+
+
+def test_typing_query_narrows_tail_scan():
+    entries = make_library(1000)
+    index = SearchIndex(entries)
+    for end in range(1, len("短语12") + 1):
+        query = "短语12"[:end]
+        assert index.search(query) == expected(entries, query)
+    # 删掉一个字后不再是上一次查询的延长
+    assert index.search("短语1") == expected(entries, "短语1")
+    # 比较过之后又索引了一部分条目
+    index.build(limit=500)
+    assert index.search("短语13") == expected(entries, "短语13")
+
+
+def test_changes_before_index_is_built():
+    entries = make_library(200)
+    index = SearchIndex(entries)
+    index.build(limit=50)
+    assert index.search("短语1") == expected(entries, "短语1")
+
+    entries.append({"text": "短语1 追加", "hotkey": "alt+shift+f3"})
+    index.add(entries[-1])
+    assert index.search("短语1") == expected(entries, "短语1")
+
+    del entries[150]
+    index.remove(150)
+    del entries[10]
+    index.remove(10)
+    assert index.search("短语1") == expected(entries, "短语1")
+
+    entries[120] = {"text": "短语1 修改", "hotkey": entries[120]["hotkey"]}
+    index.update(120, entries[120])
+    assert index.search("短语1") == expected(entries, "短语1")
+
+    assert index.build()
+    check(index, entries)
@@ -0,0 +1,105 @@
+"""多步快捷键: 前缀树逐步匹配，超时或按了别的键回到根节点；自动重复与最小触发间隔"""
+from bench import make_key_factory
+from dispatcher import REPEAT_GAP_NS, HotkeyDispatcher
+from hotkeys import HotkeyIndex
+
+KEY = make_key_factory()
+LIBRARY = [{"text": "三", "hotkey": "alt+q, 3"},
+           {"text": "四", "hotkey": "alt+q, 4"},
+           {"text": "长", "hotkey": "alt+w, 1, 2"},
+           {"text": "短", "hotkey": "alt+e"},
+           {"text": "短的后续", "hotkey": "alt+e, 5"}]
+
+
+class Harness:
+    """不启动工作线程，按键后直接处理队列中的事件"""
+
+    def __init__(self, library=LIBRARY):
+        self.copied = []
+        self.dispatcher = HotkeyDispatcher(HotkeyIndex(library), self.copied.append)
+
+    def tap(self, *names):
+        self.press(*names)
+        return self.release(*reversed(names))
+
+    def press(self, *names):
+        for name in names:
+            self.dispatcher.on_press(KEY(name))
+        return self.drain()
+
+    def release(self, *names):
+        for name in names:
+            self.dispatcher.on_release(KEY(name))
+        return self.drain()
+
+    def drain(self):
+        dispatcher = self.dispatcher
+        while not dispatcher._events.empty():
+            dispatcher.handle_event(*dispatcher._events.get())
+        return self
+
+
+def test_two_steps_fire_the_matching_entry():
+    assert Harness().tap("alt", "q").tap("4").copied == ["四"]
+    assert Harness().tap("alt", "q").tap("3").copied == ["三"]
+
+
+def test_three_steps():
+    harness = Harness().tap("alt", "w").tap("1")
+    assert harness.copied == []
+    assert harness.tap("2").copied == ["长"]
+
+
+def test_other_key_resets_to_the_root():
+    harness = Harness().tap("alt", "q").tap("x").tap("3")
+    assert harness.copied == []
+    assert harness.tap("alt", "q").tap("3").copied == ["三"]
+
+
+def test_timeout_resets_to_the_root():
+    harness = Harness()
+    harness.dispatcher.sequence_timeout_ns = 0
+    harness.tap("alt", "q")
+    assert harness.tap("3").copied == []
+
+
+def test_shorter_hotkey_wins_on_prefix_conflict():
+    harness = Harness().tap("alt", "e").tap("5")
+    assert harness.copied == ["短"]
+
+
+def test_step_keys_are_ignored_when_not_waiting():
+    harness = Harness().tap("3").tap("4")
+    assert harness.copied == []
+    assert harness.dispatcher.hook_calls == 0
+
+
+def test_press_while_held_is_a_repeat():
+    harness = Harness().press("alt", "e").press("e").press("e")
+    assert harness.copied == ["短"]
+    assert harness.dispatcher.repeats == 2
+
+
+def test_press_right_after_release_is_a_repeat():
+    # X11 的自动重复: 每次按下之间插入松开事件
+    harness = Harness().press("alt", "e").release("e").press("e")
+    assert harness.copied == ["短"]
+    assert harness.dispatcher.repeats == 1
+
+
+def test_press_after_repeat_gap_fires_again():
+    harness = Harness().press("alt", "e").release("e")
+    # 相当于松开后过了 REPEAT_GAP_NS 以上才再次按下
+    harness.dispatcher._released_ns -= REPEAT_GAP_NS + 1
+    harness.press("e")
+    assert harness.copied == ["短", "短"]
+    assert harness.dispatcher.repeats == 0
+
+
+def test_second_trigger_within_min_interval_is_throttled():
+    harness = Harness()
+    harness.dispatcher.min_interval_ns = 1_000_000_000
+    harness.tap("alt", "e").tap("alt", "e")
+    assert harness.copied == ["短"]
+    assert harness.dispatcher.throttled == 1
+    assert harness.dispatcher.repeats == 0
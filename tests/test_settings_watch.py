@@ -0,0 +1,72 @@
+"""窗口运行时从外部修改 settings.json: 表格和搜索索引跟着更新"""
+import json
+import os
+
+import pytest
+
+from bench import make_library
+from clipboard_backends import FakeBackend
+from tests.helpers import wait_until, write_settings_file
+
+pytest.importorskip("watchdog")
+pytest.importorskip("PyQt6.QtWidgets")
+
+
+def replace_settings(path, entries):
+    # 与编辑器一样先写临时文件再替换，监视线程不会读到写了一半的内容
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"entries": entries}, f, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+@pytest.fixture
+def window(tmp_path):
+    from bench import create_window
+
+    path = write_settings_file(str(tmp_path), make_library(50))
+    app, window = create_window(path, FakeBackend())
+    yield app, window, path
+    window.close()
+
+
+def settle(app, condition):
+    def processed():
+        app.processEvents()
+        return condition()
+    return wait_until(processed)
+
+
+def test_window_watches_settings_file(window):
+    app, window, _ = window
+    assert window.service.watcher is not None
+
+
+def test_external_edit_updates_rows_and_search(window):
+    app, window, path = window
+    entries = make_library(51)
+    entries[3]["text"] = "外部修改的短语"
+    del entries[10]
+    entries[-1]["text"] = "新加的短语"
+    replace_settings(path, entries)
+
+    assert settle(app, lambda: window.search_index.search("新加的") == [49])
+    assert window.table_model.rowCount() == 50
+    assert [entry["text"] for entry in window.entries] == \
+        [entry["text"] for entry in entries]
+    assert window.search_index.search("外部修改") == [3]
+    assert window.search_index.search("短语3") == [entries.index(entry)
+                                                 for entry in entries
+                                                 if "短语3" in entry["text"]]
+    assert window.search_index.search("短语10") == []
+
+
+def test_filtered_view_follows_external_edit(window):
+    app, window, path = window
+    window.search_input.setText("短语4")
+    window.apply_filter()
+    before = window.table_model.rowCount()
+    entries = make_library(50)
+    entries[0]["text"] = "短语4 也在这里"
+    replace_settings(path, entries)
+
+    assert settle(app, lambda: window.table_model.rowCount() == before + 1)
@@ -0,0 +1,34 @@
+"""短语模板: 载入时编译，渲染结果随变量修改整体作废"""
+from templates import TemplateRenderer, compile_template, render_template
+
+
+def test_compile_splits_literals_and_names():
+    assert compile_template("没有变量") is None
+    assert compile_template("{player} 买了 {count} 个") == (
+        "", "player", " 买了 ", "count", " 个")
+
+
+def test_missing_values_are_kept_as_placeholders():
+    compiled = compile_template("{player}/{unknown}")
+    assert render_template(compiled, {"player": "A"}) == "A/{unknown}"
+
+
+def test_renderer_caches_until_variables_change():
+    renderer = TemplateRenderer({"player": "A"})
+    renderer.load([{"text": "hi {player}"}, {"text": "plain"}], {"player": "A"})
+    first = renderer.render("hi {player}")
+    assert first == "hi A"
+    assert renderer.render("hi {player}") is first
+    assert renderer.render("plain") == "plain"
+    version = renderer.version
+    renderer.set_variable("player", "B")
+    assert renderer.version == version + 1
+    assert renderer.render("hi {player}") == "hi B"
+
+
+def test_names_follow_first_use():
+    renderer = TemplateRenderer()
+    renderer.load([{"text": "{count} {player}"}, {"text": "{player}"}], {})
+    assert renderer.names() == ["count", "player"]
+    renderer.add("{map}")
+    assert renderer.names() == ["count", "player", "map"]
@@ -0,0 +1,269 @@
+"""界面主题: 整个程序共用一份编译好的样式表，控件状态通过动态属性切换
+
+逐个控件调用 setStyleSheet 时，Qt 每次都要重新解析样式表并刷新该控件及其子控件。
+这里把所有样式写在一份模板中，按主题只编译一次并设置到 QApplication 上；
+录制快捷键等状态变化只修改控件属性，再重新应用该控件的样式。
+"""
+from string import Template
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor
+
+THEMES = {
+    "light": {
+        "window": "white",
+        "surface": "#f5f6fa",
+        "surface_focus": "#eeeeee",
+        "text": "#2d3436",
+        "muted": "#636e72",
+        "border": "#dfe6e9",
+        "row_border": "#f0f0f0",
+        "primary": "#6c5ce7",
+        "primary_hover": "#5b4cc7",
+        "primary_pressed": "#4a3cb7",
+        "danger": "#ff4757",
+        "danger_hover": "#ff6b81",
+        "danger_outline": "#ff7675",
+        "danger_outline_hover": "#fff5f5",
+        "danger_outline_pressed": "#ffe5e5",
+        "recording_border": "#e74c3c",
+        "editing": "#fff3f3",
+    },
+    "dark": {
+        "window": "#1e1f24",
+        "surface": "#2a2c33",
+        "surface_focus": "#33363e",
+        "text": "#dfe6e9",
+        "muted": "#a4b0be",
+        "border": "#3a3d45",
+        "row_border": "#2e3038",
+        "primary": "#6c5ce7",
+        "primary_hover": "#7d6ff0",
+        "primary_pressed": "#5b4cc7",
+        "danger": "#ff4757",
+        "danger_hover": "#ff6b81",
+        "danger_outline": "#ff7675",
+        "danger_outline_hover": "#3a2528",
+        "danger_outline_pressed": "#4a2a2e",
+        "recording_border": "#e74c3c",
+        "editing": "#4a2326",
+    },
+}
+
+STYLESHEET = Template("""
+    QMainWindow, QDialog {
+        background-color: $window;
+    }
+    QCheckBox {
+        color: $text;
+        font-size: 13px;
+    }
+    QLabel {
+        color: $text;
+        font-size: 13px;
+    }
+    QLabel#title {
+        font-size: 20px;
+        font-weight: 600;
+    }
+    QLabel#subtitle {
+        color: $muted;
+    }
+    QFrame#tableContainer {
+        background-color: $window;
+        border: 1px solid $border;
+        border-radius: 12px;
+    }
+    QFrame#bottomBar {
+        background-color: $surface;
+        border-radius: 12px;
+    }
+
+    ModernButton {
+        background-color: transparent;
+        border: 1px solid $danger_outline;
+        color: $danger_outline;
+        padding: 4px 12px;
+        border-radius: 6px;
+        font-size: 12px;
+    }
+    ModernButton:hover {
+        background-color: $danger_outline_hover;
+    }
+    ModernButton:pressed {
+        background-color: $danger_outline_pressed;
+    }
+    ModernButton[variant="primary"] {
+        background-color: $primary;
+        border: none;
+        color: white;
+        padding: 8px 16px;
+        border-radius: 8px;
+        font-weight: 500;
+        font-size: 13px;
+    }
+    ModernButton[variant="primary"]:hover {
+        background-color: $primary_hover;
+    }
+    ModernButton[variant="primary"]:pressed {
+        background-color: $primary_pressed;
+    }
+    ModernButton[variant="delete"] {
+        background-color: $danger;
+        border: none;
+        color: white;
+        font-weight: 500;
+    }
+    ModernButton[variant="delete"]:hover {
+        background-color: $danger_hover;
+    }
+    ModernButton[variant="delete"]:pressed {
+        background-color: $danger;
+    }
+    ModernButton[variant="subtle"] {
+        border: 1px solid $border;
+        color: $muted;
+        padding: 8px 12px;
+        border-radius: 8px;
+        font-size: 13px;
+    }
+    ModernButton[variant="subtle"]:hover {
+        background-color: $surface;
+    }
+    ModernButton[variant="subtle"]:pressed {
+        background-color: $surface_focus;
+    }
+
+    ModernLineEdit {
+        border: 1px solid $border;
+        border-radius: 8px;
+        padding: 8px 12px;
+        background-color: $window;
+        color: $text;
+        font-size: 13px;
+    }
+    ModernLineEdit:focus {
+        border: 1px solid $primary;
+    }
+    ModernLineEdit[variant="search"] {
+        border: none;
+        background-color: $surface;
+    }
+    ModernLineEdit[variant="search"]:focus {
+        background-color: $surface_focus;
+    }
+    ModernLineEdit[state="recording"] {
+        border: 2px solid $recording_border;
+        border-radius: 4px;
+        padding: 8px;
+        background-color: $editing;
+    }
+
+    ModernTable {
+        background-color: $window;
+        border: none;
+        border-radius: 12px;
+        gridline-color: transparent;
+    }
+    ModernTable::item {
+        padding: 8px 16px;
+        border-bottom: 1px solid $row_border;
+        color: $text;
+        font-size: 13px;
+    }
+    ModernTable::item:selected {
+        background-color: $surface;
+        color: $text;
+    }
+    ModernTable::item:hover {
+        background-color: $surface;
+    }
+    ModernTable QHeaderView::section {
+        background-color: $window;
+        color: $muted;
+        padding: 16px;
+        border: none;
+        font-weight: 500;
+        font-size: 13px;
+        border-bottom: 1px solid $border;
+    }
+    ModernTable QHeaderView::section:first {
+        padding-left: 16px;
+    }
+    QComboBox#profileBox {
+        border: 1px solid $border;
+        border-radius: 8px;
+        padding: 8px 12px;
+        background-color: $window;
+        color: $text;
+        font-size: 13px;
+        min-width: 90px;
+    }
+    QComboBox#profileBox QAbstractItemView {
+        background-color: $window;
+        color: $text;
+        selection-background-color: $surface;
+        selection-color: $text;
+    }
+    QMenu {
+        background-color: $window;
+        color: $text;
+        border: 1px solid $border;
+    }
+    QMenu::item:selected {
+        background-color: $surface;
+    }
+    QToolTip {
+        background-color: $surface;
+        color: $text;
+        border: 1px solid $border;
+    }
+""")
+
+DEFAULT_THEME = "light"
+
+_compiled = {}
+_colors = {}
+current = None
+
+
+def compile_stylesheet(name):
+    """按主题生成样式表，每个主题只生成一次"""
+    stylesheet = _compiled.get(name)
+    if stylesheet is None:
+        stylesheet = _compiled[name] = STYLESHEET.substitute(THEMES[name])
+    return stylesheet
+
+
+def apply_theme(app, name):
+    """把主题设置到整个程序，与当前主题相同时不做任何事"""
+    global current
+    if name not in THEMES:
+        name = DEFAULT_THEME
+    if name == current:
+        return name
+    current = name
+    _colors.clear()
+    app.setStyleSheet(compile_stylesheet(name))
+    return name
+
+
+def color(role):
+    """当前主题的颜色，供模型和委托绘制时使用"""
+    value = _colors.get(role)
+    if value is None:
+        value = _colors[role] = QColor(THEMES[current or DEFAULT_THEME][role])
+    return value
+
+
+def set_state(widget, name, value):
+    """修改控件的动态属性，只重新应用这一个控件的样式"""
+    if widget.property(name) == value:
+        return
+    widget.setProperty(name, value)
+    # 尚未显示过的控件会在第一次显示时应用样式
+    if not widget.testAttribute(Qt.WidgetAttribute.WA_WState_Polished):
+        return
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)